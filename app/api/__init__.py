@@ -1,13 +1,4 @@
-from .auth import router as auth_router
-from .projects import router as projects_router
-from .project_members import router as members_router
-from .issues import router as issues_router
-from .comments import router as comments_router
-
-__all__ = [
-    "auth_router",
-    "projects_router",
-    "members_router",
-    "issues_router",
-    "comments_router",
-]
+"""
+Route modules; app.main imports each one's ``router`` directly. Nothing is
+imported here, so loading one route module doesn't load all of them.
+"""
@@ -0,0 +1,141 @@
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import IssueAccess, get_current_user, get_db, get_issue_access
+from app.schemas import pydantic_schemas as schemas
+from app.crud import crud
+from app.db import models
+from app.core.attachments import UploadTooLarge, blob_store
+from app.core.config import settings
+
+router = APIRouter(prefix="/api", tags=["attachments"])
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=detail)
+
+
+@router.post("/issues/{issue_id}/attachments", response_model=schemas.AttachmentOut)
+async def upload_attachment(
+    issue_id: int,
+    request: Request,
+    filename: str = Query(..., min_length=1, max_length=255),
+    content_type: Optional[str] = Header(None),
+    content_length: Optional[int] = Header(None),
+    access: IssueAccess = Depends(get_issue_access),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    The request body is the file itself (not a multipart form); it is
+    hashed and written to disk chunk by chunk as it arrives.
+    """
+    if access.issue.is_archived:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Archived issues are read-only"
+        )
+    limit = settings.ATTACHMENT_MAX_BYTES
+    if content_length is not None:
+        # refuse before reading the body when the size is known up front
+        if content_length > limit:
+            raise _too_large(f"Attachments are limited to {limit} bytes")
+        usage = await run_in_threadpool(
+            crud.get_project_storage, db, access.issue.project_id
+        )
+        if usage["bytes_used"] + content_length > usage["quota_bytes"]:
+            raise _too_large("Project attachment quota exceeded")
+
+    try:
+        digest, size = await blob_store.save(request.stream(), limit)
+    except UploadTooLarge:
+        raise _too_large(f"Attachments are limited to {limit} bytes")
+
+    return await run_in_threadpool(
+        crud.create_attachment,
+        db,
+        access.issue,
+        uploader_id=current_user.id,
+        filename=os.path.basename(filename.replace("\\", "/")) or "attachment",
+        content_type=content_type or "application/octet-stream",
+        digest=digest,
+        size=size,
+    )
+
+
+@router.get(
+    "/issues/{issue_id}/attachments", response_model=List[schemas.AttachmentOut]
+)
+def list_attachments(
+    issue_id: int,
+    access: IssueAccess = Depends(get_issue_access),
+    db: Session = Depends(get_db),
+):
+    return crud.get_attachments(db, issue_id)
+
+
+@router.get("/issues/{issue_id}/attachments/{attachment_id}")
+def download_attachment(
+    issue_id: int,
+    attachment_id: int,
+    access: IssueAccess = Depends(get_issue_access),
+    db: Session = Depends(get_db),
+):
+    attachment = crud.get_attachment(db, issue_id, attachment_id)
+    if attachment is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    path = blob_store.path(attachment.sha256)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Attachment file is missing")
+    # streamed from disk; Range / If-Range requests get 206 partial content
+    return FileResponse(
+        path,
+        media_type=attachment.content_type,
+        filename=attachment.filename,
+        headers={
+            "ETag": f'"{attachment.sha256}"',
+            "Cache-Control": "private, max-age=31536000, immutable",
+            "X-Content-Type-Options": "nosniff",
+        },
+    )
+
+
+@router.delete("/issues/{issue_id}/attachments/{attachment_id}")
+def delete_attachment(
+    issue_id: int,
+    attachment_id: int,
+    access: IssueAccess = Depends(get_issue_access),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    attachment = crud.get_attachment(db, issue_id, attachment_id)
+    if attachment is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    if (
+        attachment.uploader_id != current_user.id
+        and access.role != models.RoleEnum.manager
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the uploader or a project manager can delete an attachment",
+        )
+    crud.delete_attachment(db, attachment)
+    return {"status": "deleted"}
+
+
+@router.get("/projects/{project_id}/storage", response_model=schemas.ProjectStorageOut)
+def project_storage(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    if crud.get_member_role(db, project_id, current_user.id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this project",
+        )
+    return crud.get_project_storage(db, project_id)
@@ -0,0 +1,108 @@
+import asyncio
+import json
+from typing import Any, Dict, Tuple
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db, get_current_user
+from app.schemas import pydantic_schemas as schemas
+from app.core.config import settings
+from app.db import models
+
+router = APIRouter(prefix="/api", tags=["batch"])
+
+
+async def _dispatch(
+    request: Request, path: str, state: Dict[str, Any]
+) -> Tuple[int, Any]:
+    """Run one GET through the app in-process and collect its response."""
+    url = urlsplit(path)
+    headers = [(b"accept", b"application/json")]
+    authorization = request.headers.get("authorization")
+    if authorization:
+        headers.append((b"authorization", authorization.encode()))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": request.url.scheme,
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "root_path": "",
+        "query_string": url.query.encode(),
+        "headers": headers,
+        "client": request.scope.get("client"),
+        "server": request.scope.get("server"),
+        "state": state,
+    }
+    status_code = 500
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        return 500, {"detail": "Internal Server Error"}
+
+    raw = b"".join(chunks)
+    try:
+        return status_code, json.loads(raw) if raw else None
+    except ValueError:
+        return status_code, raw.decode(errors="replace")
+
+
+@router.post("/batch", response_model=schemas.BatchOut)
+async def batch(
+    payload: schemas.BatchRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Run several GET requests in one round trip. Sub-requests go through the
+    normal routes but skip re-authentication; run sequentially they also
+    share this request's DB session.
+    """
+    if len(payload.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_REQUESTS} requests per batch",
+        )
+    for item in payload.requests:
+        path = urlsplit(item.path).path
+        if not path.startswith("/") or path.rstrip("/") == "/api/batch":
+            raise HTTPException(status_code=400, detail=f"Invalid path: {item.path}")
+
+    if payload.concurrent:
+        # a Session isn't safe across threads, so each gets its own
+        results = await asyncio.gather(
+            *(
+                _dispatch(request, item.path, {"batch_user": current_user})
+                for item in payload.requests
+            )
+        )
+    else:
+        shared = {"batch_user": current_user, "batch_db": db}
+        results = [
+            await _dispatch(request, item.path, shared) for item in payload.requests
+        ]
+
+    return {
+        "responses": [
+            {"id": item.id, "status": status_code, "body": body}
+            for item, (status_code, body) in zip(payload.requests, results)
+        ]
+    }
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db, get_current_user
+from app.schemas import pydantic_schemas as schemas
+from app.crud import crud
+from app.db import models
+
+router = APIRouter(prefix="/api/projects", tags=["changes"])
+
+
+@router.get("/{project_id}/changes", response_model=schemas.ChangesOut)
+def list_changes(
+    project_id: int,
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    role = crud.get_member_role(db, project_id, current_user.id)
+    if role is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this project",
+        )
+
+    # pass the returned cursor back as `since` to fetch the next batch
+    return crud.get_changes(db, project_id, since=since, limit=limit)
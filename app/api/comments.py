@@ -1,54 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from typing import List, Optional
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import (
+    IssueAccess,
+    get_current_user,
+    get_db,
+    get_issue_access,
+    issue_rate_limit,
+)
 from app.schemas import pydantic_schemas as schemas
 from app.crud import crud
 from app.db import models
+from app.core.idempotency import idempotency_store, request_fingerprint
 
 router = APIRouter(prefix="/api/issues", tags=["comments"])
 
 
-@router.get("/{issue_id}/comments", response_model=List[schemas.CommentOut])
+@router.get("/{issue_id}/comments", response_model=List[schemas.CommentHtmlOut])
 def list_comments(
     issue_id: int,
+    html: bool = False,
+    access: IssueAccess = Depends(get_issue_access),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
 ):
-    issue = crud.get_issue(db, issue_id)
-    if not issue:
-        raise HTTPException(status_code=404, detail="Issue not found")
-
-    member = crud.get_project_member(db, issue.project_id, current_user.id)
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this project",
-        )
-
-    return crud.get_comments_for_issue(db, issue_id)
+    comments = crud.get_comments_for_issue(
+        db, issue_id, archived=access.issue.is_archived
+    )
+    if html:
+        return crud.ensure_html(db, comments)
+    return [schemas.CommentOut.model_validate(comment) for comment in comments]
 
 
-@router.post("/{issue_id}/comments", response_model=schemas.CommentOut)
+@router.post(
+    "/{issue_id}/comments",
+    response_model=schemas.CommentOut,
+    dependencies=[Depends(issue_rate_limit("create_comment"))],
+)
 def create_comment(
     issue_id: int,
     payload: schemas.CommentCreate,
+    idempotency_key: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    access: IssueAccess = Depends(get_issue_access),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    issue = crud.get_issue(db, issue_id)
-    if not issue:
-        raise HTTPException(status_code=404, detail="Issue not found")
-
-    member = crud.get_project_member(db, issue.project_id, current_user.id)
-    if not member:
+    if access.issue.is_archived:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this project",
+            status_code=status.HTTP_409_CONFLICT, detail="Archived issues are read-only"
         )
 
-    comment = crud.create_comment(
-        db, issue_id=issue_id, author_id=current_user.id, body=payload.body
+    fingerprint = request_fingerprint(
+        "create_comment", issue_id, payload.model_dump(mode="json")
+    )
+    replay = idempotency_store.claim(
+        db, current_user.id, idempotency_key, fingerprint, accept_encoding
     )
+    if replay is not None:
+        return replay
+
+    try:
+        comment = crud.create_comment(
+            db,
+            issue_id=issue_id,
+            author_id=current_user.id,
+            body=payload.body,
+            project_id=access.issue.project_id,
+        )
+    except IntegrityError as error:
+        # a concurrent request with the same key committed first
+        db.rollback()
+        return idempotency_store.conflict(
+            db, current_user.id, idempotency_key, fingerprint, error, accept_encoding
+        )
+    if idempotency_key:
+        body = schemas.CommentOut.model_validate(comment).model_dump(mode="json")
+        idempotency_store.save(db, current_user.id, idempotency_key, fingerprint, body)
+        # the commit above expired comment; return the dump rather than reload it
+        return body
     return comment
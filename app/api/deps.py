@@ -1,15 +1,29 @@
-from fastapi import Depends, HTTPException, status
+import math
+from typing import NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal
+from app.db.shards import shard_router
 from app.db import models
 from app.core import security
+from app.core.config import settings
+from app.core.ratelimit import rate_limiter
+from app.crud import crud
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_db():
+def get_global_db(request: Request):
+    """Session on the global database (users, project directory)."""
+    # sub-requests of POST /api/batch reuse the batch's session
+    shared = request.scope.get("state", {}).get("batch_db")
+    if shared is not None:
+        yield shared
+        return
+
     db = SessionLocal()
     try:
         yield db
@@ -17,7 +31,34 @@ def get_db():
         db.close()
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_db(request: Request, global_db: Session = Depends(get_global_db)):
+    """
+    Session for the route's data: the shard holding the project named by
+    the path's project_id / issue_id, or the global database otherwise.
+    Unsharded (or when it is the same database) the global session is reused.
+    """
+    shard = shard_router.shard_for_path(request.path_params)
+    if shard_router.is_global(shard):
+        yield global_db
+        return
+
+    db = shard_router.session(shard)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_global_db),
+):
+    # ... and its already-authenticated user
+    batch_user = request.scope.get("state", {}).get("batch_user")
+    if batch_user is not None:
+        return batch_user
+
     user_id = security.decode_access_token(token)
     if user_id is None:
         raise HTTPException(
@@ -33,3 +74,88 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         )
 
     return user
+
+
+class IssueAccess(NamedTuple):
+    issue: models.Issue
+    role: models.RoleEnum
+
+
+def get_issue_access(
+    issue_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> IssueAccess:
+    """
+    Resolve an issue-scoped route's issue and the caller's project role in
+    one query: 404 if the issue doesn't exist, 403 if the caller isn't a
+    member of its project.
+    """
+    row = crud.get_issue_with_role(db, issue_id, current_user.id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Issue not found")
+
+    issue, role = row
+    if role is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this project",
+        )
+
+    return IssueAccess(issue=issue, role=role)
+
+
+def _enforce_rate_limit(route: str, user_id: int, project_id: Optional[int]):
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    retry_after = rate_limiter.check(route, user_id, project_id)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+def get_project_role(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> models.RoleEnum:
+    """The caller's role in the path's project; 403 if they aren't a member."""
+    role = crud.get_member_role(db, project_id, current_user.id)
+    if role is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this project",
+        )
+    return role
+
+
+def project_rate_limit(route: str):
+    """
+    Route dependency applying ``settings.RATE_LIMITS[route]`` to the caller
+    and to the path's project. Membership is checked first, so outsiders
+    can't spend a project's shared allowance.
+    """
+
+    def dependency(
+        project_id: int,
+        role: models.RoleEnum = Depends(get_project_role),
+        current_user: models.User = Depends(get_current_user),
+    ) -> None:
+        _enforce_rate_limit(route, current_user.id, project_id)
+
+    return dependency
+
+
+def issue_rate_limit(route: str):
+    """As rate_limit, for issue-scoped routes: the project comes from the issue."""
+
+    def dependency(
+        access: IssueAccess = Depends(get_issue_access),
+        current_user: models.User = Depends(get_current_user),
+    ) -> None:
+        _enforce_rate_limit(route, current_user.id, access.issue.project_id)
+
+    return dependency
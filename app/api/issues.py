@@ -1,35 +1,101 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from typing import List, Optional
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import (
+    IssueAccess,
+    get_current_user,
+    get_db,
+    get_issue_access,
+    project_rate_limit,
+)
 from app.schemas import pydantic_schemas as schemas
 from app.crud import crud
 from app.db import models
+from app.core.idempotency import idempotency_store, request_fingerprint
+from app.core.similarity import similarity_index
 
 router = APIRouter(prefix="/api", tags=["issues"])  # base /api
 
 
-@router.post("/projects/{project_id}/issues", response_model=schemas.IssueOut)
+def _parse_if_match(value: Optional[str]) -> Optional[int]:
+    """Accept `3`, `"3"` or `W/"3"`; `*` means no version check."""
+    if value is None or value.strip() == "*":
+        return None
+    tag = value.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+
+
+@router.post("/projects/{project_id}/issues", response_model=schemas.IssueCreateOut)
 def create_issue(
     project_id: int,
     issue_in: schemas.IssueCreate,
+    check_duplicates: bool = True,
+    idempotency_key: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     # must be project member
-    member = crud.get_project_member(db, project_id, current_user.id)
-    if not member:
+    role = crud.get_member_role(db, project_id, current_user.id)
+    if role is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of this project",
         )
 
-    issue = crud.create_issue(db, project_id, issue_in, reporter_id=current_user.id)
-    return issue
+    # a retried request gets the stored response instead of a duplicate; a
+    # new key is claimed in the same transaction as the issue
+    fingerprint = request_fingerprint(
+        "create_issue", project_id, issue_in.model_dump(mode="json")
+    )
+    replay = idempotency_store.claim(
+        db, current_user.id, idempotency_key, fingerprint, accept_encoding
+    )
+    if replay is not None:
+        return replay
 
+    try:
+        issue = crud.create_issue(
+            db, project_id, issue_in, reporter_id=current_user.id
+        )
+    except IntegrityError as error:
+        # a concurrent request with the same key committed first
+        db.rollback()
+        return idempotency_store.conflict(
+            db, current_user.id, idempotency_key, fingerprint, error, accept_encoding
+        )
+    body = schemas.IssueCreateOut.model_validate(issue)
+    if check_duplicates:
+        # a warning only: the issue is created either way
+        body.possible_duplicates = [
+            schemas.SimilarIssueOut(**match)
+            for match in similarity_index.similar(
+                db,
+                project_id,
+                issue_in.title,
+                issue_in.description,
+                exclude_id=issue.id,
+            )
+        ]
+    if idempotency_key:
+        body = body.model_dump(mode="json")
+        idempotency_store.save(db, current_user.id, idempotency_key, fingerprint, body)
+    # built before the save commit expired issue, so no reload is needed
+    return body
 
-@router.get("/projects/{project_id}/issues", response_model=List[schemas.IssueOut])
+
+@router.get(
+    "/projects/{project_id}/issues",
+    response_model=List[schemas.IssueOut],
+    dependencies=[Depends(project_rate_limit("list_issues"))],
+)
 def list_issues(
     project_id: int,
     q: Optional[str] = None,
@@ -37,16 +103,10 @@ def list_issues(
     priority: Optional[str] = None,
     assignee: Optional[int] = None,
     sort: Optional[str] = None,
+    include_archived: bool = False,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
 ):
-    member = crud.get_project_member(db, project_id, current_user.id)
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this project",
-        )
-
+    # project_rate_limit has already checked membership
     issues = crud.get_issues(
         db,
         project_id,
@@ -55,53 +115,106 @@ def list_issues(
         priority=priority,
         assignee=assignee,
         sort=sort,
+        include_archived=include_archived,
     )
     return issues
 
 
-@router.get("/issues/{issue_id}", response_model=schemas.IssueOut)
-def get_issue(
-    issue_id: int,
+@router.get(
+    "/projects/{project_id}/issues/similar",
+    response_model=List[schemas.SimilarIssueOut],
+)
+def list_similar_issues(
+    project_id: int,
+    title: str = Query(..., min_length=1),
+    description: Optional[str] = None,
+    limit: int = Query(5, ge=1, le=50),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    issue = crud.get_issue(db, issue_id)
-    if not issue:
-        raise HTTPException(status_code=404, detail="Issue not found")
+    role = crud.get_member_role(db, project_id, current_user.id)
+    if role is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this project",
+        )
+
+    # candidate duplicates for a draft issue, best match first
+    return similarity_index.similar(db, project_id, title, description, limit=limit)
+
 
-    member = crud.get_project_member(db, issue.project_id, current_user.id)
-    if not member:
+@router.get(
+    "/projects/{project_id}/issues/top", response_model=List[schemas.IssueOut]
+)
+def list_most_urgent_issues(
+    project_id: int,
+    status_filter: models.IssueStatusEnum = models.IssueStatusEnum.open,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    role = crud.get_member_role(db, project_id, current_user.id)
+    if role is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of this project",
         )
 
-    return issue
+    return crud.get_most_urgent_issues(
+        db, project_id, status=status_filter, limit=limit
+    )
+
+
+@router.get("/issues/{issue_id}", response_model=schemas.IssueDetailOut)
+def get_issue(
+    issue_id: int,
+    response: Response,
+    html: bool = False,
+    access: IssueAccess = Depends(get_issue_access),
+    db: Session = Depends(get_db),
+):
+    issue = access.issue
+    response.headers["ETag"] = f'"{issue.version}"'
+    if html:
+        # pre-rendered at write time; only re-rendered after a renderer change
+        crud.ensure_html(db, [issue])
+    body = schemas.IssueDetailOut.model_validate(issue)
+    if not html:
+        body.description_html = None
+    # every attachment of the issue in one query
+    body.attachments = [
+        schemas.AttachmentOut.model_validate(attachment)
+        for attachment in crud.get_attachments(db, issue_id)
+    ]
+    return body
 
 
 @router.patch("/issues/{issue_id}", response_model=schemas.IssueOut)
 def patch_issue(
     issue_id: int,
     issue_updates: schemas.IssueUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    access: IssueAccess = Depends(get_issue_access),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    issue = crud.get_issue(db, issue_id)
-    if not issue:
-        raise HTTPException(status_code=404, detail="Issue not found")
-
-    member = crud.get_project_member(db, issue.project_id, current_user.id)
-    if not member:
+    issue = access.issue
+    if issue.is_archived:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this project",
+            status_code=status.HTTP_409_CONFLICT, detail="Archived issues are read-only"
         )
 
     updates = issue_updates.dict(exclude_unset=True)
+    expected_version = _parse_if_match(if_match)
+    if expected_version is None:
+        expected_version = updates.pop("version", None)
+    else:
+        updates.pop("version", None)
 
     # If changing status / assignee / priority, require manager
     if any(field in updates for field in ("status", "assignee_id", "priority")):
-        if not crud.is_project_manager(db, issue.project_id, current_user.id):
+        if access.role != models.RoleEnum.manager:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=(
@@ -110,26 +223,34 @@ def patch_issue(
                 ),
             )
 
-    updated = crud.update_issue(db, issue, updates)
+    updated = crud.update_issue(
+        db,
+        issue,
+        updates,
+        actor_id=current_user.id,
+        expected_version=expected_version,
+    )
+    response.headers["ETag"] = f'"{updated.version}"'
     return updated
 
 
-@router.delete("/issues/{issue_id}")
-def delete_issue(
+@router.get("/issues/{issue_id}/activity", response_model=List[schemas.ActivityOut])
+def list_issue_activity(
     issue_id: int,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    access: IssueAccess = Depends(get_issue_access),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
 ):
-    issue = crud.get_issue(db, issue_id)
-    if not issue:
-        raise HTTPException(status_code=404, detail="Issue not found")
+    # newest first; pass the last id back as before_id for the next page
+    return crud.get_issue_activity(db, issue_id, before_id=before_id, limit=limit)
 
-    member = crud.get_project_member(db, issue.project_id, current_user.id)
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this project",
-        )
 
-    crud.delete_issue(db, issue)
+@router.delete("/issues/{issue_id}")
+def delete_issue(
+    issue_id: int,
+    access: IssueAccess = Depends(get_issue_access),
+    db: Session = Depends(get_db),
+):
+    crud.delete_issue(db, access.issue)
     return {"status": "deleted"}
@@ -0,0 +1,67 @@
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db, get_current_user, get_global_db
+from app.schemas import pydantic_schemas as schemas
+from app.crud import crud
+from app.db import models
+
+router = APIRouter(prefix="/api/me", tags=["me"])
+
+
+@router.get("/issues", response_model=List[schemas.IssueOut])
+def list_my_issues(
+    involvement: Optional[Literal["assignee", "reporter"]] = None,
+    status_filter: Optional[str] = None,
+    priority: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    include_archived: bool = False,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    # newest first; pass the last id back as before_id for the next page
+    return crud.get_issues_for_user(
+        db,
+        current_user.id,
+        involvement=involvement,
+        status=status_filter,
+        priority=priority,
+        before_id=before_id,
+        limit=limit,
+        include_archived=include_archived,
+    )
+
+
+@router.get("/notifications", response_model=List[schemas.NotificationOut])
+def list_notifications(
+    unread_only: bool = False,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_global_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    # newest first; pass the last id back as before_id for the next page
+    return crud.get_notifications(
+        db, current_user.id, unread_only=unread_only, before_id=before_id, limit=limit
+    )
+
+
+@router.get("/notifications/unread-count", response_model=schemas.UnreadCountOut)
+def unread_notification_count(
+    db: Session = Depends(get_global_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    # one primary-key read of the counter the notification writer maintains
+    return {"unread": crud.get_unread_count(db, current_user.id)}
+
+
+@router.post("/notifications/read", response_model=schemas.UnreadCountOut)
+def mark_notifications_read(
+    payload: schemas.NotificationsRead,
+    db: Session = Depends(get_global_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    return {"unread": crud.mark_notifications_read(db, current_user.id, payload.ids)}
@@ -4,10 +4,13 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_user, get_global_db
 from app.schemas import pydantic_schemas as schemas
 from app.db import models
 from app.crud import crud
+from app.core.activity import activity_writer
+from app.core.invalidation import invalidation_bus
+from app.db.shards import shard_router
 
 router = APIRouter(prefix="/api/projects", tags=["project_members"])
 
@@ -17,6 +20,7 @@ def add_member(
     project_id: int,
     member_in: schemas.ProjectMemberCreate,
     db: Session = Depends(get_db),
+    global_db: Session = Depends(get_global_db),
     current_user=Depends(get_current_user),
 ):
     # ensure project exists
@@ -25,17 +29,18 @@ def add_member(
         raise HTTPException(status_code=404, detail="Project not found")
 
     # only existing project members can add another member
-    current_member = crud.get_project_member(db, project_id, current_user.id)
-    if not current_member:
+    role = crud.get_member_role(db, project_id, current_user.id)
+    if role is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of this project",
         )
 
     # look up user by email from payload
-    user = crud.get_user_by_email(db, member_in.email)
+    user = crud.get_user_by_email(global_db, member_in.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    shard_router.mirror_users(db, [user.id])
 
     # create project member row
     pm = models.ProjectMember(
@@ -44,8 +49,18 @@ def add_member(
         role=member_in.role,
     )
     db.add(pm)
+    invalidation_bus.publish(db, "project_members", project_id)
     db.commit()
     db.refresh(pm)
+
+    activity_writer.record(
+        project_id=project_id,
+        actor_id=current_user.id,
+        entity="member",
+        entity_id=user.id,
+        field="role",
+        new_value=pm.role,
+    )
     return pm
 
 
@@ -56,17 +71,44 @@ def list_members(
     current_user=Depends(get_current_user),
 ):
     # ensure current user is at least a member
-    member = crud.get_project_member(db, project_id, current_user.id)
-    if not member:
+    role = crud.get_member_role(db, project_id, current_user.id)
+    if role is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of this project",
         )
 
-    # return all members for this project
-    members = (
-        db.query(models.ProjectMember)
-        .filter(models.ProjectMember.project_id == project_id)
-        .all()
+    # return all members for this project, with name/email embedded
+    return crud.get_project_members(db, project_id)
+
+
+@router.post(
+    "/{project_id}/members/batch", response_model=schemas.ProjectMembersBatchOut
+)
+def add_members_batch(
+    project_id: int,
+    payload: schemas.ProjectMembersBatchCreate,
+    db: Session = Depends(get_db),
+    global_db: Session = Depends(get_global_db),
+    current_user=Depends(get_current_user),
+):
+    # Only project managers can add members
+    if not crud.is_project_manager(db, project_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only project managers can add members",
+        )
+
+    result = crud.add_project_members(
+        db, project_id, payload.members, users_db=global_db
     )
-    return members
+    for pm in result["added"]:
+        activity_writer.record(
+            project_id=project_id,
+            actor_id=current_user.id,
+            entity="member",
+            entity_id=pm.user_id,
+            field="role",
+            new_value=pm.role,
+        )
+    return result
@@ -1,11 +1,14 @@
+from datetime import date, datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_user, get_global_db
 from app.schemas import pydantic_schemas as schemas
 from app.crud import crud
 from app.db import models
+from app.core.activity import activity_writer
+from app.core.config import settings
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
@@ -19,12 +22,29 @@ def create_project(
     return crud.create_project(db, project_in, owner_id=current_user.id)
 
 
-@router.get("/", response_model=List[schemas.ProjectOut])
+@router.get("/", response_model=List[schemas.ProjectSummaryOut])
 def list_projects(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    return crud.get_projects_for_user(db, current_user.id)
+    return crud.get_project_summaries_for_user(db, current_user.id)
+
+
+@router.delete("/{project_id}", status_code=status.HTTP_202_ACCEPTED)
+def delete_project(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    if not crud.is_project_manager(db, project_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only project managers can delete a project",
+        )
+
+    # the project disappears now; its rows are purged in the background
+    crud.mark_project_deleted(db, project_id)
+    return {"status": "deleting"}
 
 
 @router.post("/{project_id}/members", response_model=schemas.ProjectMemberOut)
@@ -32,6 +52,7 @@ def add_member(
     project_id: int,
     payload: schemas.ProjectMemberCreate,
     db: Session = Depends(get_db),
+    global_db: Session = Depends(get_global_db),
     current_user: models.User = Depends(get_current_user),
 ):
     # Only project managers can add members
@@ -42,7 +63,53 @@ def add_member(
         )
 
     try:
-        member = crud.add_project_member(db, project_id, payload.email, payload.role)
+        member = crud.add_project_member(
+            db, project_id, payload.email, payload.role, users_db=global_db
+        )
     except ValueError:
         raise HTTPException(status_code=404, detail="User not found")
+
+    activity_writer.record(
+        project_id=project_id,
+        actor_id=current_user.id,
+        entity="member",
+        entity_id=member.user_id,
+        field="role",
+        new_value=member.role,
+    )
     return member
+
+
+@router.get("/{project_id}/timeseries", response_model=schemas.TimeseriesOut)
+def project_timeseries(
+    project_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Daily open / closed counts and flows for charts and burndowns, by
+    default over the last 30 days (UTC). Served from the daily roll-ups,
+    which trail issue writes by up to ROLLUP_INTERVAL_SECONDS.
+    """
+    if crud.get_member_role(db, project_id, current_user.id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this project",
+        )
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= settings.TIMESERIES_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.TIMESERIES_MAX_DAYS} days per request",
+        )
+    return {
+        "project_id": project_id,
+        "start": start,
+        "end": end,
+        "points": crud.get_project_timeseries(db, project_id, start, end),
+    }
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.api.deps import get_db, get_current_user
+from app.schemas import pydantic_schemas as schemas
+from app.crud import crud
+from app.db import models
+
+router = APIRouter(prefix="/api/projects", tags=["saved views"])
+
+
+def _require_member(
+    db: Session, project_id: int, user_id: int
+) -> Optional[models.RoleEnum]:
+    role = crud.get_member_role(db, project_id, user_id)
+    if role is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this project",
+        )
+    return role
+
+
+def _get_view(db: Session, project_id: int, view_id: int) -> models.SavedView:
+    view = crud.get_saved_view(db, project_id, view_id)
+    if view is None:
+        raise HTTPException(status_code=404, detail="Saved view not found")
+    return view
+
+
+@router.post("/{project_id}/views", response_model=schemas.SavedViewOut)
+def create_view(
+    project_id: int,
+    view_in: schemas.SavedViewCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    _require_member(db, project_id, current_user.id)
+    return crud.create_saved_view(db, project_id, view_in, created_by=current_user.id)
+
+
+@router.get("/{project_id}/views", response_model=List[schemas.SavedViewOut])
+def list_views(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    _require_member(db, project_id, current_user.id)
+    return crud.get_saved_views(db, project_id)
+
+
+@router.get(
+    "/{project_id}/views/{view_id}/issues", response_model=List[schemas.IssueOut]
+)
+def list_view_issues(
+    project_id: int,
+    view_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """The view's (non-archived) issues, in the view's sort order."""
+    _require_member(db, project_id, current_user.id)
+    view = _get_view(db, project_id, view_id)
+    return crud.get_saved_view_issues(db, view, limit=limit, offset=offset)
+
+
+@router.post(
+    "/{project_id}/views/{view_id}/refresh", response_model=schemas.SavedViewOut
+)
+def refresh_view(
+    project_id: int,
+    view_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Recompute the view's issues from scratch now."""
+    _require_member(db, project_id, current_user.id)
+    return crud.refresh_saved_view(db, _get_view(db, project_id, view_id))
+
+
+@router.delete("/{project_id}/views/{view_id}")
+def delete_view(
+    project_id: int,
+    view_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    role = _require_member(db, project_id, current_user.id)
+    view = _get_view(db, project_id, view_id)
+    if view.created_by != current_user.id and role != models.RoleEnum.manager:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the creator or a project manager can delete a saved view",
+        )
+    crud.delete_saved_view(db, view)
+    return {"status": "deleted"}
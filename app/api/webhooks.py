@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.api.deps import get_db, get_current_user
+from app.core.config import settings
+from app.core.webhooks import check_public_url
+from app.schemas import pydantic_schemas as schemas
+from app.crud import crud
+from app.db import models
+
+router = APIRouter(prefix="/api/projects", tags=["webhooks"])
+
+
+def _require_manager(db: Session, project_id: int, user_id: int) -> None:
+    if not crud.is_project_manager(db, project_id, user_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only project managers can manage webhooks",
+        )
+
+
+@router.post("/{project_id}/webhooks", response_model=schemas.WebhookOut)
+def create_webhook(
+    project_id: int,
+    webhook_in: schemas.WebhookCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    _require_manager(db, project_id, current_user.id)
+    if not settings.WEBHOOK_ALLOW_PRIVATE_URLS:
+        try:
+            check_public_url(str(webhook_in.url))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    return crud.create_webhook(db, project_id, webhook_in, created_by=current_user.id)
+
+
+@router.get("/{project_id}/webhooks", response_model=List[schemas.WebhookOut])
+def list_webhooks(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    _require_manager(db, project_id, current_user.id)
+    return crud.get_webhooks(db, project_id)
+
+
+@router.delete("/{project_id}/webhooks/{webhook_id}")
+def delete_webhook(
+    project_id: int,
+    webhook_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    _require_manager(db, project_id, current_user.id)
+    if not crud.delete_webhook(db, project_id, webhook_id):
+        raise HTTPException(status_code=404, detail="Webhook not found")
+    return {"status": "deleted"}
@@ -0,0 +1,169 @@
+import logging
+import threading
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.db import models
+
+logger = logging.getLogger(__name__)
+
+def _as_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+class ActivityWriter:
+    """
+    Buffers activity entries in memory and writes them with one batched
+    INSERT, either from the background thread (at most every
+    ``flush_interval`` seconds) or as soon as ``batch_size`` entries are
+    waiting. Request handlers only pay for an append to a list. Failed
+    batches are kept for the next flush, but never more than
+    ``max_buffered`` entries: past that the oldest are dropped and logged.
+    """
+
+    thread_name = "activity-writer"
+
+    def __init__(
+        self,
+        bind=None,
+        flush_interval: float = settings.ACTIVITY_FLUSH_INTERVAL_SECONDS,
+        batch_size: int = settings.ACTIVITY_BATCH_SIZE,
+        max_buffered: int = settings.ACTIVITY_MAX_BUFFERED,
+    ):
+        self._bind = bind
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffered = max_buffered
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _group_by_bind(self, batch: List[Dict[str, Any]]):
+        """Split a batch by the database (shard) each project lives on."""
+        if self._bind is not None:
+            return {self._bind: batch}
+        from app.db.shards import shard_router
+
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for entry in batch:
+            bind = shard_router.engine_for_project(entry["project_id"])
+            groups.setdefault(bind, []).append(entry)
+        return groups
+
+    def record(
+        self,
+        *,
+        project_id: int,
+        actor_id: Optional[int],
+        entity: str,
+        entity_id: int,
+        field: str,
+        old_value: Any = None,
+        new_value: Any = None,
+        issue_id: Optional[int] = None,
+    ) -> None:
+        entry = {
+            "project_id": project_id,
+            "issue_id": issue_id,
+            "actor_id": actor_id,
+            "entity": entity,
+            "entity_id": entity_id,
+            "field": field,
+            "old_value": _as_text(old_value),
+            "new_value": _as_text(new_value),
+            "created_at": datetime.utcnow(),
+        }
+        self._append(entry)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.batch_size
+            dropped = self._trim()
+        if dropped:
+            logger.warning("activity buffer full; dropped %d oldest entries", dropped)
+        if full:
+            self._wakeup.set()
+
+    def _trim(self) -> int:
+        """Drop the oldest entries over ``max_buffered``; call with the lock."""
+        excess = len(self._buffer) - self.max_buffered
+        if excess <= 0:
+            return 0
+        del self._buffer[:excess]
+        return excess
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        written = 0
+        failed: List[Dict[str, Any]] = []
+        error = None
+        for bind, rows in self._group_by_bind(batch).items():
+            try:
+                with bind.begin() as conn:
+                    self._write(conn, rows)
+                written += len(rows)
+            except Exception as exc:
+                failed.extend(rows)
+                error = exc
+        if failed:
+            # put the failed rows back so the next flush retries them
+            with self._lock:
+                self._buffer[:0] = failed
+                dropped = self._trim()
+            if dropped:
+                logger.warning(
+                    "activity writes failing; dropped %d oldest entries", dropped
+                )
+            raise error
+        return written
+
+    def _write(self, conn, rows: List[Dict[str, Any]]) -> None:
+        conn.execute(models.ActivityLog.__table__.insert(), rows)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # back off, but let stop() interrupt the wait
+                self._stopping.wait(self.flush_interval)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=self.thread_name, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, flush: bool = settings.ACTIVITY_FLUSH_ON_SHUTDOWN) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self.flush()
+
+
+activity_writer = ActivityWriter()
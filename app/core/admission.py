@@ -0,0 +1,168 @@
+import asyncio
+import math
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+
+# first match wins; anything else is "reads" (GET/HEAD) or "writes"
+ROUTE_GROUPS = (
+    ("auth", re.compile(r"^/auth/")),
+    # several reads in one request, e.g. the landing page: kept apart from
+    # bulk work so it isn't shed first under load
+    ("batch", re.compile(r"^/api/batch/?$")),
+    ("exports", re.compile(r"^/api/projects/\d+/members/batch/?$")),
+)
+READ_METHODS = ("GET", "HEAD")
+
+
+def classify(method: str, path: str) -> str:
+    for group, pattern in ROUTE_GROUPS:
+        if pattern.search(path):
+            return group
+    return "reads" if method in READ_METHODS else "writes"
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class GroupLimiter:
+    """
+    At most ``concurrency`` requests of one route group in flight; the rest
+    wait in FIFO order for up to ``queue_timeout`` seconds. New arrivals are
+    turned away at once when the oldest waiter has already waited that long
+    or when the observed latency says they would.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_timeout: float):
+        self.name = name
+        self.concurrency = int(concurrency)
+        self.queue_timeout = float(queue_timeout)
+        self.in_flight = 0
+        self.latency = 0.0  # EWMA of seconds per admitted request
+        self.shed = 0
+        self._waiters: Deque[Tuple[float, asyncio.Future]] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def predicted_wait(self) -> float:
+        return self.latency * (len(self._waiters) + 1) / self.concurrency
+
+    def _shed_reason(self, now: float) -> Optional[float]:
+        """Seconds a new arrival should back off for, or None to queue it."""
+        if self._waiters and now - self._waiters[0][0] >= self.queue_timeout:
+            return self.queue_timeout
+        wait = self.predicted_wait()
+        if wait > self.queue_timeout:
+            return wait
+        return None
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.concurrency and not self._waiters:
+            self.in_flight += 1
+            return
+
+        now = time.monotonic()
+        retry_after = self._shed_reason(now)
+        if retry_after is not None:
+            self.shed += 1
+            raise Overloaded(retry_after)
+
+        fut = asyncio.get_running_loop().create_future()
+        entry = (now, fut)
+        self._waiters.append(entry)
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except BaseException as exc:
+            if fut.done() and not fut.cancelled():
+                # the slot was handed over just as we gave up
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(entry)
+                except ValueError:
+                    pass
+            if isinstance(exc, asyncio.TimeoutError):
+                self.shed += 1
+                raise Overloaded(self.queue_timeout) from None
+            raise
+
+    def release(self) -> None:
+        # hand the slot straight to the oldest live waiter
+        while self._waiters:
+            _, fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def observe(self, seconds: float, alpha: float = 0.2) -> None:
+        if self.latency == 0.0:
+            self.latency = seconds
+        else:
+            self.latency += alpha * (seconds - self.latency)
+
+
+class AdmissionController:
+    def __init__(self, groups: Dict[str, Dict[str, float]]):
+        self.configure(groups)
+
+    def configure(self, groups: Dict[str, Dict[str, float]]) -> None:
+        self.limiters = {
+            name: GroupLimiter(name, **config) for name, config in groups.items()
+        }
+
+    def limiter_for(self, method: str, path: str) -> Optional[GroupLimiter]:
+        return self.limiters.get(classify(method, path))
+
+
+admission_controller = AdmissionController(settings.ADMISSION_GROUPS)
+
+
+class AdmissionMiddleware:
+    """
+    Per-route-group concurrency limits in front of the threadpool, so a slow
+    database backs up exports and writes without taking logins and cheap
+    reads down with them. Rejected requests get a 503 with Retry-After.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        # sub-requests of POST /api/batch were admitted with the batch
+        if scope["type"] != "http" or "batch_user" in scope.get("state", {}):
+            await self.app(scope, receive, send)
+            return
+        limiter = self.controller.limiter_for(scope["method"], scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Overloaded as exc:
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry later"},
+                status_code=503,
+                headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.observe(time.monotonic() - start)
+            limiter.release()
@@ -0,0 +1,15 @@
+from app.core.config import settings
+from app.core.jobs import PeriodicJob
+
+
+def run_archive() -> int:
+    """One archiver pass over every shard, each with its own session."""
+    from app.crud import crud
+    from app.db.shards import shard_router
+
+    return sum(crud.archive_closed_issues(db) for _, db in shard_router.each_shard())
+
+
+archive_job = PeriodicJob(
+    "issue-archiver", settings.ARCHIVE_INTERVAL_SECONDS, run_archive
+)
@@ -0,0 +1,263 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db import models
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds {limit} bytes")
+        self.limit = limit
+
+
+def _write(out: BinaryIO, digest: Any, chunk: bytes) -> None:
+    digest.update(chunk)
+    out.write(chunk)
+
+
+def _discard(out: BinaryIO, tmp_path: str) -> None:
+    out.close()
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+
+
+class BlobStore:
+    """
+    Content-addressed files: the bytes with SHA-256 ``abcd...`` live at
+    ``<root>/ab/cd/abcd...``. Uploads are streamed into a temporary file
+    in ``<root>/tmp`` while being hashed, then renamed into place, or
+    dropped when an identical file is already stored.
+    """
+
+    def __init__(
+        self,
+        root: str = settings.ATTACHMENT_DIR,
+        grace: float = settings.ATTACHMENT_GC_GRACE_SECONDS,
+    ):
+        self.root = root
+        self.grace = grace
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    async def save(
+        self, chunks: AsyncIterator[bytes], max_bytes: int
+    ) -> Tuple[str, int]:
+        """
+        Store the stream; returns (sha256 hex, size in bytes). Only reading
+        the stream happens on the event loop: hashing and file work run in
+        the threadpool, so a large upload doesn't hold up other requests.
+        """
+        out, tmp_path = await run_in_threadpool(self._create_tmp)
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                await run_in_threadpool(_write, out, digest, chunk)
+            await run_in_threadpool(out.close)
+            key = digest.hexdigest()
+            await run_in_threadpool(self._store, tmp_path, key)
+            return key, size
+        finally:
+            await run_in_threadpool(_discard, out, tmp_path)
+
+    def _create_tmp(self) -> Tuple[BinaryIO, str]:
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        return os.fdopen(fd, "wb"), tmp_path
+
+    def _store(self, tmp_path: str, key: str) -> None:
+        target = self.path(key)
+        if os.path.exists(target):
+            # already stored; a fresh mtime keeps the collector off it
+            # until the new attachment row is committed
+            os.utime(target)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+
+    def collect_garbage(self, referenced: Set[str]) -> int:
+        """Delete files no attachment refers to, past the grace period."""
+        cutoff = time.time() - self.grace
+        removed = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name in referenced:
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.unlink(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+# --- metadata ---
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE}
+_TEXT_TYPES = ("text/", "application/json", "application/xml")
+
+
+def _jpeg_size(f) -> Optional[Tuple[int, int]]:
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xD8 or 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue  # markers without a length
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if code in _JPEG_SOF:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">xHH", data)
+            return width, height
+        f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+def extract_metadata(path: str, content_type: str) -> Dict[str, Any]:
+    """Image dimensions or text line counts, read from the file itself."""
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            width, height = struct.unpack(">II", head[16:24])
+            return {"kind": "image", "format": "png", "width": width, "height": height}
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            width, height = struct.unpack("<HH", head[6:10])
+            return {"kind": "image", "format": "gif", "width": width, "height": height}
+        if head.startswith(b"\xff\xd8"):
+            size = _jpeg_size(f)
+            if size is not None:
+                width, height = size
+                return {
+                    "kind": "image", "format": "jpeg", "width": width, "height": height
+                }
+        if head.startswith(b"%PDF-"):
+            return {"kind": "document", "format": "pdf"}
+        if content_type.startswith(_TEXT_TYPES):
+            f.seek(0)
+            lines = ends_with_newline = 0
+            for block in iter(lambda: f.read(settings.ATTACHMENT_CHUNK_SIZE), b""):
+                lines += block.count(b"\n")
+                ends_with_newline = block.endswith(b"\n")
+            if f.tell() and not ends_with_newline:
+                lines += 1
+            return {"kind": "text", "lines": lines}
+    return {"kind": "binary"}
+
+
+class MetadataExtractor:
+    """
+    Fills ``Attachment.meta`` on a small thread pool after the upload has
+    been answered. Attachments left without metadata by a restart are
+    picked up again by ``start``.
+    """
+
+    def __init__(
+        self,
+        store: BlobStore,
+        workers: int = settings.ATTACHMENT_METADATA_WORKERS,
+    ):
+        self.store = store
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Set[Future] = set()
+        self._lock = threading.Lock()
+
+    def submit(
+        self, project_id: int, attachment_id: int, digest: str, content_type: str
+    ) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="attachment-metadata"
+                )
+            future = self._executor.submit(
+                self._process, project_id, attachment_id, digest, content_type
+            )
+            self._futures.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._futures.discard(future)
+
+    def _process(
+        self, project_id: int, attachment_id: int, digest: str, content_type: str
+    ) -> None:
+        from app.db.shards import shard_router
+
+        try:
+            meta = extract_metadata(self.store.path(digest), content_type)
+        except Exception:
+            logger.exception("metadata extraction failed for %s", digest)
+            meta = {"kind": "unknown"}
+        table = models.Attachment.__table__
+        with shard_router.engine_for_project(project_id).begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.id == attachment_id)
+                .values(meta=json.dumps(meta))
+            )
+
+    def wait(self) -> None:
+        """Block until everything submitted so far has been processed."""
+        with self._lock:
+            pending = list(self._futures)
+        wait(pending)
+
+    def recover(self, engines: Iterable[Any]) -> int:
+        table = models.Attachment.__table__
+        queued = 0
+        for engine_ in engines:
+            with engine_.connect() as conn:
+                rows = conn.execute(
+                    select(
+                        table.c.project_id,
+                        table.c.id,
+                        table.c.sha256,
+                        table.c.content_type,
+                    ).where(table.c.meta.is_(None))
+                ).all()
+            for row in rows:
+                self.submit(*row)
+                queued += 1
+        return queued
+
+    def start(self) -> None:
+        from app.db.shards import shard_router
+
+        self.recover(shard_router.engines)
+
+    def stop(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+blob_store = BlobStore()
+metadata_extractor = MetadataExtractor(blob_store)
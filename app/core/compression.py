@@ -0,0 +1,183 @@
+import gzip
+import threading
+from typing import Callable, Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from app.core.config import settings
+
+try:  # optional: pip install brotli
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+try:  # optional: pip install zstandard
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    # mtime=0 keeps output deterministic, so cached variants compare equal
+    return gzip.compress(data, compresslevel=max(1, min(level, 9)), mtime=0)
+
+
+def _brotli(data: bytes, level: int) -> bytes:
+    return brotli.compress(data, quality=max(0, min(level, 11)))
+
+
+def _zstd(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=max(1, min(level, 22))).compress(data)
+
+
+# server preference order: best ratio / speed trade-off first
+CODECS: Dict[str, Callable[[bytes, int], bytes]] = {}
+if zstandard is not None:
+    CODECS["zstd"] = _zstd
+if brotli is not None:
+    CODECS["br"] = _brotli
+CODECS["gzip"] = _gzip
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the preferred codec the client accepts (q > 0), or None."""
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+
+    candidates = [
+        name for name in CODECS if accepted.get(name, accepted.get("*", 0.0)) > 0
+    ]
+    if not candidates:
+        return None
+    # highest q wins; ties go to server preference (CODECS order)
+    return max(
+        candidates, key=lambda name: accepted.get(name, accepted.get("*", 0.0))
+    )
+
+
+def compress(
+    data: bytes, encoding: str, level: int = settings.COMPRESSION_LEVEL
+) -> bytes:
+    return CODECS[encoding](data, level)
+
+
+class PrecompressedBody:
+    """
+    A cached response body plus its compressed variants, built once per
+    encoding on first use. Serving a cache hit then costs no compression.
+    """
+
+    def __init__(
+        self,
+        body: bytes,
+        media_type: str = "application/json",
+        level: int = settings.COMPRESSION_LEVEL,
+        minimum_size: int = settings.COMPRESSION_MINIMUM_SIZE,
+    ):
+        self.body = body
+        self.media_type = media_type
+        self.level = level
+        self.minimum_size = minimum_size
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def variant(self, encoding: str) -> bytes:
+        with self._lock:
+            data = self._variants.get(encoding)
+            if data is None:
+                data = compress(self.body, encoding, self.level)
+                self._variants[encoding] = data
+            return data
+
+    def response(
+        self,
+        accept_encoding: Optional[str],
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Response:
+        headers = dict(headers or {})
+        headers["Vary"] = "Accept-Encoding"
+        encoding = None
+        if settings.COMPRESSION_ENABLED and len(self.body) >= self.minimum_size:
+            encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            return Response(self.body, status_code, headers, self.media_type)
+        headers["Content-Encoding"] = encoding
+        return Response(self.variant(encoding), status_code, headers, self.media_type)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated zstd / br / gzip compression for complete (non-streamed)
+    responses of at least ``minimum_size`` bytes. Responses that already
+    carry a Content-Encoding (e.g. PrecompressedBody) pass through as-is.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = settings.COMPRESSION_MINIMUM_SIZE,
+        level: int = settings.COMPRESSION_LEVEL,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or start["status"] in (204, 206, 304)
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                # streamed, small, already encoded or binary: send untouched
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding, self.level)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,6 +9,145 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 1 day
 
+    # activity log writer: max seconds an entry may wait in memory,
+    # entries per batched insert, and whether shutdown drains the buffer.
+    # While the database is unreachable at most ACTIVITY_MAX_BUFFERED
+    # entries are kept; the oldest are dropped beyond that.
+    ACTIVITY_FLUSH_INTERVAL_SECONDS: float = 1.0
+    ACTIVITY_BATCH_SIZE: int = 200
+    ACTIVITY_FLUSH_ON_SHUTDOWN: bool = True
+    ACTIVITY_MAX_BUFFERED: int = 10000
+
+    # Idempotency-Key replay window and in-process front cache size
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_CACHE_SIZE: int = 1024
+
+    # archive tier: closed issues untouched for this long move to
+    # archived_issues / archived_comments, ARCHIVE_BATCH_SIZE per transaction
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_CLOSED_AFTER_DAYS: int = 30
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_INTERVAL_SECONDS: float = 60 * 60
+
+    # purge job: finishes deleted projects and drops archived issues older
+    # than ARCHIVE_RETENTION_DAYS (0 keeps them forever), PURGE_CHUNK_SIZE
+    # rows per transaction with an optional pause between chunks
+    PURGE_INTERVAL_SECONDS: float = 5 * 60
+    PURGE_CHUNK_SIZE: int = 1000
+    PURGE_CHUNK_PAUSE_SECONDS: float = 0.0
+    ARCHIVE_RETENTION_DAYS: int = 0
+
+    # response compression (zstd / br when their packages are installed,
+    # gzip always); bodies under the minimum size are sent as-is
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_LEVEL: int = 6
+
+    # POST /api/batch
+    BATCH_MAX_REQUESTS: int = 20
+
+    # token buckets per route name, keyed by user and by project id;
+    # specs are "<count>/<second|minute|hour>". RATE_LIMIT_BACKEND is
+    # "memory" (per worker) or "sqlite:///path" (shared by local workers)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMITS: Dict[str, Dict[str, str]] = {
+        "list_issues": {"user": "120/minute", "project": "600/minute"},
+        "create_comment": {"user": "30/minute", "project": "300/minute"},
+    }
+
+    # admission control: concurrent requests per route group and how long
+    # a request may queue for a slot before it is shed with a 503
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_GROUPS: Dict[str, Dict[str, float]] = {
+        "auth": {"concurrency": 6, "queue_timeout": 2.0},
+        "reads": {"concurrency": 14, "queue_timeout": 1.0},
+        "batch": {"concurrency": 6, "queue_timeout": 1.0},
+        "writes": {"concurrency": 10, "queue_timeout": 2.0},
+        "exports": {"concurrency": 2, "queue_timeout": 0.5},
+    }
+
+    # cross-worker cache invalidation: workers poll the invalidations table
+    # this often; entries also expire after the TTL as a backstop
+    INVALIDATION_POLL_INTERVAL_SECONDS: float = 0.5
+    INVALIDATION_RETENTION_SECONDS: float = 10 * 60
+    # how long an id skipped by a poll (its transaction still open) is
+    # waited for before it is taken to be rolled back
+    INVALIDATION_GAP_TIMEOUT_SECONDS: float = 30
+    INVALIDATION_CACHE_TTL_SECONDS: float = 60
+    INVALIDATION_CACHE_SIZE: int = 10000
+
+    # project sharding: DATABASE_URL keeps users and the project directory;
+    # projects and everything under them live on one of these databases
+    # (empty: DATABASE_URL is the only shard). Issue and comment ids are
+    # handed out in blocks so they stay unique across shards.
+    SHARD_DATABASE_URLS: List[str] = []
+    SHARD_ID_BLOCK_SIZE: int = 100
+
+    # duplicate detection: per-project title index kept in memory for at
+    # most SIMILARITY_MAX_PROJECTS projects; matches below the threshold
+    # (trigram Jaccard, 0..1) are not reported
+    SIMILARITY_THRESHOLD: float = 0.4
+    SIMILARITY_MAX_RESULTS: int = 5
+    SIMILARITY_MAX_PROJECTS: int = 256
+
+    # notifications: inbox rows are buffered and inserted in batches like
+    # the activity log; at most this many @mentions per comment are resolved
+    NOTIFICATION_FLUSH_INTERVAL_SECONDS: float = 1.0
+    NOTIFICATION_BATCH_SIZE: int = 200
+    NOTIFICATION_MAX_MENTIONS: int = 20
+
+    # outbound webhooks: the dispatcher polls the outbox this often and
+    # posts up to WEBHOOK_BATCH_SIZE events per request, with at most
+    # WEBHOOK_MAX_IN_FLIGHT requests per subscription (per worker) and
+    # WEBHOOK_WORKERS in total. Failed batches are retried with exponential
+    # backoff; delivered rows are kept for WEBHOOK_RETENTION_SECONDS.
+    # URLs whose host resolves to a loopback, private or link-local address
+    # are refused unless WEBHOOK_ALLOW_PRIVATE_URLS is set.
+    WEBHOOK_ENABLED: bool = True
+    WEBHOOK_POLL_INTERVAL_SECONDS: float = 1.0
+    WEBHOOK_WORKERS: int = 8
+    WEBHOOK_BATCH_SIZE: int = 50
+    WEBHOOK_MAX_IN_FLIGHT: int = 2
+    WEBHOOK_TIMEOUT_SECONDS: float = 5.0
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_BACKOFF_BASE_SECONDS: float = 2.0
+    WEBHOOK_BACKOFF_MAX_SECONDS: float = 15 * 60
+    WEBHOOK_LEASE_SECONDS: float = 60
+    WEBHOOK_RETENTION_SECONDS: float = 7 * 24 * 60 * 60
+    WEBHOOK_ALLOW_PRIVATE_URLS: bool = False
+
+    # issue attachments: files are stored once per SHA-256 under
+    # ATTACHMENT_DIR; uploads over the per-file limit or the project quota
+    # are refused. Unreferenced files are deleted by the purge job once
+    # they are older than the grace period (an upload may still be
+    # committing).
+    ATTACHMENT_DIR: str = "./attachments"
+    ATTACHMENT_CHUNK_SIZE: int = 256 * 1024
+    ATTACHMENT_MAX_BYTES: int = 25 * 1024 * 1024
+    ATTACHMENT_PROJECT_QUOTA_BYTES: int = 1024 * 1024 * 1024
+    ATTACHMENT_METADATA_WORKERS: int = 2
+    ATTACHMENT_GC_GRACE_SECONDS: float = 60 * 60
+
+    # saved views: matching issue ids are maintained as issues are written;
+    # a view whose last full recompute is older than this is recomputed
+    # before it is read, which bounds drift from writes made elsewhere
+    SAVED_VIEW_MAX_STALENESS_SECONDS: float = 15 * 60
+    SAVED_VIEWS_PER_PROJECT: int = 50
+
+    # issue time series: status/priority transitions are folded into daily
+    # per-project stats every ROLLUP_INTERVAL_SECONDS, ROLLUP_BATCH_SIZE
+    # transitions per transaction
+    ROLLUP_INTERVAL_SECONDS: float = 60
+    ROLLUP_BATCH_SIZE: int = 1000
+    TIMESERIES_MAX_DAYS: int = 366
+
+    # startup (create_app's lifespan): create missing tables, for
+    # installs without a separately managed schema, and open this many
+    # pooled connections per database before serving
+    DB_CREATE_SCHEMA: bool = True
+    DB_POOL_PREWARM: int = 4
+
     model_config = {
         "env_file": ".env"
     }
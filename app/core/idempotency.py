@@ -0,0 +1,243 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.compression import PrecompressedBody
+from app.core.config import settings
+from app.db import models
+
+# (fingerprint, status_code, serialised body, stored at); status and body
+# are None while the key's request is still running
+_Entry = Tuple[str, Optional[int], Optional[PrecompressedBody], float]
+
+_IN_PROGRESS = "A request with this Idempotency-Key is still in progress"
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Stable hash of whatever identifies a request (route, ids, payload)."""
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Remembers the response to each (user, Idempotency-Key) so a retried POST
+    gets the original result back instead of creating a second row. A key is
+    claimed in the same transaction as the row its request creates. Entries
+    live in the idempotency_keys table for ``ttl`` seconds, with a small LRU
+    in front so hot retries never reach the database.
+    """
+
+    def __init__(
+        self,
+        ttl: int = settings.IDEMPOTENCY_TTL_SECONDS,
+        cache_size: int = settings.IDEMPOTENCY_CACHE_SIZE,
+    ):
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[int, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def _cache_get(self, cache_key: Tuple[int, str]) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is None:
+                return None
+            if time.time() - entry[3] > self.ttl:
+                del self._cache[cache_key]
+                return None
+            self._cache.move_to_end(cache_key)
+            return entry
+
+    def _cache_put(self, cache_key: Tuple[int, str], entry: _Entry) -> None:
+        with self._lock:
+            self._cache[cache_key] = entry
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.time() - entry[3] > self.ttl
+
+    def _lookup(self, db: Session, user_id: int, key: str) -> Optional[_Entry]:
+        """The key's entry, expired or not; only finished ones are cached."""
+        entry = self._cache_get((user_id, key))
+        if entry is not None:
+            return entry
+
+        row = (
+            db.query(models.IdempotencyKey)
+            .filter(
+                models.IdempotencyKey.user_id == user_id,
+                models.IdempotencyKey.key == key,
+            )
+            .first()
+        )
+        if row is None:
+            return None
+        stored_at = (row.created_at - datetime(1970, 1, 1)).total_seconds()
+        if row.response_body is None:
+            # claimed by a request that hasn't finished (or never will)
+            return (row.fingerprint, None, None, stored_at)
+        body = PrecompressedBody(row.response_body.encode())
+        entry = (row.fingerprint, row.status_code, body, stored_at)
+        if not self._expired(entry):
+            self._cache_put((user_id, key), entry)
+        return entry
+
+    def _respond(
+        self, entry: _Entry, fingerprint: str, accept_encoding: Optional[str]
+    ) -> Response:
+        if entry[0] != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used for a different request",
+            )
+        if entry[2] is None:
+            raise HTTPException(status_code=409, detail=_IN_PROGRESS)
+        return entry[2].response(
+            accept_encoding, entry[1], {"Idempotent-Replayed": "true"}
+        )
+
+    def replay(
+        self,
+        db: Session,
+        user_id: int,
+        key: Optional[str],
+        fingerprint: str,
+        accept_encoding: Optional[str] = None,
+    ) -> Optional[Response]:
+        """
+        Return the stored response for ``key``, or None if this is the first
+        time it is seen. Reusing a key for a different request is a 422, and
+        a key whose request is still running is a 409. The body is served
+        precompressed when the client accepts it.
+        """
+        if not key:
+            return None
+        entry = self._lookup(db, user_id, key)
+        if entry is None or self._expired(entry):
+            return None
+        return self._respond(entry, fingerprint, accept_encoding)
+
+    def claim(
+        self,
+        db: Session,
+        user_id: int,
+        key: Optional[str],
+        fingerprint: str,
+        accept_encoding: Optional[str] = None,
+    ) -> Optional[Response]:
+        """
+        Like ``replay``, but a first-time key is also reserved: a pending row
+        is added to ``db``, so it is written and committed together with
+        whatever the request creates. A concurrent request with the same key
+        then fails that flush with an IntegrityError; pass it to ``conflict``.
+        If the process dies between that commit and ``save``, retries get a
+        409 until the key expires; they never create a second row.
+        """
+        if not key:
+            return None
+        entry = self._lookup(db, user_id, key)
+        if entry is not None:
+            if not self._expired(entry):
+                return self._respond(entry, fingerprint, accept_encoding)
+            # not purged yet; cleared in a transaction of its own so the
+            # request's writes don't queue behind it
+            db.query(models.IdempotencyKey).filter(
+                models.IdempotencyKey.user_id == user_id,
+                models.IdempotencyKey.key == key,
+            ).delete(synchronize_session=False)
+            db.commit()
+        db.add(
+            models.IdempotencyKey(
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+                created_at=datetime.utcnow(),
+            )
+        )
+        return None
+
+    def conflict(
+        self,
+        db: Session,
+        user_id: int,
+        key: Optional[str],
+        fingerprint: str,
+        error: IntegrityError,
+        accept_encoding: Optional[str] = None,
+    ) -> Response:
+        """
+        Answer a request whose claimed write failed with ``error`` (and has
+        been rolled back) with the response of the concurrent request that
+        took the key first, or a 409 if it is still running. Re-raises
+        ``error`` if the key is still free, as the failure was about
+        something else.
+        """
+        response = self.replay(db, user_id, key, fingerprint, accept_encoding)
+        if response is None:
+            raise error
+        return response
+
+    def save(
+        self,
+        db: Session,
+        user_id: int,
+        key: Optional[str],
+        fingerprint: str,
+        body: Any,
+        status_code: int = 200,
+    ) -> None:
+        """Fill in the response of a key reserved by ``claim``."""
+        if not key:
+            return
+        serialised = json.dumps(body, separators=(",", ":"))
+        db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.user_id == user_id,
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.fingerprint == fingerprint,
+        ).update(
+            {
+                models.IdempotencyKey.status_code: status_code,
+                models.IdempotencyKey.response_body: serialised,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+        stored_at = time.time()
+        body = PrecompressedBody(serialised.encode())
+        self._cache_put((user_id, key), (fingerprint, status_code, body, stored_at))
+        self.purge_expired(db)
+
+    def purge_expired(self, db: Session, force: bool = False) -> int:
+        """Delete expired rows; runs at most once a minute unless forced."""
+        now = time.time()
+        if not force and now - self._last_purge < 60:
+            return 0
+        self._last_purge = now
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        deleted = (
+            db.query(models.IdempotencyKey)
+            .filter(models.IdempotencyKey.created_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+
+
+idempotency_store = IdempotencyStore()
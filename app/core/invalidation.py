@@ -0,0 +1,215 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+
+logger = logging.getLogger(__name__)
+
+Subscriber = Callable[[int, Optional[int]], None]
+
+
+class LocalCache:
+    """
+    Per-process cache whose entries are grouped by tag (usually an entity
+    id), so one invalidation message drops them all. ``ttl`` bounds how stale
+    an entry can get should invalidation messages stop arriving.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float = settings.INVALIDATION_CACHE_TTL_SECONDS,
+        max_size: int = settings.INVALIDATION_CACHE_SIZE,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[Hashable, Tuple[Any, float, Hashable]] = {}
+        self._tags: Dict[Hashable, Set[Hashable]] = defaultdict(set)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, tag: Hashable, key: Hashable, loader: Callable[[], Any]):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                return entry[0]
+            generation = self._generation
+
+        value = loader()
+        with self._lock:
+            # an invalidation that arrived while we were loading may
+            # describe a write our read missed: don't cache the result
+            if self._generation == generation:
+                if len(self._entries) >= self.max_size:
+                    self._clear()
+                self._entries[key] = (value, now, tag)
+                self._tags[tag].add(key)
+        return value
+
+    def invalidate(self, tag: Hashable) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in self._tags.pop(tag, ()):
+                self._entries.pop(key, None)
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class InvalidationBus:
+    """
+    Publishes (entity, id, version) messages through the invalidations table
+    and applies everyone's messages to this process's subscribers. Publishing
+    also applies locally at once; other workers catch up on their next poll,
+    so entries are dropped everywhere within ``poll_interval`` seconds of the
+    commit.
+
+    Ids are taken at insert but become visible at commit, so a poll can see
+    id 12 before id 11 commits. Ids skipped like that are asked for again on
+    every poll for ``gap_timeout`` seconds (after which they are taken to be
+    rolled back; the caches' TTL covers anything slower).
+    """
+
+    def __init__(
+        self,
+        bind=None,
+        poll_interval: float = settings.INVALIDATION_POLL_INTERVAL_SECONDS,
+        retention: float = settings.INVALIDATION_RETENTION_SECONDS,
+        gap_timeout: float = settings.INVALIDATION_GAP_TIMEOUT_SECONDS,
+        max_gaps: int = 1000,
+    ):
+        self._bind = bind
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.gap_timeout = gap_timeout
+        self.max_gaps = max_gaps
+        self._subscribers: Dict[str, List[Subscriber]] = defaultdict(list)
+        self._last_ids: Dict[Any, int] = {}
+        # per bind: ids below the watermark not seen yet -> when first missed
+        self._gaps: Dict[Any, Dict[int, float]] = defaultdict(dict)
+        self._last_prune = 0.0
+        self._poll_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def binds(self) -> List[Any]:
+        """Every database messages can be published to (one per shard)."""
+        if self._bind is not None:
+            return [self._bind]
+        from app.db.shards import shard_router
+
+        return shard_router.all_engines()
+
+    def subscribe(self, entity: str, callback: Subscriber) -> None:
+        self._subscribers[entity].append(callback)
+
+    def publish(
+        self, db: Session, entity: str, entity_id: int, version: Optional[int] = None
+    ) -> None:
+        """Queue a message in ``db``'s transaction; it is sent on commit."""
+        db.add(models.Invalidation(entity=entity, entity_id=entity_id, version=version))
+        self._apply(entity, entity_id, version)
+
+    def _apply(self, entity: str, entity_id: int, version: Optional[int]) -> None:
+        for callback in self._subscribers.get(entity, ()):
+            callback(entity_id, version)
+
+    def poll(self) -> int:
+        """Apply messages published since the last poll; returns how many."""
+        table = models.Invalidation.__table__
+        applied = 0
+        with self._poll_lock:
+            for bind in self.binds:
+                with bind.connect() as conn:
+                    last_id = self._last_ids.get(bind)
+                    if last_id is None:
+                        # only messages published after we started matter
+                        self._last_ids[bind] = conn.execute(
+                            select(func.coalesce(func.max(table.c.id), 0))
+                        ).scalar()
+                        continue
+                    gaps = self._gaps[bind]
+                    wanted = table.c.id > last_id
+                    if gaps:
+                        wanted = wanted | table.c.id.in_(list(gaps))
+                    columns = (table.c.id, table.c.entity, table.c.entity_id)
+                    rows = conn.execute(
+                        select(*columns, table.c.version)
+                        .where(wanted)
+                        .order_by(table.c.id)
+                    ).all()
+                now = time.monotonic()
+                for row in rows:
+                    self._apply(row.entity, row.entity_id, row.version)
+                    if gaps.pop(row.id, None) is not None:
+                        continue
+                    missed = range(last_id + 1, row.id)
+                    # past max_gaps (a mass rollback?) the TTL has to do
+                    if len(gaps) + len(missed) <= self.max_gaps:
+                        gaps.update(dict.fromkeys(missed, now))
+                    last_id = self._last_ids[bind] = row.id
+                for gap_id, missed_at in list(gaps.items()):
+                    if now - missed_at > self.gap_timeout:
+                        del gaps[gap_id]
+                applied += len(rows)
+        self._prune()
+        return applied
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+        table = models.Invalidation.__table__
+        for bind in self.binds:
+            with bind.begin() as conn:
+                conn.execute(delete(table).where(table.c.created_at < cutoff))
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self.poll()
+            except Exception:
+                # e.g. database briefly unavailable; try again next tick
+                logger.exception("invalidation poll failed")
+            self._stopping.wait(self.poll_interval)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self.poll()  # remember where the log is before serving requests
+        self._thread = threading.Thread(
+            target=self._run, name="invalidation-bus", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,42 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """
+    Runs ``fn`` on a daemon thread every ``interval`` seconds until stopped.
+    Errors are logged and the job carries on at the next tick.
+    """
+
+    def __init__(self, name: str, interval: float, fn: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> object:
+        return self.fn()
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            try:
+                self.fn()
+            except Exception:
+                logger.exception("periodic job %s failed", self.name)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,255 @@
+"""
+A small Markdown renderer for issue descriptions and comments.
+
+Supports paragraphs (single newlines become <br>), ATX headings, fenced
+code blocks, block quotes, bullet and numbered lists (nested by
+indentation), horizontal rules, and inline code, emphasis, strong,
+strikethrough, links, images and bare URLs. Raw HTML is never passed
+through: all text is escaped, and only http(s), mailto and relative URLs
+are turned into links or images. Anything else renders as plain text.
+
+Inline rules are written so a failed match stops at the next delimiter
+of its kind, which keeps rendering linear in the length of the text.
+Sources longer than MAX_SOURCE_LENGTH are not parsed at all; the API
+refuses them on write.
+
+Bump RENDERER_VERSION whenever the output for some input changes; stored
+HTML from older versions is re-rendered the next time it is read.
+"""
+import html
+import re
+from typing import List, Optional
+
+RENDERER_VERSION = 3
+
+MAX_SOURCE_LENGTH = 65536
+
+_MAX_DEPTH = 8  # nested quotes / lists beyond this render as paragraphs
+
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})\s*([\w+-]*)")
+_HEADING = re.compile(r"^ {0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+_RULE = re.compile(r"^ {0,3}([-*_])(\s*\1){2,}\s*$")
+_QUOTE = re.compile(r"^ {0,3}> ?")
+_ITEM = re.compile(r"^( *)([-*+]|\d{1,9}[.)])\s+(.*)$")
+
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+_ESCAPED = re.compile(r"\\([\\`*_{}\[\]()#+\-.!~>|])")
+_CODE_SPAN = re.compile(r"(`+)(.+?)\1", re.S)
+_TARGET = r"\(\s*((?:[^\s()]|\([^\s()]*\))+)(?:\s+\"[^\"]*\")?\s*\)"
+_IMAGE = re.compile(r"!\[([^\[\]]*)\]" + _TARGET)
+_LINK = re.compile(r"\[([^\[\]]+)\]" + _TARGET)
+_BARE_URL = re.compile(r"(?<![\w/])(https?://[^\s<>\"']+[^\s<>\"'.,;:!?)\]])")
+# the text between delimiters can't contain the delimiter itself
+_STRONG = re.compile(
+    r"\*\*(?=\S)((?:[^*]|\*(?!\*))+?)(?<=\S)\*\*"
+    r"|__(?=\S)((?:[^_]|_(?!_))+?)(?<=\S)__"
+)
+_EMPHASIS = re.compile(r"(?<![\w*])\*(?=[^\s*])([^*]+?)(?<=[^\s*])\*(?![\w*])")
+_UNDERSCORE = re.compile(r"(?<!\w)_(?=[^\s_])([^_]+?)(?<=[^\s_])_(?!\w)")
+_STRIKE = re.compile(r"~~(?=\S)((?:[^~]|~(?!~))+?)(?<=\S)~~")
+_SAFE_URL = re.compile(r"^(https?://|mailto:|/(?![/\\])|#|\./|\.\./)", re.I)
+
+
+def _attr(value: str) -> str:
+    return html.escape(value, quote=True)
+
+
+def _safe_url(url: str) -> bool:
+    # browsers treat a backslash as "/", so /\host would be protocol-relative
+    return (
+        bool(_SAFE_URL.match(url))
+        and not any(ord(c) < 32 for c in url)
+        and (url.lower().startswith(("http://", "https://")) or "\\" not in url)
+    )
+
+
+def render_inline(text: str) -> str:
+    # spans that must not be touched by later rules are swapped for
+    # \x00N\x00 placeholders and put back at the end. ``plain`` holds each
+    # span's source text, for attributes, where markup doesn't belong.
+    stash: List[str] = []
+    plain: List[str] = []
+
+    def keep(fragment: str, source: str = "") -> str:
+        stash.append(fragment)
+        plain.append(source)
+        return f"\x00{len(stash) - 1}\x00"
+
+    def unstash_plain(value: str) -> str:
+        return _PLACEHOLDER.sub(lambda m: plain[int(m.group(1))], value)
+
+    text = text.replace("\x00", "")
+    text = _ESCAPED.sub(lambda m: keep(html.escape(m.group(1)), m.group(1)), text)
+    text = _CODE_SPAN.sub(
+        lambda m: keep(
+            f"<code>{html.escape(m.group(2).strip())}</code>", m.group(2).strip()
+        ),
+        text,
+    )
+
+    def image(m: re.Match) -> str:
+        alt, url = unstash_plain(m.group(1)), unstash_plain(m.group(2))
+        if not _safe_url(url):
+            return keep(html.escape(m.group(0)))
+        return keep(f'<img src="{_attr(url)}" alt="{_attr(alt)}" loading="lazy">')
+
+    def link(m: re.Match) -> str:
+        label, url = m.group(1), unstash_plain(m.group(2))
+        if not _safe_url(url):
+            return keep(html.escape(label))
+        return keep(
+            f'<a href="{_attr(url)}" rel="nofollow noopener">'
+            f"{_emphasis(html.escape(label))}</a>"
+        )
+
+    def bare(m: re.Match) -> str:
+        url = unstash_plain(m.group(1))
+        return keep(
+            f'<a href="{_attr(url)}" rel="nofollow noopener">{html.escape(url)}</a>'
+        )
+
+    text = _IMAGE.sub(image, text)
+    text = _LINK.sub(link, text)
+    text = _BARE_URL.sub(bare, text)
+    text = _emphasis(html.escape(text, quote=False))
+    while "\x00" in text:
+        text = _PLACEHOLDER.sub(lambda m: stash[int(m.group(1))], text)
+    return text
+
+
+def _emphasis(text: str) -> str:
+    text = _STRONG.sub(
+        lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text
+    )
+    text = _EMPHASIS.sub(lambda m: f"<em>{m.group(1)}</em>", text)
+    text = _UNDERSCORE.sub(lambda m: f"<em>{m.group(1)}</em>", text)
+    return _STRIKE.sub(lambda m: f"<del>{m.group(1)}</del>", text)
+
+
+def _dedent(lines: List[str], width: int) -> List[str]:
+    return [line[width:] if line[:width].isspace() else line.lstrip() for line in lines]
+
+
+def _render_list(lines: List[str], start: int, depth: int):
+    """Render the list starting at ``lines[start]``; returns (html, next index)."""
+    first = _ITEM.match(lines[start])
+    indent = len(first.group(1))
+    ordered = first.group(2)[0].isdigit()
+    items: List[List[str]] = []
+    i = start
+    while i < len(lines):
+        match = _ITEM.match(lines[i])
+        if match and len(match.group(1)) == indent:
+            if match.group(2)[0].isdigit() != ordered:
+                break
+            items.append([match.group(3)])
+            i += 1
+            continue
+        line = lines[i]
+        if not line.strip():
+            # a blank line ends the list unless an item or indented
+            # continuation follows
+            following = next((l for l in lines[i + 1:] if l.strip()), "")
+            following_indent = len(following) - len(following.lstrip())
+            if following_indent <= indent and not (
+                _ITEM.match(following) and following_indent == indent
+            ):
+                break
+            items[-1].append("")
+        elif len(line) - len(line.lstrip()) <= indent and (
+            _ITEM.match(line) or _FENCE.match(line) or _HEADING.match(line)
+        ):
+            break
+        else:
+            items[-1].append(line)
+        i += 1
+
+    tag = "ol" if ordered else "ul"
+    attrs = ""
+    if ordered and first.group(2)[:-1] != "1":
+        attrs = f' start="{int(first.group(2)[:-1])}"'
+    rendered = []
+    for item in items:
+        body = _render_blocks([item[0]] + _dedent(item[1:], indent + 2), depth + 1)
+        # tight items: a lone paragraph is shown without <p>
+        if body.startswith("<p>") and body.count("<p>") == 1:
+            body = body[3:].replace("</p>", "", 1)
+        rendered.append(f"<li>{body}</li>")
+    return f"<{tag}{attrs}>\n" + "\n".join(rendered) + f"\n</{tag}>", i
+
+
+def _render_blocks(lines: List[str], depth: int = 0) -> str:
+    out: List[str] = []
+    paragraph: List[str] = []
+
+    def flush() -> None:
+        if paragraph:
+            body = "<br>\n".join(render_inline(line.strip()) for line in paragraph)
+            out.append(f"<p>{body}</p>")
+            paragraph.clear()
+
+    nested = depth < _MAX_DEPTH
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        fence = _FENCE.match(line)
+        if fence:
+            flush()
+            marker = fence.group(1)
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(marker):
+                code.append(lines[i])
+                i += 1
+            i += 1  # closing fence (or end of text)
+            language = fence.group(2)
+            attrs = f' class="language-{_attr(language)}"' if language else ""
+            out.append(
+                f"<pre><code{attrs}>" + html.escape("\n".join(code)) + "</code></pre>"
+            )
+            continue
+        if not line.strip():
+            flush()
+            i += 1
+            continue
+        heading = _HEADING.match(line)
+        if heading:
+            flush()
+            level = len(heading.group(1))
+            out.append(f"<h{level}>{render_inline(heading.group(2))}</h{level}>")
+            i += 1
+            continue
+        if _RULE.match(line):
+            flush()
+            out.append("<hr>")
+            i += 1
+            continue
+        if nested and _QUOTE.match(line):
+            flush()
+            quoted = []
+            while i < len(lines) and _QUOTE.match(lines[i]):
+                quoted.append(_QUOTE.sub("", lines[i], count=1))
+                i += 1
+            inner = _render_blocks(quoted, depth + 1)
+            out.append(f"<blockquote>\n{inner}\n</blockquote>")
+            continue
+        item = _ITEM.match(line) if nested else None
+        # only bullets and "1." may interrupt a paragraph
+        if item and (not paragraph or item.group(2) in ("-", "*", "+", "1.", "1)")):
+            flush()
+            rendered, i = _render_list(lines, i, depth)
+            out.append(rendered)
+            continue
+        paragraph.append(line)
+        i += 1
+    flush()
+    return "\n".join(out)
+
+
+def render(text: Optional[str]) -> Optional[str]:
+    """Sanitised HTML for Markdown ``text``; None stays None."""
+    if text is None:
+        return None
+    if len(text) > MAX_SOURCE_LENGTH:
+        return f"<pre>{html.escape(text)}</pre>"
+    return _render_blocks(text.replace("\r\n", "\n").replace("\r", "\n").split("\n"))
@@ -0,0 +1,99 @@
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import update
+
+from app.core.activity import ActivityWriter
+from app.core.config import settings
+from app.db import models
+
+# "@alice" (the local part of a member's email) or "@alice@example.com";
+# an "@" inside a word, as in a plain email address, is not a mention
+_MENTION = re.compile(
+    r"(?<![\w@.])@([a-z0-9][a-z0-9._+-]*(?:@[a-z0-9-]+(?:\.[a-z0-9-]+)+)?)",
+    re.IGNORECASE,
+)
+
+
+def mention_handles(
+    body: Optional[str], limit: int = settings.NOTIFICATION_MAX_MENTIONS
+) -> List[str]:
+    """Distinct lower-cased handles mentioned in ``body``, in order."""
+    handles: List[str] = []
+    for match in _MENTION.finditer(body or ""):
+        handle = match.group(1).lower().rstrip("._-")
+        if handle and handle not in handles:
+            handles.append(handle)
+            if len(handles) == limit:
+                break
+    return handles
+
+
+class NotificationWriter(ActivityWriter):
+    """
+    Buffers inbox entries and inserts them in batches into the global
+    database, bumping each recipient's unread counter in the same
+    transaction. A notification shows up in the inbox (and the count) at
+    most ``flush_interval`` seconds after the write that caused it.
+    """
+
+    thread_name = "notification-writer"
+
+    def __init__(
+        self,
+        bind=None,
+        flush_interval: float = settings.NOTIFICATION_FLUSH_INTERVAL_SECONDS,
+        batch_size: int = settings.NOTIFICATION_BATCH_SIZE,
+    ):
+        super().__init__(bind, flush_interval, batch_size)
+
+    def _group_by_bind(self, batch: List[Dict[str, Any]]):
+        if self._bind is not None:
+            return {self._bind: batch}
+        from app.db.shards import shard_router
+
+        return {shard_router.global_engine: batch}
+
+    def notify(
+        self,
+        *,
+        user_ids: Iterable[int],
+        kind: str,
+        project_id: int,
+        issue_id: int,
+        actor_id: Optional[int],
+        comment_id: Optional[int] = None,
+    ) -> None:
+        """Queue one entry per recipient; the actor is never notified."""
+        now = datetime.utcnow()
+        for user_id in sorted(set(user_ids) - {actor_id, None}):
+            self._append(
+                {
+                    "user_id": user_id,
+                    "kind": kind,
+                    "project_id": project_id,
+                    "issue_id": issue_id,
+                    "comment_id": comment_id,
+                    "actor_id": actor_id,
+                    "created_at": now,
+                    "read_at": None,
+                }
+            )
+
+    def _write(self, conn, rows: List[Dict[str, Any]]) -> None:
+        conn.execute(models.Notification.__table__.insert(), rows)
+        counters = models.NotificationCounter.__table__
+        for user_id, added in Counter(row["user_id"] for row in rows).items():
+            bumped = conn.execute(
+                update(counters)
+                .where(counters.c.user_id == user_id)
+                .values(unread=counters.c.unread + added)
+            )
+            if not bumped.rowcount:
+                # a concurrent first insert fails the batch, which is retried
+                conn.execute(counters.insert().values(user_id=user_id, unread=added))
+
+
+notification_writer = NotificationWriter()
@@ -0,0 +1,26 @@
+from app.core.attachments import blob_store
+from app.core.config import settings
+from app.core.jobs import PeriodicJob
+
+
+def run_purge() -> int:
+    """
+    Finish deleted projects, apply archive retention and delete attachment
+    files no longer referenced.
+    """
+    from app.crud import crud
+    from app.db.shards import shard_router
+
+    purged = 0
+    referenced = set()
+    for _, db in shard_router.each_shard():
+        purged += crud.purge_deleted_projects(db)
+        purged += crud.purge_expired_archive(db)
+        referenced |= crud.referenced_blobs(db)
+    # attachment files are shared by every shard: only delete the ones
+    # nothing refers to any more
+    blob_store.collect_garbage(referenced)
+    return purged
+
+
+purge_job = PeriodicJob("purger", settings.PURGE_INTERVAL_SECONDS, run_purge)
@@ -0,0 +1,197 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0}
+
+
+class Limit(NamedTuple):
+    rate: float  # tokens added per second
+    burst: int  # bucket size
+
+    @classmethod
+    def parse(cls, spec: str) -> "Limit":
+        """``"30/minute"`` -> 30 requests per minute, bursts of up to 30."""
+        count, _, period = spec.partition("/")
+        seconds = PERIODS[period.strip()]
+        return cls(rate=int(count) / seconds, burst=int(count))
+
+
+def _refill(
+    tokens: float, updated: float, limit: Limit, now: float
+) -> Tuple[float, Optional[float]]:
+    """
+    Take one token from a bucket last seen at ``updated``. Returns the new
+    token count and None, or the unchanged count and seconds to wait.
+    """
+    tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+    if tokens >= 1:
+        return tokens - 1, None
+    return tokens, (1 - tokens) / limit.rate
+
+
+class MemoryBackend:
+    """
+    Buckets in a dict; per process, so each worker enforces its own share.
+    A bucket that has refilled completely is the same as no bucket, so
+    those are swept out every ``sweep_interval`` seconds.
+    """
+
+    def __init__(self, sweep_interval: float = 60.0):
+        # key -> (tokens, updated, time the bucket is full again)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: str, limit: Limit, now: float) -> Optional[float]:
+        return self.acquire_all([(key, limit)], now)
+
+    def acquire_all(
+        self, buckets: Sequence[Tuple[str, Limit]], now: float
+    ) -> Optional[float]:
+        """
+        Take a token from every bucket, or from none of them; returns the
+        longest wait when any of them is empty.
+        """
+        with self._lock:
+            if now >= self._next_sweep:
+                self._buckets = {
+                    name: bucket
+                    for name, bucket in self._buckets.items()
+                    if bucket[2] > now
+                }
+                self._next_sweep = now + self.sweep_interval
+            taken: List[Tuple[str, Limit, float]] = []
+            waits: List[float] = []
+            for key, limit in buckets:
+                tokens, updated, _ = self._buckets.get(key, (limit.burst, now, now))
+                tokens, retry_after = _refill(tokens, updated, limit, now)
+                if retry_after is not None:
+                    waits.append(retry_after)
+                taken.append((key, limit, tokens))
+            if waits:
+                return max(waits)
+            for key, limit, tokens in taken:
+                full_at = now + (limit.burst - tokens) / limit.rate
+                self._buckets[key] = (tokens, now, full_at)
+        return None
+
+
+class SQLiteBackend:
+    """
+    Buckets in a SQLite file shared by every worker on the host, a local
+    stand-in for a networked store. Each acquire is one short write
+    transaction.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, key: str, limit: Limit, now: float) -> Optional[float]:
+        return self.acquire_all([(key, limit)], now)
+
+    def acquire_all(
+        self, buckets: Sequence[Tuple[str, Limit]], now: float
+    ) -> Optional[float]:
+        """Same as MemoryBackend.acquire_all, in one write transaction."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            taken: List[Tuple[str, float]] = []
+            waits: List[float] = []
+            for key, limit in buckets:
+                row = conn.execute(
+                    "SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, updated = row if row else (limit.burst, now)
+                tokens, retry_after = _refill(tokens, updated, limit, now)
+                if retry_after is not None:
+                    waits.append(retry_after)
+                taken.append((key, tokens))
+            if not waits:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) "
+                    "VALUES (?, ?, ?)",
+                    [(key, tokens, now) for key, tokens in taken],
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return max(waits) if waits else None
+
+
+def make_backend(url: str):
+    """``memory`` or ``sqlite:///path/to/file.db``."""
+    if url == "memory":
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    raise ValueError(f"Unknown rate limit backend: {url}")
+
+
+class RateLimiter:
+    """
+    Token buckets per route, keyed by user and (when the route has one) by
+    project. ``limits`` maps a route name to ``{"user": spec, "project": spec}``.
+    """
+
+    def __init__(self, backend, limits: Dict[str, Dict[str, str]]):
+        self.backend = backend
+        self.set_limits(limits)
+
+    def set_limits(self, limits: Dict[str, Dict[str, str]]) -> None:
+        self.limits = {
+            route: {scope: Limit.parse(spec) for scope, spec in scopes.items()}
+            for route, scopes in limits.items()
+        }
+
+    def check(
+        self, route: str, user_id: int, project_id: Optional[int] = None
+    ) -> Optional[float]:
+        """Seconds until the caller may retry, or None if allowed."""
+        scopes = self.limits.get(route)
+        if not scopes:
+            return None
+        # wall clock rather than monotonic: the shared backend compares
+        # timestamps written by other processes
+        now = time.time()
+        keys = {"user": f"{route}:u:{user_id}"}
+        if project_id is not None:
+            keys["project"] = f"{route}:p:{project_id}"
+
+        # both buckets are charged or neither is: a request either bucket
+        # rejects spends nothing from the other
+        buckets = [
+            (keys[scope], scopes[scope])
+            for scope in ("user", "project")
+            if scope in scopes and scope in keys
+        ]
+        return self.backend.acquire_all(buckets, now)
+
+
+rate_limiter = RateLimiter(
+    make_backend(settings.RATE_LIMIT_BACKEND), settings.RATE_LIMITS
+)
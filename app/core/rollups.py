@@ -0,0 +1,46 @@
+"""
+Daily per-project issue stats, folded from the transitions table.
+
+    python -m app.core.rollups [--project PROJECT_ID]
+
+backfills transitions for issues created before they were recorded
+(from the activity log) and rolls everything up; the roll-up job does the
+latter every ROLLUP_INTERVAL_SECONDS while the app runs.
+"""
+import argparse
+
+from app.core.config import settings
+from app.core.jobs import PeriodicJob
+
+
+def run_rollups() -> int:
+    """Fold pending transitions on every shard, each with its own session."""
+    from app.crud import crud
+    from app.db.shards import shard_router
+
+    return sum(crud.roll_up_transitions(db) for _, db in shard_router.each_shard())
+
+
+rollup_job = PeriodicJob("issue-rollups", settings.ROLLUP_INTERVAL_SECONDS, run_rollups)
+
+
+def main() -> None:
+    from app.crud import crud
+    from app.db.shards import shard_router
+
+    parser = argparse.ArgumentParser(
+        description="Backfill issue transitions and roll them up"
+    )
+    parser.add_argument("--project", type=int, help="only this project's issues")
+    args = parser.parse_args()
+
+    shard_router.create_all()
+    backfilled = sum(
+        crud.backfill_transitions(db, args.project)
+        for _, db in shard_router.each_shard()
+    )
+    print(f"backfilled {backfilled} transitions, rolled up {run_rollups()}")
+
+
+if __name__ == "__main__":
+    main()
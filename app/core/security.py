@@ -1,21 +1,27 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 
 SECRET_KEY = "supersecretkey123"  # change later
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache(maxsize=None)
+def pwd_context():
+    # built on first use: passlib is only needed by signup and login
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 
 def create_access_token(subject: str | int) -> str:
@@ -0,0 +1,240 @@
+import hashlib
+import re
+import struct
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+
+# MinHash signature of BANDS * ROWS values; two titles become candidates
+# when any band matches, i.e. with probability 1 - (1 - J**ROWS) ** BANDS
+# (~0.88 at Jaccard 0.5, ~0.2% at 0.05)
+BANDS = 16
+ROWS = 3
+_SLOTS = struct.Struct(f"<{BANDS * ROWS}I")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def trigrams(text: Optional[str]) -> FrozenSet[str]:
+    """Character trigrams of each lower-cased word, padded at both ends."""
+    grams = set()
+    for word in _WORD.findall((text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+@lru_cache(maxsize=65536)
+def _slot_hashes(gram: str) -> Tuple[int, ...]:
+    # BANDS * ROWS independent 32-bit hashes from one SHAKE digest; titles
+    # reuse a small vocabulary of trigrams, so most calls are cache hits
+    return _SLOTS.unpack(hashlib.shake_128(gram.encode()).digest(_SLOTS.size))
+
+
+def band_keys(grams: FrozenSet[str]) -> Tuple[int, ...]:
+    if not grams:
+        return ()
+    # MinHash signature: per slot, the minimum over every trigram's hash
+    signature = list(map(min, zip(*map(_slot_hashes, grams))))
+    return tuple(
+        hash(tuple(signature[band * ROWS : (band + 1) * ROWS])) for band in range(BANDS)
+    )
+
+
+class _Doc:
+    __slots__ = ("title", "title_grams", "description_grams", "keys")
+
+    def __init__(self, title: str, description: Optional[str]):
+        self.title = title
+        self.title_grams = trigrams(title)
+        self.description_grams = trigrams(description)
+        self.keys = band_keys(self.title_grams)
+
+
+class ProjectIndex:
+    """LSH buckets over one project's issue titles, plus trigram sets."""
+
+    def __init__(self, seq: int):
+        self.seq = seq  # change_log position the index reflects
+        self.docs: Dict[int, _Doc] = {}
+        self.buckets: List[Dict[int, Set[int]]] = [{} for _ in range(BANDS)]
+        self.lock = threading.Lock()
+
+    def put(
+        self,
+        issue_id: int,
+        title: str,
+        description: Optional[str],
+        overwrite: bool = True,
+    ) -> None:
+        doc = _Doc(title, description)
+        with self.lock:
+            if issue_id in self.docs:
+                if not overwrite:
+                    return
+                self._drop(issue_id)
+            self.docs[issue_id] = doc
+            for band, key in enumerate(doc.keys):
+                self.buckets[band].setdefault(key, set()).add(issue_id)
+
+    def remove(self, issue_id: int) -> None:
+        with self.lock:
+            self._drop(issue_id)
+
+    def _drop(self, issue_id: int) -> None:
+        doc = self.docs.pop(issue_id, None)
+        if doc is None:
+            return
+        for band, key in enumerate(doc.keys):
+            ids = self.buckets[band].get(key)
+            if ids is not None:
+                ids.discard(issue_id)
+                if not ids:
+                    del self.buckets[band][key]
+
+    def query(
+        self,
+        title: str,
+        description: Optional[str],
+        limit: int,
+        threshold: float,
+        exclude_id: Optional[int] = None,
+    ) -> List[Tuple[int, str, float]]:
+        title_grams = trigrams(title)
+        description_grams = trigrams(description)
+        keys = band_keys(title_grams)
+        with self.lock:
+            candidates = set()
+            for band, key in enumerate(keys):
+                candidates |= self.buckets[band].get(key, set())
+            candidates.discard(exclude_id)
+            scored = []
+            for issue_id in candidates:
+                doc = self.docs[issue_id]
+                score = jaccard(title_grams, doc.title_grams)
+                if description_grams and doc.description_grams:
+                    # a matching description makes a close title more likely
+                    # to be the same report, never less
+                    both = jaccard(description_grams, doc.description_grams)
+                    score = max(score, 0.7 * score + 0.3 * both)
+                if score >= threshold:
+                    scored.append((issue_id, doc.title, round(score, 3)))
+        scored.sort(key=lambda item: (-item[2], item[0]))
+        return scored[:limit]
+
+
+class SimilarityIndex:
+    """
+    Per-project duplicate finder over issue titles and descriptions. A
+    project's index is built on first use with one query and then kept up
+    to date by create/update/delete hooks; changes made by other workers
+    are replayed from the project's change log before each lookup, which
+    costs one primary-key read when nothing changed.
+    """
+
+    def __init__(self, max_projects: int = settings.SIMILARITY_MAX_PROJECTS):
+        self.max_projects = max_projects
+        self._projects: "OrderedDict[int, ProjectIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, project_id: int) -> Optional[ProjectIndex]:
+        with self._lock:
+            index = self._projects.get(project_id)
+            if index is not None:
+                self._projects.move_to_end(project_id)
+            return index
+
+    def _project(self, db: Session, project_id: int) -> ProjectIndex:
+        current = (
+            db.query(models.Project.change_seq)
+            .filter(models.Project.id == project_id)
+            .scalar()
+        ) or 0
+        index = self._cached(project_id)
+        if index is None:
+            index = ProjectIndex(seq=current)
+            with self._lock:
+                self._projects[project_id] = index
+                while len(self._projects) > self.max_projects:
+                    self._projects.popitem(last=False)
+            # hooks firing during the load win over what the load read
+            for issue_id, title, description in db.query(
+                models.Issue.id, models.Issue.title, models.Issue.description
+            ).filter(models.Issue.project_id == project_id):
+                index.put(issue_id, title, description, overwrite=False)
+        elif current > index.seq:
+            self._catch_up(db, project_id, index, current)
+        return index
+
+    def _catch_up(
+        self, db: Session, project_id: int, index: ProjectIndex, current: int
+    ) -> None:
+        last_op: Dict[int, str] = {}
+        for issue_id, op in (
+            db.query(models.ChangeLog.entity_id, models.ChangeLog.op)
+            .filter(
+                models.ChangeLog.project_id == project_id,
+                models.ChangeLog.seq > index.seq,
+                models.ChangeLog.entity == "issue",
+            )
+            .order_by(models.ChangeLog.seq)
+        ):
+            last_op[issue_id] = op
+        upserts = [i for i, op in last_op.items() if op == "upsert"]
+        # deleted or archived: either way no longer a hot issue
+        for issue_id in (i for i, op in last_op.items() if op != "upsert"):
+            index.remove(issue_id)
+        if upserts:
+            for issue_id, title, description in db.query(
+                models.Issue.id, models.Issue.title, models.Issue.description
+            ).filter(models.Issue.id.in_(upserts)):
+                index.put(issue_id, title, description)
+        index.seq = current
+
+    def add(self, issue: models.Issue) -> None:
+        """Hook for create/update; projects not loaded yet are skipped."""
+        index = self._cached(issue.project_id)
+        if index is not None:
+            index.put(issue.id, issue.title, issue.description)
+
+    def remove(self, project_id: int, issue_id: int) -> None:
+        index = self._cached(project_id)
+        if index is not None:
+            index.remove(issue_id)
+
+    def similar(
+        self,
+        db: Session,
+        project_id: int,
+        title: str,
+        description: Optional[str] = None,
+        limit: int = settings.SIMILARITY_MAX_RESULTS,
+        threshold: float = settings.SIMILARITY_THRESHOLD,
+        exclude_id: Optional[int] = None,
+    ) -> List[Dict[str, object]]:
+        index = self._project(db, project_id)
+        return [
+            {"id": issue_id, "title": issue_title, "score": score}
+            for issue_id, issue_title, score in index.query(
+                title, description, limit, threshold, exclude_id
+            )
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._projects.clear()
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,410 @@
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import random
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import and_, bindparam, delete, func, or_, select, update
+
+from app.core.config import settings
+from app.db import models
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+_outbox = models.WebhookOutbox.__table__
+_subscriptions = models.WebhookSubscription.__table__
+
+
+def backoff(attempts: int, base: float, cap: float) -> float:
+    """Delay before the next try after ``attempts`` failures, with jitter."""
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+def sign(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _check_address(host: str, address: str) -> None:
+    ip = ipaddress.ip_address(address.split("%")[0])
+    mapped = getattr(ip, "ipv4_mapped", None)
+    if mapped is not None:
+        ip = mapped
+    if not ip.is_global or ip.is_multicast:
+        raise ValueError(f"{host} resolves to a non-public address")
+
+
+def check_public_url(url: str) -> None:
+    """
+    Raise ValueError unless every address the host of ``url`` resolves to
+    is a public one, so a subscription can't point the server at loopback,
+    private networks or link-local metadata services.
+    """
+    host = urlsplit(url).hostname
+    if not host:
+        raise ValueError("URL has no host")
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as exc:
+        raise ValueError(f"Cannot resolve {host}: {exc}") from None
+    for *_, sockaddr in infos:
+        _check_address(host, sockaddr[0])
+
+
+def _public_peer(host: str):
+    """
+    httpx trace hook that refuses a new connection to a non-public peer
+    before anything is sent. It checks the address actually connected to,
+    so a name that resolves somewhere else since registration (or since a
+    lookup of our own) can't slip through.
+    """
+
+    def trace(event: str, info: Dict[str, Any]) -> None:
+        if event != "connection.connect_tcp.complete":
+            return
+        stream = info["return_value"]
+        try:
+            _check_address(host, stream.get_extra_info("server_addr")[0])
+        except ValueError:
+            stream.close()
+            raise
+
+    return trace
+
+
+def _retry_after(response: "httpx.Response") -> float:
+    try:
+        return float(response.headers.get("Retry-After", 0))
+    except ValueError:
+        return 0.0
+
+
+class WebhookDispatcher:
+    """
+    Delivers the webhook outbox. A poller thread claims due rows on every
+    shard, up to ``batch_size`` per request and ``max_in_flight`` requests
+    per subscription, and hands the batches to a pool of ``workers``
+    threads sharing one keep-alive HTTP client. Claims are leases: rows of
+    a worker that died become due again after ``lease`` seconds, so
+    delivery is at least once and receivers should dedupe on event id.
+    """
+
+    def __init__(
+        self,
+        engines: Optional[List[Any]] = None,
+        poll_interval: float = settings.WEBHOOK_POLL_INTERVAL_SECONDS,
+        workers: int = settings.WEBHOOK_WORKERS,
+        batch_size: int = settings.WEBHOOK_BATCH_SIZE,
+        max_in_flight: int = settings.WEBHOOK_MAX_IN_FLIGHT,
+        timeout: float = settings.WEBHOOK_TIMEOUT_SECONDS,
+        max_attempts: int = settings.WEBHOOK_MAX_ATTEMPTS,
+        backoff_base: float = settings.WEBHOOK_BACKOFF_BASE_SECONDS,
+        backoff_max: float = settings.WEBHOOK_BACKOFF_MAX_SECONDS,
+        lease: float = settings.WEBHOOK_LEASE_SECONDS,
+        retention: float = settings.WEBHOOK_RETENTION_SECONDS,
+        allow_private: bool = settings.WEBHOOK_ALLOW_PRIVATE_URLS,
+    ):
+        self._engines = engines
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self.retention = retention
+        self.allow_private = allow_private
+        self._in_flight: Dict[Tuple[Any, int], int] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._client: Optional["httpx.Client"] = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+
+    @property
+    def engines(self) -> List[Any]:
+        if self._engines is not None:
+            return self._engines
+        from app.db.shards import shard_router
+
+        return shard_router.engines
+
+    def _pool(self) -> Tuple[ThreadPoolExecutor, "httpx.Client"]:
+        # httpx is imported on first delivery, not when the app starts
+        import httpx
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="webhook-delivery"
+                )
+                self._client = httpx.Client(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.workers,
+                        max_keepalive_connections=self.workers,
+                    ),
+                )
+            return self._executor, self._client
+
+    # --- per-subscription concurrency ---
+    def _reserve(self, key: Tuple[Any, int]) -> bool:
+        with self._lock:
+            if self._in_flight.get(key, 0) >= self.max_in_flight:
+                return False
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            return True
+
+    def _release(self, key: Tuple[Any, int]) -> None:
+        with self._lock:
+            self._in_flight[key] -= 1
+            if not self._in_flight[key]:
+                del self._in_flight[key]
+        self._wakeup.set()  # the subscription may have more due rows
+
+    # --- polling ---
+    def run_once(self, wait: bool = False) -> int:
+        """
+        Claim and submit every batch there is capacity for; returns the
+        number of events claimed. With ``wait`` it also waits for those
+        deliveries to finish.
+        """
+        futures: List[Future] = []
+        claimed = 0
+        for engine_ in self.engines:
+            claimed += self._dispatch(engine_, futures)
+        self._prune()
+        if wait:
+            for future in futures:
+                future.result()
+        return claimed
+
+    def _dispatch(self, engine_, futures: List[Future]) -> int:
+        executor, _ = self._pool()
+        now = datetime.utcnow()
+        # the oldest due rows of every subscription, ranked per subscription
+        # so one large backlog can't fill the window and starve the rest
+        ranked = (
+            select(
+                _outbox.c.id,
+                _outbox.c.subscription_id,
+                func.row_number()
+                .over(partition_by=_outbox.c.subscription_id, order_by=_outbox.c.id)
+                .label("rank"),
+            )
+            .where(_outbox.c.delivered_at.is_(None), _outbox.c.next_attempt_at <= now)
+            .subquery()
+        )
+        with engine_.connect() as conn:
+            due = conn.execute(
+                select(ranked.c.id, ranked.c.subscription_id)
+                .where(ranked.c.rank <= self.batch_size * self.max_in_flight)
+                .order_by(ranked.c.id)
+            ).all()
+        by_subscription: Dict[int, List[int]] = {}
+        for row_id, subscription_id in due:
+            by_subscription.setdefault(subscription_id, []).append(row_id)
+
+        claimed = 0
+        for subscription_id, ids in by_subscription.items():
+            key = (engine_, subscription_id)
+            while ids and self._reserve(key):
+                batch, ids = ids[: self.batch_size], ids[self.batch_size :]
+                delivery = self._claim(engine_, subscription_id, batch)
+                if delivery is None:
+                    self._release(key)
+                    continue
+                claimed += len(delivery[3])
+                futures.append(executor.submit(self._deliver, engine_, key, *delivery))
+        return claimed
+
+    def _claim(self, engine_, subscription_id: int, ids: List[int]):
+        """Lease ``ids`` to this call; None when another worker took them all."""
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        expires = now + timedelta(seconds=self.lease)
+        with engine_.begin() as conn:
+            conn.execute(
+                update(_outbox)
+                .where(
+                    _outbox.c.id.in_(ids),
+                    _outbox.c.delivered_at.is_(None),
+                    _outbox.c.next_attempt_at <= now,
+                )
+                .values(claim=token, next_attempt_at=expires)
+            )
+            rows = conn.execute(
+                select(
+                    _outbox.c.id,
+                    _outbox.c.event,
+                    _outbox.c.payload,
+                    _outbox.c.created_at,
+                    _outbox.c.attempts,
+                )
+                .where(_outbox.c.id.in_(ids), _outbox.c.claim == token)
+                .order_by(_outbox.c.id)
+            ).all()
+            target = conn.execute(
+                select(_subscriptions.c.url, _subscriptions.c.secret).where(
+                    _subscriptions.c.id == subscription_id
+                )
+            ).first()
+        if not rows or target is None:
+            return None
+        return token, target.url, target.secret, rows
+
+    # --- delivery ---
+    def _deliver(self, engine_, key, token, url, secret, rows) -> None:
+        import httpx
+
+        try:
+            body = json.dumps(
+                {
+                    "webhook_id": key[1],
+                    "events": [
+                        {
+                            "id": row.id,
+                            "event": row.event,
+                            "created_at": row.created_at.isoformat(),
+                            "data": json.loads(row.payload),
+                        }
+                        for row in rows
+                    ],
+                },
+                separators=(",", ":"),
+            ).encode()
+            headers = {
+                "Content-Type": "application/json",
+                "User-Agent": "IssueHub-Webhooks",
+                "X-IssueHub-Delivery": token,
+            }
+            if secret:
+                headers["X-IssueHub-Signature"] = sign(secret, body)
+
+            error, wait = None, 0.0
+            try:
+                extensions = {}
+                if not self.allow_private:
+                    extensions["trace"] = _public_peer(urlsplit(url).hostname)
+                response = self._pool()[1].post(
+                    url, content=body, headers=headers, extensions=extensions
+                )
+                if not response.is_success:
+                    error = f"HTTP {response.status_code}"
+                    wait = _retry_after(response)
+            except ValueError as exc:
+                error = str(exc)
+            except httpx.HTTPError as exc:
+                error = f"{type(exc).__name__}: {exc}"
+            self._finish(engine_, token, rows, error, wait)
+        except Exception:
+            # the lease runs out and the rows are retried
+            logger.exception("webhook delivery to %s failed", url)
+        finally:
+            self._release(key)
+
+    def _finish(self, engine_, token, rows, error: Optional[str], wait: float) -> None:
+        now = datetime.utcnow()
+        with engine_.begin() as conn:
+            if error is None:
+                conn.execute(
+                    update(_outbox)
+                    .where(_outbox.c.claim == token)
+                    .values(delivered_at=now, claim=None, last_error=None)
+                )
+                return
+            retries = []
+            for row in rows:
+                attempts = row.attempts + 1
+                retry_at = None
+                if attempts < self.max_attempts:
+                    delay = backoff(attempts, self.backoff_base, self.backoff_max)
+                    retry_at = now + timedelta(seconds=max(delay, wait))
+                retries.append(
+                    {"row_id": row.id, "tries": attempts, "retry_at": retry_at}
+                )
+            conn.execute(
+                update(_outbox)
+                .where(
+                    _outbox.c.id == bindparam("row_id"), _outbox.c.claim == token
+                )
+                .values(
+                    attempts=bindparam("tries"),
+                    next_attempt_at=bindparam("retry_at"),
+                    claim=None,
+                    last_error=error,
+                ),
+                retries,
+            )
+        logger.warning("webhook delivery failed (%s); %d events", error, len(rows))
+
+    def _prune(self) -> None:
+        """Drop delivered and dead rows past retention, at most once a minute."""
+        now = time.monotonic()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+        for engine_ in self.engines:
+            with engine_.begin() as conn:
+                conn.execute(
+                    delete(_outbox).where(
+                        or_(
+                            _outbox.c.delivered_at < cutoff,
+                            and_(
+                                _outbox.c.next_attempt_at.is_(None),
+                                _outbox.c.created_at < cutoff,
+                            ),
+                        )
+                    )
+                )
+
+    # --- lifecycle ---
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.clear()
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("webhook dispatch failed")
+            self._wakeup.wait(self.poll_interval)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="webhook-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            executor, client = self._executor, self._client
+            self._executor = self._client = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+            client.close()
+
+
+webhook_dispatcher = WebhookDispatcher()
@@ -1,12 +1,60 @@
-from sqlalchemy.orm import Session
-from typing import Optional, List, Dict, Any
+import json
+import re
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import (
+    bindparam,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.orm import Query, Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Optional, List, Dict, Any, Mapping, Tuple
 
 from fastapi import HTTPException, status
 from sqlalchemy.exc import IntegrityError  # NEW
 
 from app.db import models
 from app.schemas import pydantic_schemas as schemas
+from app.core.config import settings
 from app.core.security import hash_password
+from app.core import markdown
+from app.core.activity import activity_writer
+from app.core.attachments import metadata_extractor
+from app.core.invalidation import LocalCache, invalidation_bus
+from app.core.notifications import mention_handles, notification_writer
+from app.core.similarity import similarity_index
+from app.db.shards import shard_router
+
+# (project_id, user_id) -> role or None, dropped per project on any
+# membership change in any worker
+member_roles = LocalCache("member_roles")
+invalidation_bus.subscribe(
+    "project_members", lambda project_id, version: member_roles.invalidate(project_id)
+)
+
+# project_id -> [(subscription id, event names)], dropped on any change to
+# the project's webhooks
+webhook_subscribers = LocalCache("webhook_subscribers")
+invalidation_bus.subscribe(
+    "webhooks", lambda project_id, version: webhook_subscribers.invalidate(project_id)
+)
+
+# project_id -> [(view id, filters)], dropped on any change to the
+# project's saved views
+saved_view_filters = LocalCache("saved_view_filters")
+invalidation_bus.subscribe(
+    "saved_views", lambda project_id, version: saved_view_filters.invalidate(project_id)
+)
 
 
 # --- User CRUD ---
@@ -44,24 +92,41 @@ def get_project_member(
     )
 
 
+def get_member_role(
+    db: Session, project_id: int, user_id: int
+) -> Optional[models.RoleEnum]:
+    """The caller's role in a project (None if not a member), cached."""
+    return member_roles.get_or_load(
+        project_id,
+        (project_id, user_id),
+        lambda: db.query(models.ProjectMember.role)
+        .filter(
+            models.ProjectMember.project_id == project_id,
+            models.ProjectMember.user_id == user_id,
+        )
+        .scalar(),
+    )
+
+
 def is_project_manager(db: Session, project_id: int, user_id: int) -> bool:
-    member = get_project_member(db, project_id, user_id)
-    return member is not None and member.role == models.RoleEnum.manager
+    return get_member_role(db, project_id, user_id) == models.RoleEnum.manager
 
 
 # --- Project CRUD ---
 def create_project(
     db: Session, project_in: schemas.ProjectCreate, owner_id: int
 ) -> models.Project:
-    project = models.Project(
-        name=project_in.name,
-        key=project_in.key,
-        description=project_in.description,
-        owner_id=owner_id,
+    """
+    Register the key in the global project directory (which keeps keys
+    unique across shards and hands out the id), then create the project
+    with its owner as manager on the shard the directory picked.
+    """
+    entry = models.ProjectDirectory(
+        key=project_in.key, shard=shard_router.choose_shard(project_in.key)
     )
-    db.add(project)
+    db.add(entry)
     try:
-        db.commit()
+        db.flush()
     except IntegrityError:
         db.rollback()
         # key must be unique
@@ -69,124 +134,1901 @@ def create_project(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Project with this key already exists",
         )
-    db.refresh(project)
 
-    # add owner as manager/maintainer
-    pm = models.ProjectMember(
-        project_id=project.id,
-        user_id=owner_id,
-        role=models.RoleEnum.manager,
-    )
-    db.add(pm)
-    db.commit()
-    db.refresh(pm)
+    on_global = shard_router.is_global(entry.shard)
+    shard_db = db if on_global else shard_router.session(entry.shard)
+    try:
+        shard_router.mirror_users(shard_db, [owner_id])
+        project = models.Project(
+            id=entry.id,
+            name=project_in.name,
+            key=project_in.key,
+            description=project_in.description,
+            owner_id=owner_id,
+        )
+        shard_db.add(project)
+        # add owner as manager/maintainer
+        shard_db.add(
+            models.ProjectMember(
+                project_id=entry.id,
+                user_id=owner_id,
+                role=models.RoleEnum.manager,
+            )
+        )
+        invalidation_bus.publish(shard_db, "project_members", entry.id)
+        try:
+            shard_db.commit()
+        except IntegrityError:
+            shard_db.rollback()
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Project with this key already exists",
+            )
+        if not on_global:
+            db.commit()
+        shard_db.refresh(project)
+    finally:
+        if not on_global:
+            shard_db.close()
 
     return project
 
 
 def get_projects_for_user(db: Session, user_id: int) -> List[models.Project]:
-    return (
-        db.query(models.Project)
-        .join(models.ProjectMember)
-        .filter(models.ProjectMember.user_id == user_id)
+    """The user's projects from every shard (``db`` serves the unsharded case)."""
+    def query(shard_db: Session) -> List[models.Project]:
+        return (
+            shard_db.query(models.Project)
+            .join(models.ProjectMember)
+            .filter(models.ProjectMember.user_id == user_id)
+            .all()
+        )
+
+    if not shard_router.sharded:
+        return query(db)
+    projects = [p for _, shard_db in shard_router.each_shard() for p in query(shard_db)]
+    return sorted(projects, key=lambda p: p.id)
+
+
+def get_project_summaries_for_user(db: Session, user_id: int) -> List[Dict[str, Any]]:
+    """Project summaries from every shard, one query per shard."""
+    if not shard_router.sharded:
+        return _project_summaries(db, user_id)
+    summaries = [
+        summary
+        for _, shard_db in shard_router.each_shard()
+        for summary in _project_summaries(shard_db, user_id)
+    ]
+    return sorted(summaries, key=lambda summary: summary["id"])
+
+
+def _project_summaries(db: Session, user_id: int) -> List[Dict[str, Any]]:
+    """
+    The caller's projects with their role, member count and issue counts
+    per status, in a single query. Counts are grouped subqueries limited to
+    the caller's projects, so the number of projects doesn't add queries.
+    Archived issues count as closed.
+    """
+    my_projects = select(models.ProjectMember.project_id).where(
+        models.ProjectMember.user_id == user_id
+    )
+    member_counts = (
+        db.query(
+            models.ProjectMember.project_id.label("project_id"),
+            func.count(models.ProjectMember.id).label("member_count"),
+        )
+        .filter(models.ProjectMember.project_id.in_(my_projects))
+        .group_by(models.ProjectMember.project_id)
+        .subquery()
+    )
+
+    every_issue = union_all(
+        *(
+            select(model.project_id, model.status_rank).where(
+                model.project_id.in_(my_projects)
+            )
+            for model in (models.Issue, models.ArchivedIssue)
+        )
+    ).subquery()
+
+    def _count(status_value):
+        rank = models.status_rank(status_value)
+        return func.sum(case((every_issue.c.status_rank == rank, 1), else_=0))
+
+    issue_counts = (
+        db.query(
+            every_issue.c.project_id.label("project_id"),
+            _count(models.IssueStatusEnum.open).label("open"),
+            _count(models.IssueStatusEnum.in_progress).label("in_progress"),
+            _count(models.IssueStatusEnum.closed).label("closed"),
+        )
+        .group_by(every_issue.c.project_id)
+        .subquery()
+    )
+
+    rows = (
+        db.query(
+            models.Project,
+            models.ProjectMember.role,
+            member_counts.c.member_count,
+            issue_counts.c.open,
+            issue_counts.c.in_progress,
+            issue_counts.c.closed,
+        )
+        .join(
+            models.ProjectMember,
+            (models.ProjectMember.project_id == models.Project.id)
+            & (models.ProjectMember.user_id == user_id),
+        )
+        .outerjoin(member_counts, member_counts.c.project_id == models.Project.id)
+        .outerjoin(issue_counts, issue_counts.c.project_id == models.Project.id)
+        .order_by(models.Project.id)
         .all()
     )
+    return [
+        {
+            "id": project.id,
+            "name": project.name,
+            "key": project.key,
+            "description": project.description,
+            "created_at": project.created_at,
+            "role": role,
+            "member_count": member_count or 0,
+            "open_issue_count": open_ or 0,
+            "in_progress_issue_count": in_progress or 0,
+            "closed_issue_count": closed or 0,
+        }
+        for project, role, member_count, open_, in_progress, closed in rows
+    ]
 
 
-def add_project_member(db: Session, project_id: int, email: str, role: str):
-    user = db.query(models.User).filter(models.User.email == email).first()
+def add_project_member(
+    db: Session,
+    project_id: int,
+    email: str,
+    role: str,
+    users_db: Optional[Session] = None,
+):
+    # users live in the global database; ``db`` may be a project shard
+    user = get_user_by_email(users_db or db, email)
     if not user:
         raise ValueError("User not found")
 
+    shard_router.mirror_users(db, [user.id])
     pm = models.ProjectMember(project_id=project_id, user_id=user.id, role=role)
     db.add(pm)
+    invalidation_bus.publish(db, "project_members", project_id)
     db.commit()
     db.refresh(pm)
     return pm
 
 
+def add_project_members(
+    db: Session,
+    project_id: int,
+    members: List[schemas.ProjectMemberCreate],
+    users_db: Optional[Session] = None,
+) -> Dict[str, Any]:
+    """
+    Add many members at once: one IN query resolves the emails (in
+    ``users_db``, the global database, when ``db`` is a shard), one finds
+    existing memberships, and all new rows go in with a single commit.
+    """
+    roles: Dict[str, models.RoleEnum] = {}
+    for m in members:
+        roles.setdefault(m.email, m.role)  # first entry for an email wins
+
+    users = (
+        (users_db or db)
+        .query(models.User)
+        .filter(models.User.email.in_(list(roles)))
+        .all()
+        if roles
+        else []
+    )
+    by_email = {u.email: u for u in users}
+    existing = set()
+    if users:
+        existing = {
+            user_id
+            for (user_id,) in db.query(models.ProjectMember.user_id).filter(
+                models.ProjectMember.project_id == project_id,
+                models.ProjectMember.user_id.in_([u.id for u in users]),
+            )
+        }
+
+    new_rows, skipped, not_found = [], [], []
+    for email, role in roles.items():
+        user = by_email.get(email)
+        if user is None:
+            not_found.append(email)
+        elif user.id in existing:
+            skipped.append(email)
+        else:
+            new_rows.append(
+                models.ProjectMember(project_id=project_id, user_id=user.id, role=role)
+            )
+
+    added: List[models.ProjectMember] = []
+    if new_rows:
+        shard_router.mirror_users(db, [pm.user_id for pm in new_rows])
+        db.add_all(new_rows)
+        db.flush()
+        ids = [pm.id for pm in new_rows]
+        invalidation_bus.publish(db, "project_members", project_id)
+        db.commit()
+        # one query brings the committed rows back with their user profiles
+        added = (
+            db.query(models.ProjectMember)
+            .options(joinedload(models.ProjectMember.user))
+            .filter(models.ProjectMember.id.in_(ids))
+            .order_by(models.ProjectMember.id)
+            .all()
+        )
+    return {"added": added, "skipped_existing": skipped, "not_found": not_found}
+
+
+def get_project_members(db: Session, project_id: int) -> List[models.ProjectMember]:
+    # joinedload: member profiles come back in the same query
+    return (
+        db.query(models.ProjectMember)
+        .options(joinedload(models.ProjectMember.user))
+        .filter(models.ProjectMember.project_id == project_id)
+        .order_by(models.ProjectMember.id)
+        .all()
+    )
+
+
+# --- Change feed ---
+def _next_change_seq(db: Session, project_id: int, count: int = 1) -> int:
+    """Reserve ``count`` sequence numbers; returns the last of them."""
+    # increment in SQL so concurrent writers never hand out the same number
+    db.query(models.Project).filter(models.Project.id == project_id).update(
+        {models.Project.change_seq: models.Project.change_seq + count},
+        synchronize_session=False,
+    )
+    return (
+        db.query(models.Project.change_seq)
+        .filter(models.Project.id == project_id)
+        .scalar()
+    )
+
+
+def record_change(
+    db: Session, project_id: int, entity: str, entity_id: int, op: str = "upsert"
+) -> None:
+    """Append a change-feed entry; the caller commits."""
+    record_changes(db, project_id, entity, [entity_id], op=op)
+
+
+def record_changes(
+    db: Session,
+    project_id: int,
+    entity: str,
+    entity_ids: List[int],
+    op: str = "upsert",
+) -> None:
+    """
+    One entry per id, numbered with a single update of the project's
+    sequence. ``op`` is "upsert", "delete", or "archive" for rows moved to
+    the archive tables. The caller commits.
+    """
+    if not entity_ids:
+        return
+    first = _next_change_seq(db, project_id, len(entity_ids)) - len(entity_ids) + 1
+    db.add_all(
+        [
+            models.ChangeLog(
+                project_id=project_id,
+                seq=first + n,
+                entity=entity,
+                entity_id=entity_id,
+                op=op,
+            )
+            for n, entity_id in enumerate(entity_ids)
+        ]
+    )
+
+
+def get_changes(
+    db: Session, project_id: int, since: int = 0, limit: int = 500
+) -> Dict[str, Any]:
+    entries = (
+        db.query(models.ChangeLog)
+        .filter(
+            models.ChangeLog.project_id == project_id,
+            models.ChangeLog.seq > since,
+        )
+        .order_by(models.ChangeLog.seq.asc())
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # keep only the latest entry per entity
+    latest: Dict[tuple, models.ChangeLog] = {}
+    for entry in entries:
+        latest[(entry.entity, entry.entity_id)] = entry
+
+    issue_ids = [i for (e, i), c in latest.items() if e == "issue" and c.op == "upsert"]
+    comment_ids = [
+        i for (e, i), c in latest.items() if e == "comment" and c.op == "upsert"
+    ]
+    issues = (
+        db.query(models.Issue).filter(models.Issue.id.in_(issue_ids)).all()
+        if issue_ids
+        else []
+    )
+    comments = (
+        db.query(models.Comment).filter(models.Comment.id.in_(comment_ids)).all()
+        if comment_ids
+        else []
+    )
+    # archived rows leave the feed too, but can still be fetched one by one
+    deleted = [
+        {
+            "entity": c.entity,
+            "id": c.entity_id,
+            "seq": c.seq,
+            "archived": c.op == "archive",
+        }
+        for c in latest.values()
+        if c.op != "upsert"
+    ]
+
+    return {
+        "cursor": entries[-1].seq if entries else since,
+        "has_more": has_more,
+        "issues": issues,
+        "comments": comments,
+        "deleted": deleted,
+    }
+
+
+# --- Webhooks ---
+def create_webhook(
+    db: Session, project_id: int, webhook_in: schemas.WebhookCreate, created_by: int
+) -> models.WebhookSubscription:
+    shard_router.mirror_users(db, [created_by])
+    webhook = models.WebhookSubscription(
+        id=shard_router.allocate_id("webhook_subscriptions"),
+        project_id=project_id,
+        url=str(webhook_in.url),
+        secret=webhook_in.secret,
+        events=",".join(sorted(set(webhook_in.events))),
+        created_by=created_by,
+    )
+    db.add(webhook)
+    invalidation_bus.publish(db, "webhooks", project_id)
+    db.commit()
+    db.refresh(webhook)
+    return webhook
+
+
+def get_webhooks(db: Session, project_id: int) -> List[models.WebhookSubscription]:
+    return (
+        db.query(models.WebhookSubscription)
+        .filter(models.WebhookSubscription.project_id == project_id)
+        .order_by(models.WebhookSubscription.id)
+        .all()
+    )
+
+
+def delete_webhook(db: Session, project_id: int, webhook_id: int) -> bool:
+    """Delete a subscription and its undelivered events."""
+    outbox = models.WebhookOutbox.__table__
+    db.execute(delete(outbox).where(outbox.c.subscription_id == webhook_id))
+    deleted = (
+        db.query(models.WebhookSubscription)
+        .filter(
+            models.WebhookSubscription.id == webhook_id,
+            models.WebhookSubscription.project_id == project_id,
+        )
+        .delete(synchronize_session=False)
+    )
+    if not deleted:
+        db.rollback()
+        return False
+    invalidation_bus.publish(db, "webhooks", project_id)
+    db.commit()
+    return True
+
+
+def _webhook_subscribers(db: Session, project_id: int) -> List[Tuple[int, List[str]]]:
+    return webhook_subscribers.get_or_load(
+        project_id,
+        project_id,
+        lambda: [
+            (webhook_id, events.split(","))
+            for webhook_id, events in db.query(
+                models.WebhookSubscription.id, models.WebhookSubscription.events
+            ).filter(models.WebhookSubscription.project_id == project_id)
+        ],
+    )
+
+
+def enqueue_webhook_event(
+    db: Session, project_id: int, event: str, data: Dict[str, Any]
+) -> int:
+    """
+    Add an outbox row per subscription that wants ``event``, in the
+    caller's transaction; the webhook dispatcher delivers them after the
+    commit. Projects without webhooks pay for a cache lookup only.
+    """
+    targets = [
+        webhook_id
+        for webhook_id, events in _webhook_subscribers(db, project_id)
+        if event in events
+    ]
+    if not targets:
+        return 0
+    payload = json.dumps(data, separators=(",", ":"))
+    now = datetime.utcnow()
+    db.execute(
+        insert(models.WebhookOutbox),
+        [
+            {
+                "project_id": project_id,
+                "subscription_id": webhook_id,
+                "event": event,
+                "payload": payload,
+                "created_at": now,
+                "next_attempt_at": now,
+            }
+            for webhook_id in targets
+        ],
+    )
+    return len(targets)
+
+
+# --- Saved views ---
+def create_saved_view(
+    db: Session, project_id: int, view_in: schemas.SavedViewCreate, created_by: int
+) -> models.SavedView:
+    count = (
+        db.query(func.count(models.SavedView.id))
+        .filter(models.SavedView.project_id == project_id)
+        .scalar()
+    )
+    if count >= settings.SAVED_VIEWS_PER_PROJECT:
+        # every issue write is matched against every view of its project
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Projects can have at most "
+            f"{settings.SAVED_VIEWS_PER_PROJECT} saved views",
+        )
+    shard_router.mirror_users(db, [created_by])
+    view = models.SavedView(
+        id=shard_router.allocate_id("saved_views"),
+        project_id=project_id,
+        name=view_in.name,
+        filters=json.dumps(view_in.filters.model_dump(mode="json")),
+        sort=view_in.sort,
+        created_by=created_by,
+    )
+    db.add(view)
+    db.flush()
+    _recompute_saved_view(db, view)
+    invalidation_bus.publish(db, "saved_views", project_id)
+    db.commit()
+    db.refresh(view)
+    return view
+
+
+def get_saved_views(db: Session, project_id: int) -> List[models.SavedView]:
+    return (
+        db.query(models.SavedView)
+        .filter(models.SavedView.project_id == project_id)
+        .order_by(models.SavedView.id)
+        .all()
+    )
+
+
+def get_saved_view(
+    db: Session, project_id: int, view_id: int
+) -> Optional[models.SavedView]:
+    return (
+        db.query(models.SavedView)
+        .filter(
+            models.SavedView.id == view_id,
+            models.SavedView.project_id == project_id,
+        )
+        .first()
+    )
+
+
+def delete_saved_view(db: Session, view: models.SavedView) -> None:
+    table = models.SavedViewIssue.__table__
+    db.execute(delete(table).where(table.c.view_id == view.id))
+    invalidation_bus.publish(db, "saved_views", view.project_id)
+    db.delete(view)
+    db.commit()
+
+
+def _recompute_saved_view(db: Session, view: models.SavedView) -> None:
+    """Replace the view's issue ids with a fresh evaluation; caller commits."""
+    filters = json.loads(view.filters)
+    table = models.SavedViewIssue.__table__
+    db.execute(delete(table).where(table.c.view_id == view.id))
+    matching = _filtered_issues(
+        db,
+        models.Issue,
+        view.project_id,
+        filters.get("q"),
+        filters.get("status"),
+        filters.get("priority"),
+        filters.get("assignee"),
+    ).with_entities(literal(view.id), literal(view.project_id), models.Issue.id)
+    db.execute(
+        insert(table).from_select(
+            ["view_id", "project_id", "issue_id"], matching.statement
+        )
+    )
+    view.refreshed_at = datetime.utcnow()
+
+
+def refresh_saved_view(db: Session, view: models.SavedView) -> models.SavedView:
+    _recompute_saved_view(db, view)
+    db.commit()
+    return view
+
+
+def get_saved_view_issues(
+    db: Session, view: models.SavedView, limit: int = 50, offset: int = 0
+) -> List[models.Issue]:
+    """
+    The view's issues, looked up by the maintained id set. A view whose
+    last full recompute is older than SAVED_VIEW_MAX_STALENESS_SECONDS is
+    recomputed first, so drift from writes that bypassed the incremental
+    upkeep (or from a worker's outdated view list) is bounded.
+    """
+    bound = timedelta(seconds=settings.SAVED_VIEW_MAX_STALENESS_SECONDS)
+    if view.refreshed_at is None or view.refreshed_at < datetime.utcnow() - bound:
+        refresh_saved_view(db, view)
+    members = models.SavedViewIssue.__table__
+    query = db.query(models.Issue).filter(
+        models.Issue.id.in_(
+            select(members.c.issue_id).where(members.c.view_id == view.id)
+        )
+    )
+    if view.sort == "created_at":
+        query = query.order_by(models.Issue.created_at.desc(), models.Issue.id)
+    elif view.sort == "priority":
+        query = query.order_by(models.Issue.priority_rank, models.Issue.created_at)
+    else:
+        query = query.order_by(models.Issue.id)
+    return query.offset(offset).limit(limit).all()
+
+
+def _saved_view_filters(db: Session, project_id: int) -> List[Tuple[int, Dict]]:
+    return saved_view_filters.get_or_load(
+        project_id,
+        project_id,
+        lambda: [
+            (view_id, json.loads(filters))
+            for view_id, filters in db.query(
+                models.SavedView.id, models.SavedView.filters
+            ).filter(models.SavedView.project_id == project_id)
+        ],
+    )
+
+
+def _like(text: str) -> re.Pattern:
+    # the ILIKE '%text%' of _filtered_issues, "%" and "_" included
+    return re.compile(
+        ".*".join(
+            ".".join(re.escape(piece) for piece in part.split("_"))
+            for part in text.split("%")
+        ),
+        re.IGNORECASE | re.DOTALL,
+    )
+
+
+def _matches_saved_view(filters: Dict[str, Any], issue: Mapping[str, Any]) -> bool:
+    """_filtered_issues for one issue's column values, in Python."""
+    if filters.get("q"):
+        pattern = _like(filters["q"])
+        if not any(pattern.search(issue[k] or "") for k in ("title", "description")):
+            return False
+    if filters.get("status") and issue["status_rank"] != models.status_rank(
+        filters["status"]
+    ):
+        return False
+    if filters.get("priority") and issue["priority_rank"] != models.priority_rank(
+        filters["priority"]
+    ):
+        return False
+    if filters.get("assignee") and issue["assignee_id"] != filters["assignee"]:
+        return False
+    return True
+
+
+def sync_saved_views(
+    db: Session,
+    project_id: int,
+    issue_id: int,
+    issue: Optional[Mapping[str, Any]],
+) -> None:
+    """
+    Bring an issue's saved-view memberships in line with its column values
+    (None when it was deleted), in the caller's transaction. Projects
+    without saved views pay for a cache lookup only.
+    """
+    views = _saved_view_filters(db, project_id)
+    if not views:
+        return
+    table = models.SavedViewIssue.__table__
+    db.execute(
+        delete(table).where(
+            table.c.issue_id == issue_id,
+            table.c.view_id.in_([view_id for view_id, _ in views]),
+        )
+    )
+    if issue is None:
+        return
+    matching = [
+        view_id for view_id, filters in views if _matches_saved_view(filters, issue)
+    ]
+    if matching:
+        db.execute(
+            insert(table),
+            [
+                {"view_id": view_id, "project_id": project_id, "issue_id": issue_id}
+                for view_id in matching
+            ],
+        )
+
+
 # --- Issue CRUD ---
 def create_issue(
     db: Session, project_id: int, issue_in: schemas.IssueCreate, reporter_id: int
 ) -> models.Issue:
+    shard_router.mirror_users(db, [issue_in.assignee_id])
     issue = models.Issue(
+        id=shard_router.allocate_id("issues"),
         project_id=project_id,
         title=issue_in.title,
         description=issue_in.description,
+        description_html=markdown.render(issue_in.description),
+        description_html_version=markdown.RENDERER_VERSION,
         priority=issue_in.priority,
         reporter_id=reporter_id,
         assignee_id=issue_in.assignee_id,
     )
     db.add(issue)
+    db.flush()
+    sync_saved_views(
+        db,
+        project_id,
+        issue.id,
+        {c.key: getattr(issue, c.key) for c in models.Issue.__table__.columns},
+    )
+    record_transition(
+        db, project_id, issue.id, new=(issue.status_rank, issue.priority_rank)
+    )
+    record_change(db, project_id, "issue", issue.id)
+    invalidation_bus.publish(db, "issue", issue.id, issue.version)
+    enqueue_webhook_event(
+        db,
+        project_id,
+        "issue.created",
+        schemas.IssueOut.model_validate(issue).model_dump(mode="json"),
+    )
     db.commit()
     db.refresh(issue)
+    similarity_index.add(issue)
     return issue
 
 
-def get_issues(
+def _filtered_issues(
     db: Session,
+    model,
     project_id: int,
-    q: Optional[str] = None,
-    status: Optional[str] = None,
-    priority: Optional[str] = None,
-    assignee: Optional[int] = None,
-    sort: Optional[str] = None,
+    q: Optional[str],
+    status: Optional[str],
+    priority: Optional[str],
+    assignee: Optional[int],
 ):
-    query = db.query(models.Issue).filter(models.Issue.project_id == project_id)
+    # model is Issue or ArchivedIssue; both share the column names
+    query = db.query(model).filter(model.project_id == project_id)
     if q:
         query = query.filter(
-            (models.Issue.title.ilike(f"%{q}%"))
-            | (models.Issue.description.ilike(f"%{q}%"))
+            (model.title.ilike(f"%{q}%")) | (model.description.ilike(f"%{q}%"))
         )
     if status:
-        query = query.filter(models.Issue.status == status)
+        query = query.filter(model.status_rank == models.status_rank(status))
     if priority:
-        query = query.filter(models.Issue.priority == priority)
+        query = query.filter(model.priority_rank == models.priority_rank(priority))
     if assignee:
-        query = query.filter(models.Issue.assignee_id == assignee)
+        query = query.filter(model.assignee_id == assignee)
+    return query
+
+
+def get_issues(
+    db: Session,
+    project_id: int,
+    q: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    assignee: Optional[int] = None,
+    sort: Optional[str] = None,
+    include_archived: bool = False,
+):
+    """
+    Hot-table listing. The archive is also searched when asked to, and
+    whenever the filters could match archived rows the caller would expect
+    to see: text search and status=closed.
+    """
+    filters = (project_id, q, status, priority, assignee)
+    try:
+        query = _filtered_issues(db, models.Issue, *filters)
+    except ValueError:
+        # unknown enum value can't match anything
+        return []
     if sort == "created_at":
         query = query.order_by(models.Issue.created_at.desc())
     elif sort == "priority":
-        query = query.order_by(models.Issue.priority)
-    return query.all()
+        # high -> low, oldest first within a priority; served by
+        # ix_issues_project_priority
+        query = query.order_by(models.Issue.priority_rank, models.Issue.created_at)
+    issues = query.all()
+
+    closed = models.IssueStatusEnum.closed
+    if status and models.IssueStatusEnum(status) != closed:
+        return issues
+    if not (include_archived or q or status):
+        return issues
+
+    archived = _filtered_issues(db, models.ArchivedIssue, *filters).all()
+    if not archived:
+        return issues
+    issues = issues + archived
+    if sort == "created_at":
+        issues.sort(key=lambda i: i.created_at, reverse=True)
+    elif sort == "priority":
+        issues.sort(key=lambda i: (i.priority_rank, i.created_at))
+    return issues
+
+
+def most_urgent_issues_query(
+    db: Session,
+    project_id: int,
+    status: str = models.IssueStatusEnum.open,
+    limit: int = 10,
+) -> Query:
+    """
+    Top ``limit`` issues in one status, highest priority and oldest first.
+    The equality on (project_id, status_rank) plus ordering on the rest of
+    ix_issues_project_status_priority lets the database stop after
+    ``limit`` index entries instead of sorting the project.
+    """
+    return (
+        db.query(models.Issue)
+        .filter(
+            models.Issue.project_id == project_id,
+            models.Issue.status_rank == models.status_rank(status),
+        )
+        .order_by(models.Issue.priority_rank, models.Issue.created_at)
+        .limit(limit)
+    )
+
+
+def get_most_urgent_issues(
+    db: Session,
+    project_id: int,
+    status: str = models.IssueStatusEnum.open,
+    limit: int = 10,
+) -> List[models.Issue]:
+    """See ``most_urgent_issues_query``."""
+    return most_urgent_issues_query(db, project_id, status, limit).all()
+
+
+def get_issues_for_user(
+    db: Session,
+    user_id: int,
+    involvement: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = 50,
+    include_archived: bool = False,
+) -> List[models.Issue]:
+    """
+    Issues assigned to or reported by ``user_id`` across every project they
+    are still a member of, newest first. Page with ``before_id``. As with
+    get_issues, the archive is read for status=closed or when asked to.
+    Sharded, each shard returns its newest ``limit`` and the pages are
+    merged.
+    """
+    filters = dict(
+        involvement=involvement,
+        status=status,
+        priority=priority,
+        before_id=before_id,
+        limit=limit,
+        include_archived=include_archived,
+    )
+    if not shard_router.sharded:
+        return _issues_for_user(db, user_id, **filters)
+    issues = [
+        issue
+        for _, shard_db in shard_router.each_shard()
+        for issue in _issues_for_user(shard_db, user_id, **filters)
+    ]
+    return sorted(issues, key=lambda issue: issue.id, reverse=True)[:limit]
+
+
+def _issues_for_user(
+    db: Session,
+    user_id: int,
+    involvement: Optional[str],
+    status: Optional[str],
+    priority: Optional[str],
+    before_id: Optional[int],
+    limit: int,
+    include_archived: bool,
+) -> List[models.Issue]:
+    try:
+        status_rank = models.status_rank(status) if status else None
+        priority_rank = models.priority_rank(priority) if priority else None
+    except ValueError:
+        return []
+    # archived issues are all closed
+    closed = models.status_rank(models.IssueStatusEnum.closed)
+    sources = [models.Issue]
+    if status_rank == closed or (include_archived and status_rank is None):
+        sources.append(models.ArchivedIssue)
+
+    issues = []
+    for model in sources:
+        query = db.query(model).join(
+            models.ProjectMember,
+            (models.ProjectMember.project_id == model.project_id)
+            & (models.ProjectMember.user_id == user_id),
+        )
+        if involvement == "assignee":
+            query = query.filter(model.assignee_id == user_id)
+        elif involvement == "reporter":
+            query = query.filter(model.reporter_id == user_id)
+        else:
+            query = query.filter(
+                (model.assignee_id == user_id) | (model.reporter_id == user_id)
+            )
+        if status_rank is not None:
+            query = query.filter(model.status_rank == status_rank)
+        if priority_rank is not None:
+            query = query.filter(model.priority_rank == priority_rank)
+        if before_id is not None:
+            query = query.filter(model.id < before_id)
+        issues += query.order_by(model.id.desc()).limit(limit).all()
+    if len(sources) == 1:
+        return issues
+    return sorted(issues, key=lambda issue: issue.id, reverse=True)[:limit]
 
 
 def get_issue(db: Session, issue_id: int) -> Optional[models.Issue]:
-    return db.query(models.Issue).filter(models.Issue.id == issue_id).first()
+    issue = db.query(models.Issue).filter(models.Issue.id == issue_id).first()
+    if issue is None:
+        issue = db.query(models.ArchivedIssue).get(issue_id)
+    return issue
+
+
+def get_issue_with_role(
+    db: Session, issue_id: int, user_id: int
+) -> Optional[Tuple[models.Issue, Optional[models.RoleEnum]]]:
+    """
+    Load an issue and the caller's role in its project with one outer join.
+    Returns None if the issue doesn't exist; role is None for non-members.
+    Archived issues are only looked up when the hot table has no match.
+    """
+    for model in (models.Issue, models.ArchivedIssue):
+        row = (
+            db.query(model, models.ProjectMember.role)
+            .outerjoin(
+                models.ProjectMember,
+                (models.ProjectMember.project_id == model.project_id)
+                & (models.ProjectMember.user_id == user_id),
+            )
+            .filter(model.id == issue_id)
+            .first()
+        )
+        if row is not None:
+            return row
+    return None
+
+
+# conditional UPDATEs of one issue before giving up with a 409
+_UPDATE_ATTEMPTS = 3
 
 
 def update_issue(
-    db: Session, issue: models.Issue, updates: Dict[str, Any]
+    db: Session,
+    issue: models.Issue,
+    updates: Dict[str, Any],
+    actor_id: Optional[int] = None,
+    expected_version: Optional[int] = None,
 ) -> models.Issue:
-    for k, v in updates.items():
-        if hasattr(issue, k) and v is not None:
-            setattr(issue, k, v)
-    db.add(issue)
+    """
+    Apply ``updates`` with a single conditional UPDATE. The row is only
+    written if its version is still the one loaded (or ``expected_version``,
+    when given), so the old values recorded for the change are the ones
+    actually replaced. A concurrent write raises a 409 when the caller
+    passed ``expected_version`` and is otherwise retried on the fresh row.
+    The returned object is filled from RETURNING (or from the values just
+    written on dialects without it), so no refresh query is needed.
+    """
+    table = models.Issue.__table__
+    current = {c.key: getattr(issue, c.key) for c in table.columns}
+
+    values = {
+        k: v
+        for k, v in updates.items()
+        if k in current and k not in ("id", "version") and v is not None
+    }
+    fields = list(values)  # what the caller changed, before derived columns
+    if "assignee_id" in values:
+        shard_router.mirror_users(db, [values["assignee_id"]])
+    values["updated_at"] = datetime.utcnow()
+    if "description" in values:
+        values["description_html"] = markdown.render(values["description"])
+        values["description_html_version"] = markdown.RENDERER_VERSION
+    if "status" in values:
+        values["status_rank"] = models.status_rank(values["status"])
+    if "priority" in values:
+        values["priority_rank"] = models.priority_rank(values["priority"])
+
+    written = None
+    for _ in range(_UPDATE_ATTEMPTS):
+        version = current["version"]
+        if expected_version is not None and version != expected_version:
+            break
+        changed = [
+            (k, current[k], values[k]) for k in fields if current[k] != values[k]
+        ]
+        stmt = (
+            update(models.Issue)
+            .where(models.Issue.id == issue.id, models.Issue.version == version)
+            .values(version=version + 1, **values)
+            .execution_options(synchronize_session=False)
+        )
+        if db.bind.dialect.full_returning:
+            row = db.execute(stmt.returning(*table.columns)).first()
+            written = dict(row._mapping) if row is not None else None
+        elif db.execute(stmt).rowcount:
+            written = {**current, **values, "version": version + 1}
+        if written is not None or expected_version is not None:
+            break
+        # written by someone else since it was loaded: retry on the new row
+        row = db.execute(select(table).where(table.c.id == issue.id)).first()
+        if row is None:
+            break
+        current = dict(row._mapping)
+
+    if written is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Issue was modified by someone else; reload and retry",
+        )
+
+    if changed:
+        sync_saved_views(db, current["project_id"], issue.id, written)
+    if any(field in ("status", "priority") for field, _, _ in changed):
+        record_transition(
+            db,
+            current["project_id"],
+            issue.id,
+            old=(current["status_rank"], current["priority_rank"]),
+            new=(written["status_rank"], written["priority_rank"]),
+        )
+    record_change(db, current["project_id"], "issue", issue.id)
+    invalidation_bus.publish(db, "issue", issue.id, written["version"])
+    enqueue_webhook_event(
+        db,
+        current["project_id"],
+        "issue.updated",
+        {
+            **schemas.IssueOut.model_validate(written).model_dump(mode="json"),
+            "changed": [field for field, _, _ in changed],
+        },
+    )
     db.commit()
-    db.refresh(issue)
+    for key, value in written.items():
+        set_committed_value(issue, key, value)
+    if "title" in values or "description" in values:
+        similarity_index.add(issue)
+    if any(field == "assignee_id" for field, _, _ in changed):
+        notification_writer.notify(
+            user_ids=[written["assignee_id"]],
+            kind="assigned",
+            project_id=current["project_id"],
+            issue_id=issue.id,
+            actor_id=actor_id,
+        )
+
+    # buffered; the activity writer inserts these in batches
+    for field, old, new in changed:
+        activity_writer.record(
+            project_id=current["project_id"],
+            issue_id=issue.id,
+            actor_id=actor_id,
+            entity="issue",
+            entity_id=issue.id,
+            field=field,
+            old_value=old,
+            new_value=new,
+        )
     return issue
 
 
 def delete_issue(db: Session, issue: models.Issue) -> None:
+    attachments = models.Attachment.__table__
+    freed = db.execute(
+        select(func.count(), func.coalesce(func.sum(attachments.c.size), 0)).where(
+            attachments.c.issue_id == issue.id
+        )
+    ).one()
+    if freed[0]:
+        db.execute(delete(attachments).where(attachments.c.issue_id == issue.id))
+        _charge_storage(db, issue.project_id, -freed[1], files=-freed[0])
+    sync_saved_views(db, issue.project_id, issue.id, None)
+    record_transition(
+        db, issue.project_id, issue.id, old=(issue.status_rank, issue.priority_rank)
+    )
+    record_change(db, issue.project_id, "issue", issue.id, op="delete")
+    # the comments go with the issue; clients need their tombstones too
+    comment_ids = [
+        comment_id
+        for (comment_id,) in db.query(models.Comment.id)
+        .filter(models.Comment.issue_id == issue.id)
+        .order_by(models.Comment.id)
+    ]
+    record_changes(db, issue.project_id, "comment", comment_ids, op="delete")
+    invalidation_bus.publish(db, "issue", issue.id)
+    enqueue_webhook_event(
+        db,
+        issue.project_id,
+        "issue.deleted",
+        {"id": issue.id, "project_id": issue.project_id},
+    )
+    similarity_index.remove(issue.project_id, issue.id)
+    if issue.is_archived:
+        db.query(models.ArchivedComment).filter(
+            models.ArchivedComment.issue_id == issue.id
+        ).delete(synchronize_session=False)
     db.delete(issue)
     db.commit()
 
 
 # --- Comments ---
 def create_comment(
-    db: Session, issue_id: int, author_id: int, body: str
+    db: Session,
+    issue_id: int,
+    author_id: int,
+    body: str,
+    project_id: Optional[int] = None,
 ) -> models.Comment:
-    comment = models.Comment(issue_id=issue_id, author_id=author_id, body=body)
+    comment = models.Comment(
+        id=shard_router.allocate_id("comments"),
+        issue_id=issue_id,
+        author_id=author_id,
+        body=body,
+        body_html=markdown.render(body),
+        body_html_version=markdown.RENDERER_VERSION,
+    )
     db.add(comment)
+    db.flush()
+    if project_id is None:
+        project_id = (
+            db.query(models.Issue.project_id)
+            .filter(models.Issue.id == issue_id)
+            .scalar()
+        )
+    record_change(db, project_id, "comment", comment.id)
+    enqueue_webhook_event(
+        db,
+        project_id,
+        "comment.created",
+        schemas.CommentOut.model_validate(comment).model_dump(mode="json"),
+    )
     db.commit()
     db.refresh(comment)
+
+    handles = mention_handles(body)
+    if handles:
+        notification_writer.notify(
+            user_ids=resolve_mentions(db, project_id, handles),
+            kind="mention",
+            project_id=project_id,
+            issue_id=issue_id,
+            comment_id=comment.id,
+            actor_id=author_id,
+        )
     return comment
 
 
-def get_comments_for_issue(db: Session, issue_id: int):
+def resolve_mentions(db: Session, project_id: int, handles: List[str]) -> List[int]:
+    """
+    Map mention handles to ids of the project's members with one query. A
+    full email matches exactly; a bare handle matches the local part of an
+    email and is dropped when several members share it.
+    """
+    emails = [h for h in handles if "@" in h]
+    local_parts = [h for h in handles if "@" not in h]
+    email = func.lower(models.User.email)
+    conditions = [email.in_(emails)] if emails else []
+    for local in local_parts:
+        # handles never contain "%" or "\\", but "_" is a LIKE wildcard
+        escaped = local.replace("_", "\\_")
+        conditions.append(email.like(f"{escaped}@%", escape="\\"))
+    rows = (
+        db.query(models.User.id, models.User.email)
+        .join(models.ProjectMember, models.ProjectMember.user_id == models.User.id)
+        .filter(models.ProjectMember.project_id == project_id, or_(*conditions))
+        .all()
+    )
+    user_ids = {user_id for user_id, address in rows if address.lower() in emails}
+    by_local: Dict[str, List[int]] = {}
+    for user_id, address in rows:
+        by_local.setdefault(address.lower().split("@")[0], []).append(user_id)
+    for local in local_parts:
+        if len(by_local.get(local, [])) == 1:
+            user_ids.add(by_local[local][0])
+    return sorted(user_ids)
+
+
+def get_issue_activity(
+    db: Session, issue_id: int, before_id: Optional[int] = None, limit: int = 50
+) -> List[models.ActivityLog]:
+    # make entries still sitting in the writer's buffer visible
+    activity_writer.flush()
+    query = db.query(models.ActivityLog).filter(
+        models.ActivityLog.issue_id == issue_id
+    )
+    if before_id is not None:
+        query = query.filter(models.ActivityLog.id < before_id)
+    return query.order_by(models.ActivityLog.id.desc()).limit(limit).all()
+
+
+def get_comments_for_issue(db: Session, issue_id: int, archived: bool = False):
+    model = models.ArchivedComment if archived else models.Comment
     return (
-        db.query(models.Comment)
-        .filter(models.Comment.issue_id == issue_id)
-        .order_by(models.Comment.created_at.asc())
+        db.query(model)
+        .filter(model.issue_id == issue_id)
+        .order_by(model.created_at.asc())
         .all()
     )
+
+
+# --- Rendered Markdown ---
+def _html_columns(model) -> Tuple[str, str, str]:
+    """(source, html, renderer version) column names of an issue or comment."""
+    if model in (models.Comment, models.ArchivedComment):
+        return "body", "body_html", "body_html_version"
+    return "description", "description_html", "description_html_version"
+
+
+def ensure_html(db: Session, rows: List[Any]) -> List[Any]:
+    """
+    Make the stored HTML of ``rows`` (issues and/or comments, hot or
+    archived) current. Rows rendered by an older renderer version, or
+    never rendered, are rendered now and written back in one UPDATE per
+    table, so each row is rendered once per version rather than per read.
+    The write only applies while the source text is unchanged and leaves
+    updated_at alone.
+    """
+    stale: Dict[Any, List[Any]] = {}
+    for row in rows:
+        _, _, version = _html_columns(type(row))
+        if getattr(row, version) != markdown.RENDERER_VERSION:
+            stale.setdefault(type(row), []).append(row)
+    if not stale:
+        return rows
+
+    for model, group in stale.items():
+        source, target, version = _html_columns(model)
+        table = model.__table__
+        params = []
+        for row in group:
+            rendered = markdown.render(getattr(row, source))
+            params.append(
+                {"row_id": row.id, "source": getattr(row, source), "html": rendered}
+            )
+            set_committed_value(row, target, rendered)
+            set_committed_value(row, version, markdown.RENDERER_VERSION)
+        db.execute(
+            update(table)
+            .where(
+                table.c.id == bindparam("row_id"),
+                table.c[source].is_not_distinct_from(bindparam("source")),
+            )
+            .values(
+                {
+                    target: bindparam("html"),
+                    version: markdown.RENDERER_VERSION,
+                    "updated_at": table.c.updated_at,
+                }
+            ),
+            params,
+        )
+    snapshot = [
+        (row, {c.key: getattr(row, c.key) for c in row.__table__.columns})
+        for row in rows
+    ]
+    db.commit()
+    # the commit expired every row; put back what we know instead of
+    # reloading them one by one
+    for row, values in snapshot:
+        for key, value in values.items():
+            set_committed_value(row, key, value)
+    return rows
+
+
+# --- Attachments ---
+def _charge_storage(db: Session, project_id: int, size: int, files: int = 1) -> bool:
+    """
+    Add ``size`` bytes (negative to free) to the project's usage unless
+    that would exceed the quota; False when refused. Must be the first
+    write of the transaction: a concurrent first upload to the project
+    makes this roll back and retry.
+    """
+    table = models.ProjectStorage.__table__
+    quota = settings.ATTACHMENT_PROJECT_QUOTA_BYTES
+    stmt = (
+        update(table)
+        .where(table.c.project_id == project_id)
+        .values(
+            bytes_used=table.c.bytes_used + size,
+            file_count=table.c.file_count + files,
+        )
+    )
+    if size > 0:
+        stmt = stmt.where(table.c.bytes_used + size <= quota)
+    for _ in range(2):
+        if db.execute(stmt).rowcount:
+            return True
+        exists = db.execute(
+            select(table.c.id).where(table.c.project_id == project_id)
+        ).first()
+        if exists is not None or size <= 0 or size > quota:
+            return False
+        try:
+            db.execute(
+                insert(table).values(project_id=project_id, bytes_used=0, file_count=0)
+            )
+        except IntegrityError:
+            db.rollback()  # created by a concurrent upload; charge that row
+    return False
+
+
+def create_attachment(
+    db: Session,
+    issue: models.Issue,
+    uploader_id: int,
+    filename: str,
+    content_type: str,
+    digest: str,
+    size: int,
+) -> models.Attachment:
+    if not _charge_storage(db, issue.project_id, size):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail="Project attachment quota exceeded",
+        )
+    shard_router.mirror_users(db, [uploader_id])
+    # identical bytes were analysed before: reuse that instead of a job
+    meta = (
+        db.query(models.Attachment.meta)
+        .filter(models.Attachment.sha256 == digest, models.Attachment.meta.isnot(None))
+        .limit(1)
+        .scalar()
+    )
+    attachment = models.Attachment(
+        id=shard_router.allocate_id("attachments"),
+        project_id=issue.project_id,
+        issue_id=issue.id,
+        uploader_id=uploader_id,
+        filename=filename,
+        content_type=content_type,
+        size=size,
+        sha256=digest,
+        meta=meta,
+    )
+    db.add(attachment)
+    db.commit()
+    db.refresh(attachment)
+    if meta is None:
+        metadata_extractor.submit(
+            attachment.project_id, attachment.id, digest, content_type
+        )
+    return attachment
+
+
+def get_attachments(db: Session, issue_id: int) -> List[models.Attachment]:
+    return (
+        db.query(models.Attachment)
+        .filter(models.Attachment.issue_id == issue_id)
+        .order_by(models.Attachment.id)
+        .all()
+    )
+
+
+def get_attachment(
+    db: Session, issue_id: int, attachment_id: int
+) -> Optional[models.Attachment]:
+    return (
+        db.query(models.Attachment)
+        .filter(
+            models.Attachment.id == attachment_id,
+            models.Attachment.issue_id == issue_id,
+        )
+        .first()
+    )
+
+
+def delete_attachment(db: Session, attachment: models.Attachment) -> None:
+    """The file itself is left to the purge job's collector."""
+    _charge_storage(db, attachment.project_id, -attachment.size, files=-1)
+    db.delete(attachment)
+    db.commit()
+
+
+def get_project_storage(db: Session, project_id: int) -> Dict[str, int]:
+    row = (
+        db.query(models.ProjectStorage.bytes_used, models.ProjectStorage.file_count)
+        .filter(models.ProjectStorage.project_id == project_id)
+        .first()
+    )
+    return {
+        "bytes_used": row.bytes_used if row else 0,
+        "file_count": row.file_count if row else 0,
+        "quota_bytes": settings.ATTACHMENT_PROJECT_QUOTA_BYTES,
+    }
+
+
+def referenced_blobs(db: Session) -> set:
+    return {digest for (digest,) in db.query(models.Attachment.sha256).distinct()}
+
+
+# --- Notifications ---
+def get_notifications(
+    db: Session,
+    user_id: int,
+    unread_only: bool = False,
+    before_id: Optional[int] = None,
+    limit: int = 50,
+) -> List[models.Notification]:
+    query = db.query(models.Notification).filter(
+        models.Notification.user_id == user_id
+    )
+    if unread_only:
+        query = query.filter(models.Notification.read_at.is_(None))
+    if before_id is not None:
+        query = query.filter(models.Notification.id < before_id)
+    return query.order_by(models.Notification.id.desc()).limit(limit).all()
+
+
+def get_unread_count(db: Session, user_id: int) -> int:
+    return (
+        db.query(models.NotificationCounter.unread)
+        .filter(models.NotificationCounter.user_id == user_id)
+        .scalar()
+    ) or 0
+
+
+def mark_notifications_read(
+    db: Session, user_id: int, ids: Optional[List[int]] = None
+) -> int:
+    """Mark ``ids`` (all when None) as read; returns the new unread count."""
+    table = models.Notification.__table__
+    stmt = (
+        update(table)
+        .where(table.c.user_id == user_id, table.c.read_at.is_(None))
+        .values(read_at=datetime.utcnow())
+    )
+    if ids is not None:
+        stmt = stmt.where(table.c.id.in_(ids))
+    marked = db.execute(stmt).rowcount
+    if marked:
+        counters = models.NotificationCounter.__table__
+        db.execute(
+            update(counters)
+            .where(counters.c.user_id == user_id)
+            .values(
+                unread=case(
+                    (counters.c.unread > marked, counters.c.unread - marked), else_=0
+                )
+            )
+        )
+    db.commit()
+    return get_unread_count(db, user_id)
+
+
+# --- Issue history ---
+def record_transition(
+    db: Session,
+    project_id: int,
+    issue_id: int,
+    old: Optional[Tuple[int, int]] = None,
+    new: Optional[Tuple[int, int]] = None,
+    at: Optional[datetime] = None,
+) -> None:
+    """
+    Append a (status rank, priority rank) change of an issue; ``old`` is
+    None on creation and ``new`` on deletion. The caller commits.
+    """
+    old_status, old_priority = old or (None, None)
+    new_status, new_priority = new or (None, None)
+    db.add(
+        models.IssueTransition(
+            project_id=project_id,
+            issue_id=issue_id,
+            at=at or datetime.utcnow(),
+            old_status_rank=old_status,
+            old_priority_rank=old_priority,
+            new_status_rank=new_status,
+            new_priority_rank=new_priority,
+        )
+    )
+
+
+def _add_daily_stats(db: Session, cells: Dict[Tuple, List[int]]) -> None:
+    table = models.ProjectDailyStats.__table__
+    for (project_id, day, status_rank, priority_rank), deltas in cells.items():
+        net, created, entered = deltas
+        where = (
+            (table.c.project_id == project_id)
+            & (table.c.day == day)
+            & (table.c.status_rank == status_rank)
+            & (table.c.priority_rank == priority_rank)
+        )
+        bumped = db.execute(
+            update(table)
+            .where(where)
+            .values(
+                net=table.c.net + net,
+                created=table.c.created + created,
+                entered=table.c.entered + entered,
+            )
+        ).rowcount
+        if not bumped:
+            db.execute(
+                insert(table).values(
+                    project_id=project_id,
+                    day=day,
+                    status_rank=status_rank,
+                    priority_rank=priority_rank,
+                    net=net,
+                    created=created,
+                    entered=entered,
+                )
+            )
+
+
+def roll_up_transitions(
+    db: Session, batch_size: int = settings.ROLLUP_BATCH_SIZE
+) -> int:
+    """
+    Fold transitions not yet rolled up into project_daily_stats, one
+    batch per transaction: the batch is claimed with a fresh token and its
+    deltas added in the same commit, so no transition is counted twice
+    even with several workers running this. Returns the number folded.
+    """
+    table = models.IssueTransition.__table__
+    folded = 0
+    while True:
+        ids = [
+            row[0]
+            for row in db.execute(
+                select(table.c.id)
+                .where(table.c.rollup_claim.is_(None))
+                .order_by(table.c.id)
+                .limit(batch_size)
+            )
+        ]
+        if not ids:
+            return folded
+        token = uuid.uuid4().hex
+        db.execute(
+            update(table)
+            .where(table.c.id.in_(ids), table.c.rollup_claim.is_(None))
+            .values(rollup_claim=token)
+        )
+        rows = db.execute(select(table).where(table.c.rollup_claim == token)).all()
+
+        # (project, day, status, priority) -> [net, created, entered]
+        cells: Dict[Tuple, List[int]] = defaultdict(lambda: [0, 0, 0])
+        for row in rows:
+            day = row.at.date()
+            if row.old_status_rank is not None:
+                key = (row.project_id, day, row.old_status_rank, row.old_priority_rank)
+                cells[key][0] -= 1
+            if row.new_status_rank is not None:
+                key = (row.project_id, day, row.new_status_rank, row.new_priority_rank)
+                cells[key][0] += 1
+                if row.old_status_rank is None:
+                    cells[key][1] += 1
+                elif row.old_status_rank != row.new_status_rank:
+                    cells[key][2] += 1
+        try:
+            _add_daily_stats(db, cells)
+            db.commit()
+        except IntegrityError:
+            # another worker created one of the cells first; the claim is
+            # rolled back too, so the next run folds this batch again
+            db.rollback()
+            return folded
+        folded += len(rows)
+
+
+def get_project_timeseries(
+    db: Session, project_id: int, start: date, end: date
+) -> List[Dict[str, Any]]:
+    """
+    Daily issue counts per status, open (not closed) counts per priority
+    and the day's created / closed flows, read from project_daily_stats
+    only: one grouped query for the counts before ``start`` and one for
+    the days in range.
+    """
+    stats = models.ProjectDailyStats
+    statuses = {rank: status.value for status, rank in models.STATUS_RANK.items()}
+    priorities = {
+        rank: priority.value for priority, rank in models.PRIORITY_RANK.items()
+    }
+    closed_rank = models.status_rank(models.IssueStatusEnum.closed)
+
+    counts: Dict[Tuple[int, int], int] = defaultdict(int)
+    for status_rank, priority_rank, net in (
+        db.query(stats.status_rank, stats.priority_rank, func.sum(stats.net))
+        .filter(stats.project_id == project_id, stats.day < start)
+        .group_by(stats.status_rank, stats.priority_rank)
+    ):
+        counts[(status_rank, priority_rank)] = net
+
+    by_day: Dict[date, List[models.ProjectDailyStats]] = defaultdict(list)
+    for row in db.query(stats).filter(
+        stats.project_id == project_id, stats.day >= start, stats.day <= end
+    ):
+        by_day[row.day].append(row)
+
+    points = []
+    day = start
+    while day <= end:
+        created = closed = 0
+        for row in by_day.get(day, ()):
+            counts[(row.status_rank, row.priority_rank)] += row.net
+            created += row.created
+            if row.status_rank == closed_rank:
+                closed += row.entered
+        by_status = dict.fromkeys(statuses.values(), 0)
+        by_priority = dict.fromkeys(priorities.values(), 0)
+        for (status_rank, priority_rank), count in counts.items():
+            by_status[statuses[status_rank]] += count
+            if status_rank != closed_rank:
+                by_priority[priorities[priority_rank]] += count
+        points.append(
+            {
+                "day": day,
+                "by_status": by_status,
+                "open_by_priority": by_priority,
+                "remaining": sum(by_priority.values()),
+                "created": created,
+                "closed": closed,
+            }
+        )
+        day += timedelta(days=1)
+    return points
+
+
+def backfill_transitions(db: Session, project_id: Optional[int] = None) -> int:
+    """
+    Reconstruct transitions for issues (hot and archived) recorded before
+    transitions existed, from their creation time, current state and the
+    status / priority entries of the activity log. Only history older than
+    an issue's first recorded transition is added, so running it again, or
+    on issues edited since the upgrade, adds nothing twice. Returns the
+    number of transitions written; roll_up_transitions folds them.
+    """
+    activity_writer.flush()
+    transitions = models.IssueTransition
+    activity = models.ActivityLog
+    written = 0
+    for model in (models.Issue, models.ArchivedIssue):
+        query = db.query(
+            model.id,
+            model.project_id,
+            model.created_at,
+            model.status_rank,
+            model.priority_rank,
+        )
+        if project_id is not None:
+            query = query.filter(model.project_id == project_id)
+        issues = query.all()
+        if not issues:
+            continue
+        issue_ids = [issue.id for issue in issues]
+
+        first_recorded: Dict[int, models.IssueTransition] = {}
+        for row in (
+            db.query(transitions)
+            .filter(transitions.issue_id.in_(issue_ids))
+            .order_by(transitions.at, transitions.id)
+        ):
+            first_recorded.setdefault(row.issue_id, row)
+        edits: Dict[int, List[models.ActivityLog]] = defaultdict(list)
+        for entry in (
+            db.query(activity)
+            .filter(
+                activity.entity == "issue",
+                activity.issue_id.in_(issue_ids),
+                activity.field.in_(("status", "priority")),
+            )
+            .order_by(activity.id)
+        ):
+            edits[entry.issue_id].append(entry)
+
+        for issue in issues:
+            first = first_recorded.get(issue.id)
+            if first is not None and first.old_status_rank is None:
+                continue  # creation already recorded: nothing missing
+            history = [
+                entry
+                for entry in edits[issue.id]
+                if first is None or entry.created_at < first.at
+            ]
+            # the state before the first edit we know of
+            if first is not None:
+                state = [first.old_status_rank, first.old_priority_rank]
+            else:
+                state = [issue.status_rank, issue.priority_rank]
+            for entry in reversed(history):
+                index = 0 if entry.field == "status" else 1
+                rank = models.status_rank if index == 0 else models.priority_rank
+                state[index] = rank(entry.old_value)
+
+            record_transition(
+                db, issue.project_id, issue.id, new=tuple(state), at=issue.created_at
+            )
+            for entry in history:
+                old = tuple(state)
+                index = 0 if entry.field == "status" else 1
+                rank = models.status_rank if index == 0 else models.priority_rank
+                state[index] = rank(entry.new_value)
+                record_transition(
+                    db,
+                    issue.project_id,
+                    issue.id,
+                    old=old,
+                    new=tuple(state),
+                    at=entry.created_at,
+                )
+            written += 1 + len(history)
+        db.commit()
+    return written
+
+
+# --- Archive ---
+def archive_closed_issues(
+    db: Session,
+    older_than_days: int = settings.ARCHIVE_CLOSED_AFTER_DAYS,
+    batch_size: int = settings.ARCHIVE_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    project_id: Optional[int] = None,
+) -> int:
+    """
+    Move closed issues not updated for ``older_than_days`` (and their
+    comments) into the archive tables, ``batch_size`` issues per short
+    transaction, optionally for one project only. Returns the number of
+    issues moved.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    closed_rank = models.status_rank(models.IssueStatusEnum.closed)
+    issue_cols = [c.name for c in models.Issue.__table__.columns]
+    comment_cols = [c.name for c in models.Comment.__table__.columns]
+    issues_t = models.Issue.__table__
+    comments_t = models.Comment.__table__
+    view_issues_t = models.SavedViewIssue.__table__
+
+    due = db.query(models.Issue.id).filter(
+        models.Issue.status_rank == closed_rank,
+        models.Issue.updated_at < cutoff,
+    )
+    if project_id is not None:
+        due = due.filter(models.Issue.project_id == project_id)
+
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = [
+            issue_id for (issue_id,) in due.order_by(models.Issue.id).limit(batch_size)
+        ]
+        if not ids:
+            break
+
+        project_of = dict(
+            db.execute(
+                select(issues_t.c.id, issues_t.c.project_id).where(
+                    issues_t.c.id.in_(ids)
+                )
+            ).all()
+        )
+        comment_rows = db.execute(
+            select(comments_t.c.id, comments_t.c.issue_id)
+            .where(comments_t.c.issue_id.in_(ids))
+            .order_by(comments_t.c.id)
+        ).all()
+        archived: Dict[int, Dict[str, List[int]]] = {}
+        for issue_id in ids:
+            entry = archived.setdefault(project_of[issue_id], {})
+            entry.setdefault("issue", []).append(issue_id)
+        for comment_id, issue_id in comment_rows:
+            entry = archived[project_of[issue_id]]
+            entry.setdefault("comment", []).append(comment_id)
+        for archived_project, entities in archived.items():
+            for entity, entity_ids in entities.items():
+                record_changes(
+                    db, archived_project, entity, entity_ids, op="archive"
+                )
+
+        db.execute(
+            insert(models.ArchivedIssue.__table__).from_select(
+                issue_cols,
+                select(*[issues_t.c[c] for c in issue_cols]).where(
+                    issues_t.c.id.in_(ids)
+                ),
+            )
+        )
+        db.execute(
+            insert(models.ArchivedComment.__table__).from_select(
+                comment_cols,
+                select(*[comments_t.c[c] for c in comment_cols]).where(
+                    comments_t.c.issue_id.in_(ids)
+                ),
+            )
+        )
+        db.execute(delete(comments_t).where(comments_t.c.issue_id.in_(ids)))
+        db.execute(delete(issues_t).where(issues_t.c.id.in_(ids)))
+        # saved views only list hot issues
+        db.execute(delete(view_issues_t).where(view_issues_t.c.issue_id.in_(ids)))
+        db.commit()
+
+        moved += len(ids)
+        batches += 1
+    return moved
+
+
+
+# --- Deletion / retention purge ---
+def mark_project_deleted(db: Session, project_id: int) -> None:
+    """
+    Take a project offline right away: every route checks membership, so
+    dropping the (few) member rows hides it from everyone. The bulk of the
+    data is removed later by purge_deleted_projects in small chunks.
+    """
+    db.query(models.Project).filter(models.Project.id == project_id).update(
+        {models.Project.deleted_at: datetime.utcnow()}, synchronize_session=False
+    )
+    db.query(models.ProjectMember).filter(
+        models.ProjectMember.project_id == project_id
+    ).delete(synchronize_session=False)
+    invalidation_bus.publish(db, "project_members", project_id)
+    db.commit()
+
+
+def _delete_in_chunks(
+    db: Session,
+    table,
+    where,
+    chunk_size: int = settings.PURGE_CHUNK_SIZE,
+    pause: float = settings.PURGE_CHUNK_PAUSE_SECONDS,
+) -> int:
+    # select a bounded set of ids, delete them, commit: each transaction
+    # holds its locks only for one chunk
+    total = 0
+    while True:
+        chunk = select(table.c.id).where(where).limit(chunk_size)
+        ids = [row[0] for row in db.execute(chunk)]
+        if not ids:
+            return total
+        db.execute(delete(table).where(table.c.id.in_(ids)))
+        db.commit()
+        total += len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+def purge_project(db: Session, project_id: int, **chunking) -> Dict[str, int]:
+    """Delete a project and everything under it, children first, in chunks."""
+    issues = models.Issue.__table__
+    archived = models.ArchivedIssue.__table__
+    comments = models.Comment.__table__
+    archived_comments = models.ArchivedComment.__table__
+    project_issue_ids = select(issues.c.id).where(issues.c.project_id == project_id)
+    archived_issue_ids = select(archived.c.id).where(
+        archived.c.project_id == project_id
+    )
+
+    counts = {
+        "comments": _delete_in_chunks(
+            db, comments, comments.c.issue_id.in_(project_issue_ids), **chunking
+        ),
+        "issues": _delete_in_chunks(
+            db, issues, issues.c.project_id == project_id, **chunking
+        ),
+        "archived_comments": _delete_in_chunks(
+            db,
+            archived_comments,
+            archived_comments.c.issue_id.in_(archived_issue_ids),
+            **chunking,
+        ),
+        "archived_issues": _delete_in_chunks(
+            db, archived, archived.c.project_id == project_id, **chunking
+        ),
+    }
+    for name, model in (
+        ("attachments", models.Attachment),
+        ("project_storage", models.ProjectStorage),
+        ("webhook_outbox", models.WebhookOutbox),
+        ("webhook_subscriptions", models.WebhookSubscription),
+        ("saved_view_issues", models.SavedViewIssue),
+        ("saved_views", models.SavedView),
+        ("issue_transitions", models.IssueTransition),
+        ("project_daily_stats", models.ProjectDailyStats),
+        ("change_log", models.ChangeLog),
+        ("activity_log", models.ActivityLog),
+        ("members", models.ProjectMember),
+    ):
+        table = model.__table__
+        counts[name] = _delete_in_chunks(
+            db, table, table.c.project_id == project_id, **chunking
+        )
+
+    db.query(models.Project).filter(models.Project.id == project_id).delete(
+        synchronize_session=False
+    )
+    db.commit()
+    return counts
+
+
+def purge_deleted_projects(db: Session, **chunking) -> int:
+    project_ids = [
+        project_id
+        for (project_id,) in db.query(models.Project.id).filter(
+            models.Project.deleted_at.isnot(None)
+        )
+    ]
+    for project_id in project_ids:
+        purge_project(db, project_id, **chunking)
+        shard_router.forget_project(project_id)
+    return len(project_ids)
+
+
+def purge_expired_archive(
+    db: Session, retention_days: int = settings.ARCHIVE_RETENTION_DAYS, **chunking
+) -> int:
+    """Drop archived issues archived more than ``retention_days`` ago."""
+    if retention_days <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    archived = models.ArchivedIssue.__table__
+    archived_comments = models.ArchivedComment.__table__
+    attachments = models.Attachment.__table__
+    expired_ids = select(archived.c.id).where(archived.c.archived_at < cutoff)
+    _delete_in_chunks(
+        db, archived_comments, archived_comments.c.issue_id.in_(expired_ids), **chunking
+    )
+    freed = db.execute(
+        select(attachments.c.project_id, func.count(), func.sum(attachments.c.size))
+        .where(attachments.c.issue_id.in_(expired_ids))
+        .group_by(attachments.c.project_id)
+    ).all()
+    if freed:
+        _delete_in_chunks(
+            db, attachments, attachments.c.issue_id.in_(expired_ids), **chunking
+        )
+        for project_id, files, size in freed:
+            _charge_storage(db, project_id, -size, files=-files)
+        db.commit()
+    return _delete_in_chunks(db, archived, archived.c.archived_at < cutoff, **chunking)
@@ -6,9 +6,13 @@ from sqlalchemy import (
     Enum as SqlEnum,
     Text,
     ForeignKey,
-    DateTime
+    Date,
+    DateTime,
+    Index,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from datetime import datetime
 
 from app.db.base import Base   # <-- Make sure this is correct
@@ -35,6 +39,40 @@ class PriorityEnum(str, Enum):
     high = "high"
 
 
+# Integer ranks stored next to the enums so ordering and range scans work
+# on a compact index. Lower rank sorts first (most urgent / least done).
+STATUS_RANK = {
+    IssueStatusEnum.open: 0,
+    IssueStatusEnum.in_progress: 1,
+    IssueStatusEnum.closed: 2,
+}
+PRIORITY_RANK = {
+    PriorityEnum.high: 0,
+    PriorityEnum.medium: 1,
+    PriorityEnum.low: 2,
+}
+
+
+def status_rank(status) -> int:
+    return STATUS_RANK[IssueStatusEnum(status)]
+
+
+def priority_rank(priority) -> int:
+    return PRIORITY_RANK[PriorityEnum(priority)]
+
+
+def _default_status_rank(context) -> int:
+    return status_rank(
+        context.get_current_parameters().get("status") or IssueStatusEnum.open
+    )
+
+
+def _default_priority_rank(context) -> int:
+    return priority_rank(
+        context.get_current_parameters().get("priority") or PriorityEnum.medium
+    )
+
+
 # ============================
 # MODELS
 # ============================
@@ -61,6 +99,10 @@ class Project(Base):
     description = Column(Text)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)  # <-- add this
+    # last value handed out for this project's change feed
+    change_seq = Column(Integer, nullable=False, default=0)
+    # set by DELETE /api/projects/{id}; the purge job removes the data later
+    deleted_at = Column(DateTime)
 
     owner = relationship("User", back_populates="projects")
     members = relationship("ProjectMember", back_populates="project")
@@ -71,7 +113,7 @@ class ProjectMember(Base):
     __tablename__ = "project_members"
 
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
     user_id = Column(Integer, ForeignKey("users.id"))
     role = Column(SqlEnum(RoleEnum), nullable=False)
     joined_at = Column(DateTime, default=datetime.utcnow)
@@ -82,32 +124,431 @@ class ProjectMember(Base):
 
 class Issue(Base):
     __tablename__ = "issues"
+    __table_args__ = (
+        Index(
+            "ix_issues_project_priority", "project_id", "priority_rank", "created_at"
+        ),
+        Index(
+            "ix_issues_project_status_priority",
+            "project_id",
+            "status_rank",
+            "priority_rank",
+            "created_at",
+        ),
+        # cross-project "my work" lookups, paged by id
+        Index("ix_issues_assignee_id_id", "assignee_id", "id"),
+        Index("ix_issues_reporter_id_id", "reporter_id", "id"),
+        # archiver's scan for long-closed issues
+        Index("ix_issues_status_updated", "status_rank", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
     title = Column(String, nullable=False)
     description = Column(Text)
+    # rendered at write time; re-rendered on read when the version is stale
+    description_html = Column(Text)
+    description_html_version = Column(Integer)
     status = Column(SqlEnum(IssueStatusEnum), default=IssueStatusEnum.open)
     priority = Column(SqlEnum(PriorityEnum), default=PriorityEnum.medium)
+    # mirrors of status/priority; see STATUS_RANK / PRIORITY_RANK
+    status_rank = Column(Integer, nullable=False, default=_default_status_rank)
+    priority_rank = Column(Integer, nullable=False, default=_default_priority_rank)
     reporter_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     assignee_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)  # <-- add this
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # bumped on every write; clients send it back via If-Match
+    version = Column(Integer, nullable=False, default=1)
 
     project = relationship("Project", back_populates="issues")
     assignee = relationship("User", foreign_keys=[assignee_id])
     reporter = relationship("User", foreign_keys=[reporter_id])
-    comments = relationship("Comment", back_populates="issue")
+    # the database deletes comments with their issue; don't load them to do it
+    comments = relationship(
+        "Comment",
+        back_populates="issue",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    is_archived = False
 
 
 class Comment(Base):
     __tablename__ = "comments"
 
     id = Column(Integer, primary_key=True, index=True)
-    issue_id = Column(Integer, ForeignKey("issues.id"))
+    issue_id = Column(Integer, ForeignKey("issues.id", ondelete="CASCADE"), index=True)
     author_id = Column(Integer, ForeignKey("users.id"))  # renamed from user_id
 
     body = Column(Text, nullable=False)
+    body_html = Column(Text)
+    body_html_version = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     issue = relationship("Issue", back_populates="comments")
     user = relationship("User", foreign_keys=[author_id])
+
+
+class ChangeLog(Base):
+    """
+    One row per write to an issue or comment, numbered by the project's
+    change sequence. Rows with op == "delete" (or "archive", for rows
+    moved to the archive tables) are the tombstones clients use to drop
+    entities they have cached.
+    """
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_project_seq", "project_id", "seq", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(
+        Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+    )
+    seq = Column(Integer, nullable=False)
+    entity = Column(String, nullable=False)  # "issue" | "comment"
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # "upsert" | "delete" | "archive"
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ActivityLog(Base):
+    """Append-only, field-level history of issue edits and membership changes."""
+    __tablename__ = "activity_log"
+    __table_args__ = (
+        Index("ix_activity_log_issue_id_id", "issue_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(
+        Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+    )
+    issue_id = Column(Integer)  # no FK: history outlives the issue
+    actor_id = Column(Integer, ForeignKey("users.id"))
+    entity = Column(String, nullable=False)  # "issue" | "member"
+    entity_id = Column(Integer, nullable=False)
+    field = Column(String, nullable=False)
+    old_value = Column(Text)
+    new_value = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class IssueTransition(Base):
+    """
+    One row per issue write that changed its status or priority, including
+    creation (old ranks NULL) and deletion (new ranks NULL). The roll-up
+    job folds rows into project_daily_stats, claiming them with a token.
+    """
+    __tablename__ = "issue_transitions"
+    __table_args__ = (
+        Index("ix_issue_transitions_claim", "rollup_claim", "id"),
+        Index("ix_issue_transitions_issue", "issue_id", "at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(
+        Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+    )
+    issue_id = Column(Integer, nullable=False)  # no FK: outlives the issue
+    at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    old_status_rank = Column(Integer)
+    old_priority_rank = Column(Integer)
+    new_status_rank = Column(Integer)
+    new_priority_rank = Column(Integer)
+    rollup_claim = Column(String)  # set once folded into the daily stats
+
+
+class ProjectDailyStats(Base):
+    """
+    Per project, day and (status, priority): the change in the number of
+    issues in that state, plus how many were created in it and how many
+    moved into its status. Counts on a day are the running sum of ``net``.
+    """
+    __tablename__ = "project_daily_stats"
+    __table_args__ = (
+        UniqueConstraint(
+            "project_id",
+            "day",
+            "status_rank",
+            "priority_rank",
+            name="uq_project_daily_stats_cell",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(
+        Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+    )
+    day = Column(Date, nullable=False)
+    status_rank = Column(Integer, nullable=False)
+    priority_rank = Column(Integer, nullable=False)
+    net = Column(Integer, nullable=False, default=0)
+    created = Column(Integer, nullable=False, default=0)
+    entered = Column(Integer, nullable=False, default=0)
+
+
+class Attachment(Base):
+    """
+    A file attached to an issue. The bytes live in the blob store under
+    their SHA-256, so identical uploads share one file; ``meta`` is filled
+    in by the metadata extractor after the upload (NULL until then).
+    """
+    __tablename__ = "attachments"
+    __table_args__ = (
+        Index("ix_attachments_issue_id_id", "issue_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(
+        Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+    )
+    issue_id = Column(Integer, nullable=False)  # no FK: kept when archived
+    uploader_id = Column(Integer, ForeignKey("users.id"))
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False, index=True)
+    meta = Column(Text)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ProjectStorage(Base):
+    """Bytes and files attached in a project, checked against the quota."""
+    __tablename__ = "project_storage"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(
+        Integer,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
+    bytes_used = Column(Integer, nullable=False, default=0)
+    file_count = Column(Integer, nullable=False, default=0)
+
+
+class SavedView(Base):
+    """
+    A named issue filter shared by a project. The ids of the hot issues it
+    matches are kept in saved_view_issues, updated as issues are written
+    and fully recomputed once refreshed_at is older than the staleness
+    bound.
+    """
+    __tablename__ = "saved_views"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(
+        Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False,
+        index=True,
+    )
+    name = Column(String, nullable=False)
+    filters = Column(Text, nullable=False)  # JSON: q, status, priority, assignee
+    sort = Column(String)  # None, "created_at" or "priority", as for listing
+    created_by = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    refreshed_at = Column(DateTime)  # last full recompute; None = never
+
+
+class SavedViewIssue(Base):
+    __tablename__ = "saved_view_issues"
+    # not unique: a recompute racing an issue write may briefly leave a
+    # duplicate, which reads ignore and the next recompute removes
+    __table_args__ = (
+        Index("ix_saved_view_issues_view", "view_id", "issue_id"),
+        Index("ix_saved_view_issues_issue", "issue_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    view_id = Column(
+        Integer, ForeignKey("saved_views.id", ondelete="CASCADE"), nullable=False
+    )
+    project_id = Column(
+        Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+    )
+    issue_id = Column(Integer, nullable=False)
+
+
+class WebhookSubscription(Base):
+    """An endpoint that receives a project's events, in batches."""
+    __tablename__ = "webhook_subscriptions"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(
+        Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False,
+        index=True,
+    )
+    url = Column(String, nullable=False)
+    secret = Column(String)  # HMAC-SHA256 key for the signature header
+    events = Column(String, nullable=False)  # comma-separated event names
+    created_by = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class WebhookOutbox(Base):
+    """
+    Events waiting for delivery, one row per subscription, inserted in the
+    same transaction as the change they describe. Rows with a NULL
+    next_attempt_at and no delivered_at have used up their attempts.
+    """
+    __tablename__ = "webhook_outbox"
+    __table_args__ = (
+        Index("ix_webhook_outbox_due", "delivered_at", "next_attempt_at", "id"),
+        Index(
+            "ix_webhook_outbox_subscription_due",
+            "subscription_id",
+            "delivered_at",
+            "next_attempt_at",
+            "id",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(
+        Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+    )
+    subscription_id = Column(
+        Integer,
+        ForeignKey("webhook_subscriptions.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    event = Column(String, nullable=False)  # e.g. "issue.updated"
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    claim = Column(String)  # token of the dispatcher delivering the row
+    delivered_at = Column(DateTime)
+    last_error = Column(Text)
+
+
+class ProjectDirectory(Base):
+    """
+    Global: which shard holds each project. Its id is the project's id on
+    that shard, and the unique key makes project keys unique everywhere.
+    """
+    __tablename__ = "project_directory"
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String, unique=True, nullable=False)
+    shard = Column(Integer, nullable=False, default=0)
+
+
+class IdBlock(Base):
+    """Global: next free id per sharded table, reserved in blocks."""
+    __tablename__ = "id_blocks"
+
+    name = Column(String, primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+
+class Invalidation(Base):
+    """
+    Cache invalidation messages, appended in the same transaction as the
+    write they describe. Every worker polls the table and drops its cached
+    entries for (entity, entity_id).
+    """
+    __tablename__ = "invalidations"
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)  # "project_members" | "issue"
+    entity_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class Notification(Base):
+    """
+    Global: one inbox entry per recipient, written in batches by the
+    notification writer. project/issue/comment ids point into the
+    project's shard, so they carry no foreign keys.
+    """
+    __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String, nullable=False)  # "mention" | "assigned"
+    project_id = Column(Integer, nullable=False)
+    issue_id = Column(Integer, nullable=False)
+    comment_id = Column(Integer)
+    actor_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    read_at = Column(DateTime, nullable=True)
+
+
+class NotificationCounter(Base):
+    """Global: unread notifications per user, kept in step with the inbox."""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread = Column(Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(Base):
+    """Stored response of a POST made with an Idempotency-Key header."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_user_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    fingerprint = Column(String(64), nullable=False)  # sha256 hex of the request
+    # both NULL while the request holding the key is still running
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+# ============================
+# ARCHIVE
+# ============================
+# Closed issues (and their comments) are moved here after
+# ARCHIVE_CLOSED_AFTER_DAYS so the hot tables and their indexes stay small.
+# Same columns as issues/comments, keeping the original ids.
+
+class ArchivedIssue(Base):
+    __tablename__ = "archived_issues"
+    __table_args__ = (
+        Index("ix_archived_issues_project_created", "project_id", "created_at"),
+        Index("ix_archived_issues_assignee_id_id", "assignee_id", "id"),
+        Index("ix_archived_issues_reporter_id_id", "reporter_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
+    title = Column(String, nullable=False)
+    description = Column(Text)
+    description_html = Column(Text)
+    description_html_version = Column(Integer)
+    status = Column(SqlEnum(IssueStatusEnum))
+    priority = Column(SqlEnum(PriorityEnum))
+    status_rank = Column(Integer, nullable=False)
+    priority_rank = Column(Integer, nullable=False)
+    reporter_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    assignee_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    version = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, server_default=func.now())
+
+    is_archived = True
+
+
+class ArchivedComment(Base):
+    __tablename__ = "archived_comments"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    issue_id = Column(Integer, index=True)
+    author_id = Column(Integer, ForeignKey("users.id"))
+    body = Column(Text, nullable=False)
+    body_html = Column(Text)
+    body_html_version = Column(Integer)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
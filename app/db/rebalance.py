@@ -0,0 +1,186 @@
+"""
+Move a project to another shard.
+
+    python -m app.db.rebalance PROJECT_ID TARGET_SHARD
+
+Copies the project's rows to the target shard in one transaction, points
+the project directory at the target (workers pick the change up through the
+invalidation bus), waits for that to settle and deletes the source rows in
+chunks. Pause writes to the project while it moves: if its change sequence
+moves during the copy the move is abandoned, and if it moves before the
+switch has reached every worker the source rows are kept for inspection.
+"""
+import argparse
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.invalidation import invalidation_bus
+from app.crud import crud
+from app.db import models
+from app.db.shards import shard_router
+
+
+def _project_tables(project_id: int) -> List[Tuple[object, object, bool]]:
+    """
+    (table, rows of the project, keep ids) with parents before children.
+    Issues, comments, webhooks, attachments, saved views and the project
+    keep their ids, which are unique across shards; the other tables get
+    fresh ids on the target. Attachment files are shared by all shards and
+    are not copied.
+    """
+    projects = models.Project.__table__
+    members = models.ProjectMember.__table__
+    issues = models.Issue.__table__
+    comments = models.Comment.__table__
+    archived = models.ArchivedIssue.__table__
+    archived_comments = models.ArchivedComment.__table__
+    change_log = models.ChangeLog.__table__
+    activity = models.ActivityLog.__table__
+    webhooks = models.WebhookSubscription.__table__
+    outbox = models.WebhookOutbox.__table__
+    attachments = models.Attachment.__table__
+    storage = models.ProjectStorage.__table__
+    views = models.SavedView.__table__
+    transitions = models.IssueTransition.__table__
+    daily_stats = models.ProjectDailyStats.__table__
+    view_issues = models.SavedViewIssue.__table__
+    issue_ids = select(issues.c.id).where(issues.c.project_id == project_id)
+    archived_ids = select(archived.c.id).where(archived.c.project_id == project_id)
+    return [
+        (projects, projects.c.id == project_id, True),
+        (members, members.c.project_id == project_id, False),
+        (issues, issues.c.project_id == project_id, True),
+        (comments, comments.c.issue_id.in_(issue_ids), True),
+        (archived, archived.c.project_id == project_id, True),
+        (archived_comments, archived_comments.c.issue_id.in_(archived_ids), True),
+        (change_log, change_log.c.project_id == project_id, False),
+        (activity, activity.c.project_id == project_id, False),
+        (webhooks, webhooks.c.project_id == project_id, True),
+        (outbox, outbox.c.project_id == project_id, False),
+        (attachments, attachments.c.project_id == project_id, True),
+        (storage, storage.c.project_id == project_id, False),
+        (views, views.c.project_id == project_id, True),
+        (view_issues, view_issues.c.project_id == project_id, False),
+        (transitions, transitions.c.project_id == project_id, False),
+        (daily_stats, daily_stats.c.project_id == project_id, False),
+    ]
+
+
+def _user_columns(table) -> List[str]:
+    return [
+        column.name
+        for column in table.columns
+        if any(fk.column.table.name == "users" for fk in column.foreign_keys)
+    ]
+
+
+def copy_project(
+    source_db: Session,
+    target_db: Session,
+    project_id: int,
+    chunk_size: int = settings.PURGE_CHUNK_SIZE,
+) -> Dict[str, int]:
+    """Copy every row of the project into ``target_db`` (not committed)."""
+    counts = {}
+    for table, where, keep_ids in _project_tables(project_id):
+        user_columns = _user_columns(table)
+        copied = last_id = 0
+        while True:
+            rows = source_db.execute(
+                select(table)
+                .where(where, table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            values = [dict(row._mapping) for row in rows]
+            shard_router.mirror_users(
+                target_db, {v[name] for v in values for name in user_columns}
+            )
+            if not keep_ids:
+                for v in values:
+                    del v["id"]
+            target_db.execute(table.insert(), values)
+            copied += len(values)
+        counts[table.name] = copied
+    return counts
+
+
+def _change_seq(db: Session, project_id: int) -> Optional[int]:
+    db.rollback()  # read the latest committed value
+    return (
+        db.query(models.Project.change_seq)
+        .filter(models.Project.id == project_id)
+        .scalar()
+    )
+
+
+def move_project(
+    project_id: int,
+    target: int,
+    chunk_size: int = settings.PURGE_CHUNK_SIZE,
+    settle_seconds: float = 2 * settings.INVALIDATION_POLL_INTERVAL_SECONDS,
+) -> Dict[str, int]:
+    """Move a project to shard ``target``; returns rows copied per table."""
+    if not 0 <= target < len(shard_router.engines):
+        raise ValueError(f"No shard {target}")
+    shard_router.sync_directory()
+    source = shard_router.shard_for_project(project_id)
+    if source == target:
+        raise ValueError(f"Project {project_id} is already on shard {target}")
+
+    source_db = shard_router.session(source)
+    target_db = shard_router.session(target)
+    try:
+        seq = _change_seq(source_db, project_id)
+        if seq is None:
+            raise ValueError(f"Project {project_id} not found on shard {source}")
+
+        counts = copy_project(source_db, target_db, project_id, chunk_size)
+        if _change_seq(source_db, project_id) != seq:
+            target_db.rollback()
+            raise RuntimeError("Project changed during the copy; retry when quiet")
+        target_db.commit()
+
+        with Session(shard_router.global_engine) as global_db:
+            global_db.query(models.ProjectDirectory).filter(
+                models.ProjectDirectory.id == project_id
+            ).update({"shard": target}, synchronize_session=False)
+            invalidation_bus.publish(global_db, "project_shard", project_id)
+            global_db.commit()
+
+        # let every worker's bus poll see the new location
+        time.sleep(settle_seconds)
+        if _change_seq(source_db, project_id) != seq:
+            raise RuntimeError(
+                f"Project was written on shard {source} after the copy; "
+                "its rows there were kept for reconciliation"
+            )
+        crud.purge_project(source_db, project_id, chunk_size=chunk_size)
+        return counts
+    finally:
+        source_db.close()
+        target_db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move a project to another shard")
+    parser.add_argument("project_id", type=int)
+    parser.add_argument("target_shard", type=int)
+    parser.add_argument("--chunk-size", type=int, default=settings.PURGE_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    shard_router.create_all()
+    counts = move_project(args.project_id, args.target_shard, args.chunk_size)
+    for table, copied in counts.items():
+        print(f"{table:>20} {copied:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,24 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+
+def make_engine(url: str):
+    engine = create_engine(
+        url, connect_args={"check_same_thread": False} if "sqlite" in url else {}
+    )
+    if engine.dialect.name == "sqlite":
+        # SQLite ignores ON DELETE CASCADE unless foreign keys are switched on
+        @event.listens_for(engine, "connect")
+        def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    return engine
+
+
 # sqlite local dev; for Postgres, set DATABASE_URL in .env
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+engine = make_engine(settings.DATABASE_URL)
+
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
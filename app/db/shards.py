@@ -0,0 +1,305 @@
+import threading
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.invalidation import invalidation_bus
+from app.db import models
+from app.db.base import Base
+from app.db.session import engine, make_engine
+
+# ids that appear in URLs without their project: unique across shards
+ID_BLOCK_TABLES = {
+    "issues": (models.Issue, models.ArchivedIssue),
+    "comments": (models.Comment, models.ArchivedComment),
+    "webhook_subscriptions": (models.WebhookSubscription,),
+    "attachments": (models.Attachment,),
+    "saved_views": (models.SavedView,),
+}
+
+
+def _url(engine_) -> str:
+    return engine_.url.render_as_string(hide_password=False)
+
+
+class ShardRouter:
+    """
+    Maps projects to databases. The global database keeps users, the
+    project directory and the id blocks; each shard keeps whole projects
+    (members, issues, comments, logs) plus copies of the user rows they
+    reference. With a single shard the global database is that shard and
+    everything behaves as an unsharded install.
+    """
+
+    def __init__(
+        self,
+        global_engine,
+        shard_urls: List[str],
+        block_size: int = settings.SHARD_ID_BLOCK_SIZE,
+        cache_size: int = settings.INVALIDATION_CACHE_SIZE,
+    ):
+        self.block_size = block_size
+        self.cache_size = cache_size
+        self._project_shards: Dict[int, int] = {}
+        self._issue_shards: Dict[int, int] = {}
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self.configure(global_engine, shard_urls)
+
+    def configure(self, global_engine, shard_urls: List[str]) -> None:
+        self.global_engine = global_engine
+        self.shard_urls = list(shard_urls)
+        self.engines = [
+            global_engine if url == _url(global_engine) else make_engine(url)
+            for url in shard_urls
+        ] or [global_engine]
+        self._sessionmakers = [
+            sessionmaker(autocommit=False, autoflush=False, bind=e)
+            for e in self.engines
+        ]
+        with self._lock:
+            self._project_shards.clear()
+            self._issue_shards.clear()
+            self._blocks.clear()
+
+    def serves(self, database_url: str, shard_urls: List[str]) -> bool:
+        """Whether the router is configured for exactly these databases."""
+        url = make_url(database_url).render_as_string(hide_password=False)
+        return url == _url(self.global_engine) and list(shard_urls) == self.shard_urls
+
+    def prewarm(self, connections: int) -> int:
+        """
+        Open up to ``connections`` pooled connections per database and put
+        them back, so the first requests after startup don't pay for
+        connecting. Databases without a connection pool are skipped.
+        """
+        opened = 0
+        for engine_ in self.all_engines():
+            if not isinstance(engine_.pool, QueuePool):
+                continue
+            held = []
+            try:
+                for _ in range(min(connections, engine_.pool.size())):
+                    held.append(engine_.connect())
+            finally:
+                for conn in held:
+                    conn.close()
+            opened += len(held)
+        return opened
+
+    def dispose(self) -> None:
+        for engine_ in self.all_engines():
+            engine_.dispose()
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.engines) > 1
+
+    def all_engines(self) -> List:
+        """Every distinct database, global first."""
+        engines = [self.global_engine]
+        engines.extend(e for e in self.engines if e is not self.global_engine)
+        return engines
+
+    def create_all(self) -> None:
+        for engine_ in self.all_engines():
+            Base.metadata.create_all(bind=engine_)
+
+    def sync_directory(self) -> int:
+        """
+        Add directory entries for projects created before the directory
+        existed (or copied in by hand); returns how many were added.
+        """
+        directory = models.ProjectDirectory.__table__
+        projects = models.Project.__table__
+        with self.global_engine.connect() as conn:
+            known = {row[0] for row in conn.execute(select(directory.c.id))}
+        added = []
+        for index, engine_ in enumerate(self.engines):
+            with engine_.connect() as conn:
+                added.extend(
+                    {"id": row.id, "key": row.key, "shard": index}
+                    for row in conn.execute(select(projects.c.id, projects.c.key))
+                    if row.id not in known
+                )
+        if added:
+            with self.global_engine.begin() as conn:
+                conn.execute(directory.insert(), added)
+        return len(added)
+
+    def is_global(self, shard: Optional[int]) -> bool:
+        return shard is None or self.engines[shard] is self.global_engine
+
+    def session(self, shard: int) -> Session:
+        return self._sessionmakers[shard]()
+
+    def each_shard(self) -> Iterator[Tuple[int, Session]]:
+        for index in range(len(self.engines)):
+            db = self.session(index)
+            try:
+                yield index, db
+            finally:
+                db.close()
+
+    # --- routing ---
+    def choose_shard(self, key: str) -> int:
+        """Home shard for a new project, from a stable hash of its key."""
+        return zlib.crc32(key.encode()) % len(self.engines)
+
+    def _remember(self, cache: Dict[int, int], key: int, shard: int) -> None:
+        with self._lock:
+            if len(cache) >= self.cache_size:
+                cache.clear()
+            cache[key] = shard
+
+    def shard_for_project(self, project_id: int) -> int:
+        """Unknown projects go to shard 0, which then answers 404 / 403."""
+        if not self.sharded:
+            return 0
+        shard = self._project_shards.get(project_id)
+        if shard is None:
+            table = models.ProjectDirectory.__table__
+            with self.global_engine.connect() as conn:
+                shard = conn.execute(
+                    select(table.c.shard).where(table.c.id == project_id)
+                ).scalar()
+            if shard is None:
+                return 0
+            self._remember(self._project_shards, project_id, shard)
+        return shard
+
+    def shard_for_issue(self, issue_id: int) -> int:
+        if not self.sharded:
+            return 0
+        shard = self._issue_shards.get(issue_id)
+        if shard is None:
+            # ids are unique across shards, so the first hit is the one
+            for index, engine_ in enumerate(self.engines):
+                with engine_.connect() as conn:
+                    if any(
+                        conn.execute(
+                            select(model.id).where(model.id == issue_id)
+                        ).first()
+                        for model in (models.Issue, models.ArchivedIssue)
+                    ):
+                        shard = index
+                        break
+            if shard is None:
+                return 0
+            self._remember(self._issue_shards, issue_id, shard)
+        return shard
+
+    def shard_for_path(self, path_params: Dict[str, str]) -> Optional[int]:
+        """Shard for a route's path parameters; None means the global db."""
+        if "project_id" in path_params:
+            return self.shard_for_project(int(path_params["project_id"]))
+        if "issue_id" in path_params:
+            return self.shard_for_issue(int(path_params["issue_id"]))
+        return None
+
+    def engine_for_project(self, project_id: int):
+        return self.engines[self.shard_for_project(project_id)]
+
+    def forget_location(self, project_id: int) -> None:
+        with self._lock:
+            self._project_shards.pop(project_id, None)
+            # issue locations aren't tracked per project; moves are rare
+            self._issue_shards.clear()
+
+    def forget_project(self, project_id: int) -> None:
+        """Drop a purged project from the directory."""
+        table = models.ProjectDirectory.__table__
+        with self.global_engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.id == project_id))
+        self.forget_location(project_id)
+
+    # --- ids and users ---
+    def allocate_id(self, name: str) -> Optional[int]:
+        """
+        Next id for a table in ID_BLOCK_TABLES, or None (let the database
+        pick) when unsharded. Ids come from blocks reserved in the global
+        database, so most calls touch no database at all.
+        """
+        if not self.sharded:
+            return None
+        with self._lock:
+            next_id, end = self._blocks.get(name, (0, 0))
+            if next_id >= end:
+                end = self._reserve_block(name)
+                next_id = end - self.block_size
+            self._blocks[name] = (next_id + 1, end)
+            return next_id
+
+    def _reserve_block(self, name: str) -> int:
+        """Claim ids [end - block_size, end) and return end."""
+        table = models.IdBlock.__table__
+        for _ in range(2):
+            with self.global_engine.begin() as conn:
+                bumped = conn.execute(
+                    update(table)
+                    .where(table.c.name == name)
+                    .values(next_id=table.c.next_id + self.block_size)
+                )
+                if bumped.rowcount:
+                    return conn.execute(
+                        select(table.c.next_id).where(table.c.name == name)
+                    ).scalar()
+            # first block ever: start above every id already on any shard
+            try:
+                with self.global_engine.begin() as conn:
+                    conn.execute(
+                        table.insert().values(name=name, next_id=self._max_id(name) + 1)
+                    )
+            except IntegrityError:
+                pass  # another worker created it first
+        raise RuntimeError(f"Could not reserve an id block for {name}")
+
+    def _max_id(self, name: str) -> int:
+        highest = 0
+        for engine_ in self.all_engines():
+            with engine_.connect() as conn:
+                for model in ID_BLOCK_TABLES[name]:
+                    value = conn.execute(select(func.max(model.id))).scalar()
+                    highest = max(highest, value or 0)
+        return highest
+
+    def mirror_users(self, db: Session, user_ids: Iterable[Optional[int]]) -> None:
+        """
+        Copy the profiles of ``user_ids`` onto ``db``'s shard, so foreign
+        keys and member/user joins work there. Authentication only ever
+        reads the global users table.
+        """
+        if db.get_bind() is self.global_engine:
+            return
+        ids = {user_id for user_id in user_ids if user_id is not None}
+        if not ids:
+            return
+        users = models.User.__table__
+        present = {
+            user_id
+            for (user_id,) in db.execute(select(users.c.id).where(users.c.id.in_(ids)))
+        }
+        missing = ids - present
+        if not missing:
+            return
+        with self.global_engine.connect() as conn:
+            rows = conn.execute(
+                select(users.c.id, users.c.name, users.c.email, users.c.created_at)
+                .where(users.c.id.in_(missing))
+            ).all()
+        if rows:
+            db.execute(
+                users.insert(), [{**row._mapping, "password_hash": ""} for row in rows]
+            )
+
+
+shard_router = ShardRouter(engine, settings.SHARD_DATABASE_URLS)
+invalidation_bus.subscribe(
+    "project_shard", lambda project_id, _: shard_router.forget_location(project_id)
+)
@@ -1,9 +1,24 @@
 # app/main.py
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
-from app.db import models
-from app.db.session import engine
+from app.db.session import SessionLocal, make_engine
+from app.db.shards import shard_router
+from app.core.activity import activity_writer
+from app.core.archive import archive_job
+from app.core.purge import purge_job
+from app.core.rollups import rollup_job
+from app.core.config import Settings, settings
+from app.core.compression import CompressionMiddleware
+from app.core.admission import AdmissionMiddleware
+from app.core.invalidation import invalidation_bus
+from app.core.notifications import notification_writer
+from app.core.webhooks import webhook_dispatcher
+from app.core.attachments import metadata_extractor
 
 # import routers
 from app.api.auth import router as auth_router
@@ -11,30 +26,115 @@ from app.api.projects import router as projects_router
 from app.api.issues import router as issues_router
 from app.api.project_members import router as members_router
 from app.api.comments import router as comments_router
+from app.api.changes import router as changes_router
+from app.api.me import router as me_router
+from app.api.batch import router as batch_router
+from app.api.webhooks import router as webhooks_router
+from app.api.attachments import router as attachments_router
+from app.api.views import router as views_router
+
+ROUTERS = [
+    auth_router,
+    projects_router,
+    issues_router,
+    members_router,
+    comments_router,
+    changes_router,
+    me_router,
+    batch_router,
+    webhooks_router,
+    attachments_router,
+    views_router,
+]
+
+
+def _connect(app_settings: Settings) -> None:
+    """
+    Point the sessions at ``app_settings``' databases (already the case
+    unless they differ from the import-time settings), create missing
+    tables when asked to and fill the connection pools.
+    """
+    if not shard_router.serves(
+        app_settings.DATABASE_URL, app_settings.SHARD_DATABASE_URLS
+    ):
+        global_engine = make_engine(app_settings.DATABASE_URL)
+        SessionLocal.configure(bind=global_engine)
+        shard_router.configure(global_engine, app_settings.SHARD_DATABASE_URLS)
+    if app_settings.DB_CREATE_SCHEMA:
+        shard_router.create_all()
+        shard_router.sync_directory()
+    shard_router.prewarm(app_settings.DB_POOL_PREWARM)
+
+
+def start_background_jobs(app_settings: Settings = settings) -> None:
+    activity_writer.start()
+    notification_writer.start()
+    invalidation_bus.start()
+    if app_settings.ARCHIVE_ENABLED:
+        archive_job.start()
+    purge_job.start()
+    rollup_job.start()
+    metadata_extractor.start()
+    if app_settings.WEBHOOK_ENABLED:
+        webhook_dispatcher.start()
+
+
+def stop_background_jobs() -> None:
+    webhook_dispatcher.stop()
+    metadata_extractor.stop()
+    rollup_job.stop()
+    purge_job.stop()
+    archive_job.stop()
+    invalidation_bus.stop()
+    notification_writer.stop()
+    activity_writer.stop()
+
+
+def create_app(app_settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Build the application. Nothing here touches a database: connecting,
+    schema creation and the background jobs happen in the lifespan, when a
+    server (or a ``with TestClient(app)`` block) starts the app.
+
+        uvicorn --factory app.main:create_app
+    """
+    app_settings = app_settings or settings
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await run_in_threadpool(_connect, app_settings)
+        start_background_jobs(app_settings)
+        try:
+            yield
+        finally:
+            await run_in_threadpool(stop_background_jobs)
+            shard_router.dispose()
+
+    app = FastAPI(title="IssueHub Backend", lifespan=lifespan)
+
+    # innermost, so CORS headers are added to its 503s
+    if app_settings.ADMISSION_ENABLED:
+        app.add_middleware(AdmissionMiddleware)
 
-# ensure tables exist for dev
-models.Base.metadata.create_all(bind=engine)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:5173"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
-app = FastAPI(title="IssueHub Backend")
+    if app_settings.COMPRESSION_ENABLED:
+        app.add_middleware(CompressionMiddleware)
 
-origins = ["http://localhost:5173"]
+    for router in ROUTERS:
+        app.include_router(router)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    @app.get("/")
+    def root():
+        return {"message": "IssueHub is running"}
 
-# include routers
-app.include_router(auth_router)
-app.include_router(projects_router)
-app.include_router(issues_router)
-app.include_router(members_router)
-app.include_router(comments_router)
+    return app
 
 
-@app.get("/")
-def root():
-    return {"message": "IssueHub is running"}
+app = create_app()
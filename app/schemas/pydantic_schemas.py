@@ -1,8 +1,10 @@
-from datetime import datetime
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+import json
+from datetime import date, datetime
+from pydantic import BaseModel, EmailStr, Field, HttpUrl, field_validator
+from typing import Any, Dict, List, Literal, Optional, get_args
 
 # Import enums from DB models
+from app.core.markdown import MAX_SOURCE_LENGTH
 from app.db.models import RoleEnum, IssueStatusEnum, PriorityEnum
 
 # -------------------- AUTH SCHEMAS --------------------
@@ -47,6 +49,14 @@ class ProjectOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class ProjectSummaryOut(ProjectOut):
+    role: RoleEnum
+    member_count: int
+    open_issue_count: int
+    in_progress_issue_count: int
+    closed_issue_count: int
+
+
 # -------------------- PROJECT MEMBER SCHEMAS --------------------
 
 class ProjectMemberCreate(BaseModel):
@@ -54,31 +64,52 @@ class ProjectMemberCreate(BaseModel):
     role: RoleEnum
 
 
+class MemberUserOut(BaseModel):
+    id: int
+    name: str
+    email: EmailStr
+
+    model_config = {"from_attributes": True}
+
+
 class ProjectMemberOut(BaseModel):
     id: int
     project_id: int
     user_id: int
     role: RoleEnum
     joined_at: datetime
+    user: Optional[MemberUserOut] = None
 
     model_config = {"from_attributes": True}
 
 
+class ProjectMembersBatchCreate(BaseModel):
+    members: List[ProjectMemberCreate]
+
+
+class ProjectMembersBatchOut(BaseModel):
+    added: List[ProjectMemberOut]
+    skipped_existing: List[EmailStr]
+    not_found: List[EmailStr]
+
+
 # -------------------- ISSUE SCHEMAS --------------------
 
 class IssueCreate(BaseModel):
     title: str
-    description: Optional[str] = None
+    description: Optional[str] = Field(default=None, max_length=MAX_SOURCE_LENGTH)
     priority: PriorityEnum
     assignee_id: Optional[int] = None
 
 
 class IssueUpdate(BaseModel):
     title: Optional[str] = None
-    description: Optional[str] = None
+    description: Optional[str] = Field(default=None, max_length=MAX_SOURCE_LENGTH)
     status: Optional[IssueStatusEnum] = None
     priority: Optional[PriorityEnum] = None
     assignee_id: Optional[int] = None
+    # alternative to the If-Match header for clients that can't set headers
+    version: Optional[int] = None
 
 
 class IssueOut(BaseModel):
@@ -91,14 +122,62 @@ class IssueOut(BaseModel):
     reporter_id: int
     assignee_id: Optional[int]
     created_at: datetime
+    updated_at: Optional[datetime] = None
+    version: int = 1
+    is_archived: bool = False
 
     model_config = {"from_attributes": True}
 
 
+class SimilarIssueOut(BaseModel):
+    id: int
+    title: str
+    score: float
+
+
+class IssueCreateOut(IssueOut):
+    # likely duplicates already in the project, best match first
+    possible_duplicates: List[SimilarIssueOut] = []
+
+
+# -------------------- ATTACHMENT SCHEMAS --------------------
+
+class AttachmentOut(BaseModel):
+    id: int
+    issue_id: int
+    uploader_id: Optional[int]
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    # image dimensions, line count, ...; None until extracted
+    meta: Optional[Dict[str, Any]] = None
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+    @field_validator("meta", mode="before")
+    @classmethod
+    def parse_meta(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
+
+
+class IssueDetailOut(IssueOut):
+    attachments: List[AttachmentOut] = []
+    # only filled when requested with ?html=true
+    description_html: Optional[str] = None
+
+
+class ProjectStorageOut(BaseModel):
+    bytes_used: int
+    file_count: int
+    quota_bytes: int
+
+
 # -------------------- COMMENT SCHEMAS --------------------
 
 class CommentCreate(BaseModel):
-    body: str
+    body: str = Field(max_length=MAX_SOURCE_LENGTH)
 
 
 class CommentOut(BaseModel):
@@ -107,5 +186,180 @@ class CommentOut(BaseModel):
     author_id: int
     body: str
     created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+
+class CommentHtmlOut(CommentOut):
+    # only filled when requested with ?html=true
+    body_html: Optional[str] = None
+
+
+# -------------------- ACTIVITY SCHEMAS --------------------
+
+class ActivityOut(BaseModel):
+    id: int
+    project_id: int
+    issue_id: Optional[int]
+    actor_id: Optional[int]
+    entity: str
+    entity_id: int
+    field: str
+    old_value: Optional[str]
+    new_value: Optional[str]
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+# -------------------- NOTIFICATION SCHEMAS --------------------
+
+class NotificationOut(BaseModel):
+    id: int
+    kind: str  # "mention" | "assigned"
+    project_id: int
+    issue_id: int
+    comment_id: Optional[int]
+    actor_id: Optional[int]
+    created_at: datetime
+    read_at: Optional[datetime]
 
     model_config = {"from_attributes": True}
+
+
+class NotificationsRead(BaseModel):
+    ids: Optional[List[int]] = None  # None marks every notification read
+
+
+class UnreadCountOut(BaseModel):
+    unread: int
+
+
+# -------------------- WEBHOOK SCHEMAS --------------------
+
+WebhookEvent = Literal[
+    "issue.created", "issue.updated", "issue.deleted", "comment.created"
+]
+
+
+class WebhookCreate(BaseModel):
+    url: HttpUrl
+    # deliveries carry X-IssueHub-Signature: sha256=<HMAC of the body>
+    secret: Optional[str] = None
+    events: List[WebhookEvent] = Field(
+        default=list(get_args(WebhookEvent)), min_length=1
+    )
+
+
+class WebhookOut(BaseModel):
+    id: int
+    project_id: int
+    url: str
+    events: List[str]
+    created_by: Optional[int]
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+    @field_validator("events", mode="before")
+    @classmethod
+    def split_events(cls, value):
+        return value.split(",") if isinstance(value, str) else value
+
+
+# -------------------- SAVED VIEW SCHEMAS --------------------
+
+class IssueFilters(BaseModel):
+    # same meaning as the issue listing's query parameters
+    q: Optional[str] = None
+    status: Optional[IssueStatusEnum] = None
+    priority: Optional[PriorityEnum] = None
+    assignee: Optional[int] = None
+
+
+class SavedViewCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    filters: IssueFilters = IssueFilters()
+    sort: Optional[Literal["created_at", "priority"]] = None
+
+
+class SavedViewOut(BaseModel):
+    id: int
+    project_id: int
+    name: str
+    filters: IssueFilters
+    sort: Optional[str]
+    created_by: Optional[int]
+    created_at: datetime
+    refreshed_at: Optional[datetime]
+
+    model_config = {"from_attributes": True}
+
+    @field_validator("filters", mode="before")
+    @classmethod
+    def parse_filters(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
+
+
+# -------------------- TIME SERIES SCHEMAS --------------------
+
+class TimeseriesPoint(BaseModel):
+    day: date
+    # issues in each status at the end of the day
+    by_status: Dict[str, int]
+    # issues not closed at the end of the day, per priority
+    open_by_priority: Dict[str, int]
+    remaining: int
+    # created that day / moved to closed that day
+    created: int
+    closed: int
+
+
+class TimeseriesOut(BaseModel):
+    project_id: int
+    start: date
+    end: date
+    points: List[TimeseriesPoint]
+
+
+# -------------------- CHANGE FEED SCHEMAS --------------------
+
+class TombstoneOut(BaseModel):
+    entity: str
+    id: int
+    seq: int
+    # moved to the archive rather than deleted; still readable by id
+    archived: bool = False
+
+
+class ChangesOut(BaseModel):
+    cursor: int
+    has_more: bool
+    issues: List[IssueOut]
+    comments: List[CommentOut]
+    deleted: List[TombstoneOut]
+
+
+# -------------------- BATCH SCHEMAS --------------------
+
+class BatchRequestItem(BaseModel):
+    id: Optional[str] = None
+    method: Literal["GET"] = "GET"
+    path: str  # e.g. "/api/projects/1/issues?sort=priority"
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchRequestItem]
+    # run sub-requests in parallel, each with its own DB session
+    concurrent: bool = False
+
+
+class BatchResponseItem(BaseModel):
+    id: Optional[str] = None
+    status: int
+    body: Any = None
+
+
+class BatchOut(BaseModel):
+    responses: List[BatchResponseItem]
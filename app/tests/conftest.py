@@ -1,5 +1,19 @@
-import sys
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Add project root to Python path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
\ No newline at end of file
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+# Each run gets its own databases and attachment directory instead of the
+# developer's ./issuehub.db. This has to happen before app.core.config is
+# imported: the engines, shard router and other singletons are built from
+# the settings at import time.
+_TEST_DIR = tempfile.mkdtemp(prefix="issuehub-tests-")
+atexit.register(shutil.rmtree, _TEST_DIR, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DIR, 'issuehub.db')}"
+os.environ["SHARD_DATABASE_URLS"] = "[]"
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+os.environ["ATTACHMENT_DIR"] = os.path.join(_TEST_DIR, "attachments")
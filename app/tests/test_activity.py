@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.activity import ActivityWriter
+from app.db import models
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_issue_history_records_field_diffs():
+    headers = auth_headers(create_user_and_get_token("history@example.com", "secret"))
+    project_id = create_project(headers, "History")
+    issue_id = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "Old title", "priority": "low"},
+        headers=headers,
+    ).json()["id"]
+
+    client.patch(
+        f"/api/issues/{issue_id}",
+        json={"title": "New title", "priority": "low"},
+        headers=headers,
+    )
+    client.patch(f"/api/issues/{issue_id}", json={"status": "closed"}, headers=headers)
+
+    resp = client.get(f"/api/issues/{issue_id}/activity", headers=headers)
+    assert resp.status_code == 200
+    history = resp.json()
+    # unchanged priority is not recorded; newest entry first
+    assert [(h["field"], h["old_value"], h["new_value"]) for h in history] == [
+        ("status", "open", "closed"),
+        ("title", "Old title", "New title"),
+    ]
+
+    resp = client.get(
+        f"/api/issues/{issue_id}/activity?limit=1&before_id={history[0]['id']}",
+        headers=headers,
+    )
+    assert [h["field"] for h in resp.json()] == ["title"]
+
+
+def test_activity_writer_flushes_in_batches():
+    # one shared connection so the writer thread sees the same in-memory db
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    models.Base.metadata.create_all(bind=engine)
+    writer = ActivityWriter(bind=engine, flush_interval=60, batch_size=100)
+
+    for i in range(3):
+        writer.record(
+            project_id=1, actor_id=1, entity="issue", entity_id=1,
+            issue_id=1, field="title", old_value=str(i), new_value=str(i + 1),
+        )
+    assert writer.pending() == 3
+    assert writer.flush() == 3
+    assert writer.pending() == 0
+
+    with engine.connect() as conn:
+        rows = conn.execute(models.ActivityLog.__table__.select()).fetchall()
+    assert [r.new_value for r in rows] == ["1", "2", "3"]
+
+    writer.start()
+    writer.record(project_id=1, actor_id=1, entity="member", entity_id=2, field="role")
+    writer.stop(flush=True)
+    assert writer.pending() == 0
+
+
+def test_activity_writer_keeps_a_bounded_backlog_while_writes_fail(caplog):
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    # no tables: every insert fails
+    writer = ActivityWriter(
+        bind=engine, flush_interval=60, batch_size=100, max_buffered=5
+    )
+
+    for round_ in range(3):
+        for i in range(3):
+            writer.record(
+                project_id=1, actor_id=1, entity="issue", entity_id=1,
+                issue_id=1, field="title", new_value=f"{round_}.{i}",
+            )
+        with pytest.raises(Exception):
+            writer.flush()
+    assert writer.pending() == 5
+    assert "dropped" in caplog.text
+
+    models.Base.metadata.create_all(bind=engine)
+    assert writer.flush() == 5
+    with engine.connect() as conn:
+        rows = conn.execute(models.ActivityLog.__table__.select()).fetchall()
+    # the newest entries survive
+    assert [r.new_value for r in rows] == ["1.1", "1.2", "2.0", "2.1", "2.2"]
@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+
+from app.core.admission import GroupLimiter, Overloaded, admission_controller, classify
+from app.core.config import settings
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_routes_are_grouped():
+    assert classify("POST", "/auth/login") == "auth"
+    assert classify("GET", "/api/projects/3/issues") == "reads"
+    assert classify("PATCH", "/api/issues/3") == "writes"
+    assert classify("POST", "/api/batch") == "batch"
+    assert classify("POST", "/api/projects/3/members/batch") == "exports"
+
+
+def test_waiters_get_freed_slots_or_time_out():
+    async def scenario():
+        limiter = GroupLimiter("reads", concurrency=1, queue_timeout=0.05)
+        await limiter.acquire()
+
+        # nobody releases: the waiter is shed after queue_timeout
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+        assert limiter.queued == 0
+
+        # a release hands the slot straight to the next waiter
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()
+        await waiter
+        assert limiter.in_flight == 1
+        limiter.release()
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_slow_groups_shed_new_arrivals_without_queueing():
+    async def scenario():
+        limiter = GroupLimiter("exports", concurrency=1, queue_timeout=0.5)
+        await limiter.acquire()
+        limiter.observe(2.0)  # each export has been taking 2s
+        with pytest.raises(Overloaded) as exc:
+            await limiter.acquire()
+        assert exc.value.retry_after == 2.0
+        assert limiter.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_busy_exports_do_not_block_reads_or_batches():
+    headers = auth_headers(create_user_and_get_token("shed@example.com", "secret"))
+    project_id = create_project(headers, "Shed")
+    exports = admission_controller.limiters["exports"]
+    exports.in_flight = exports.concurrency
+    exports.observe(30.0)
+    try:
+        resp = client.post(
+            f"/api/projects/{project_id}/members/batch",
+            json={"members": []},
+            headers=headers,
+        )
+        assert resp.status_code == 503
+        assert int(resp.headers["Retry-After"]) >= 1
+
+        assert client.get("/api/projects/", headers=headers).status_code == 200
+        resp = client.post(
+            "/api/batch",
+            json={"requests": [{"id": "a", "path": "/api/projects/"}]},
+            headers=headers,
+        )
+        assert resp.status_code == 200
+    finally:
+        admission_controller.configure(settings.ADMISSION_GROUPS)
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+from app.crud import crud
+from app.db import models
+from app.db.session import SessionLocal
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_closed_issues_move_to_archive_and_stay_readable():
+    headers = auth_headers(create_user_and_get_token("archivist@example.com", "x"))
+    project_id = create_project(headers, "Archive")
+
+    def make(title):
+        return client.post(
+            f"/api/projects/{project_id}/issues",
+            json={"title": title, "description": "needle", "priority": "low"},
+            headers=headers,
+        ).json()["id"]
+
+    old_id, recent_id, open_id = make("old"), make("recent"), make("open")
+    comment_id = client.post(
+        f"/api/issues/{old_id}/comments", json={"body": "c1"}, headers=headers
+    ).json()["id"]
+    for issue_id in (old_id, recent_id):
+        client.patch(
+            f"/api/issues/{issue_id}", json={"status": "closed"}, headers=headers
+        )
+
+    db = SessionLocal()
+    try:
+        db.query(models.Issue).filter(models.Issue.id == old_id).update(
+            {models.Issue.updated_at: datetime.utcnow() - timedelta(days=90)}
+        )
+        db.commit()
+        # only this project: the rest of the database is other tests' data
+        moved = crud.archive_closed_issues(
+            db, older_than_days=30, batch_size=1, project_id=project_id
+        )
+        assert moved == 1
+        assert db.query(models.Issue).get(old_id) is None
+        assert db.query(models.ArchivedIssue).get(old_id) is not None
+        assert db.query(models.Issue).get(recent_id) is not None
+    finally:
+        db.close()
+
+    # synced clients drop the archived issue and its comment
+    feed = client.get(f"/api/projects/{project_id}/changes", headers=headers).json()
+    assert old_id not in [i["id"] for i in feed["issues"]]
+    assert [(t["entity"], t["id"]) for t in feed["deleted"] if t["archived"]] == [
+        ("issue", old_id),
+        ("comment", comment_id),
+    ]
+
+    resp = client.get(f"/api/issues/{old_id}", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["is_archived"] is True
+    assert resp.json()["status"] == "closed"
+
+    comments = client.get(f"/api/issues/{old_id}/comments", headers=headers).json()
+    assert [c["body"] for c in comments] == ["c1"]
+
+    base = f"/api/projects/{project_id}/issues"
+    titles = lambda resp: {i["title"] for i in resp.json()}  # noqa: E731
+    assert titles(client.get(base, headers=headers)) == {"recent", "open"}
+    assert titles(client.get(f"{base}?q=needle", headers=headers)) == {
+        "old", "recent", "open"
+    }
+    assert titles(client.get(f"{base}?status_filter=closed", headers=headers)) == {
+        "old", "recent"
+    }
+    assert titles(client.get(f"{base}?include_archived=true", headers=headers)) == {
+        "old", "recent", "open"
+    }
+    assert titles(client.get(f"{base}?status_filter=open", headers=headers)) == {"open"}
+
+    # still counted, and listed among the caller's closed issues
+    projects = client.get("/api/projects/", headers=headers).json()
+    summary = next(p for p in projects if p["id"] == project_id)
+    assert summary["closed_issue_count"] == 2
+    assert summary["open_issue_count"] == 1
+
+    def mine(query):
+        resp = client.get(f"/api/me/issues?{query}", headers=headers)
+        return [i["id"] for i in resp.json() if i["project_id"] == project_id]
+
+    assert mine("") == [open_id, recent_id]
+    assert mine("status_filter=closed") == [recent_id, old_id]
+    assert mine("include_archived=true") == [open_id, recent_id, old_id]
+
+    resp = client.patch(f"/api/issues/{old_id}", json={"title": "x"}, headers=headers)
+    assert resp.status_code == 409
+    resp = client.post(
+        f"/api/issues/{old_id}/comments", json={"body": "late"}, headers=headers
+    )
+    assert resp.status_code == 409
+
+    resp = client.delete(f"/api/issues/{old_id}", headers=headers)
+    assert resp.status_code == 200
+    assert client.get(f"/api/issues/{old_id}", headers=headers).status_code == 404
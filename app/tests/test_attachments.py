@@ -0,0 +1,105 @@
+import os
+import struct
+
+from app.core.attachments import blob_store, metadata_extractor
+from app.core.config import settings
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+PNG = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+    + struct.pack(">II", 640, 480)
+    + b"\x08\x06\x00\x00\x00"
+    + os.urandom(2000)
+)
+
+
+def _issue(headers):
+    project_id = create_project(headers, "Files")
+    issue_id = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "Screenshot attached", "priority": "low"},
+        headers=headers,
+    ).json()["id"]
+    return project_id, issue_id
+
+
+def _upload(issue_id, headers, name, data, content_type):
+    return client.post(
+        f"/api/issues/{issue_id}/attachments",
+        params={"filename": name},
+        content=data,
+        headers={**headers, "Content-Type": content_type},
+    )
+
+
+def test_upload_dedupe_range_download_and_metadata(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "root", str(tmp_path))
+    headers = auth_headers(create_user_and_get_token("files@example.com", "secret"))
+    project_id, issue_id = _issue(headers)
+
+    first = _upload(issue_id, headers, "shot.png", PNG, "image/png")
+    assert first.status_code == 200
+    second = _upload(issue_id, headers, "../copy.png", PNG, "image/png")
+    assert second.status_code == 200
+    notes = _upload(issue_id, headers, "notes.txt", b"one\ntwo\nthree", "text/plain")
+    first, second, notes = first.json(), second.json(), notes.json()
+    assert second["filename"] == "copy.png"
+    assert first["sha256"] == second["sha256"]
+    # identical content is stored once
+    stored = [name for _, _, files in os.walk(tmp_path) for name in files]
+    assert sorted(stored) == sorted({first["sha256"], notes["sha256"]})
+
+    metadata_extractor.wait()
+    detail = client.get(f"/api/issues/{issue_id}", headers=headers).json()
+    assert [a["id"] for a in detail["attachments"]] == [
+        first["id"],
+        second["id"],
+        notes["id"],
+    ]
+    metas = [a["meta"] for a in detail["attachments"]]
+    assert metas[0] == {"kind": "image", "format": "png", "width": 640, "height": 480}
+    assert metas[2] == {"kind": "text", "lines": 3}
+
+    url = f"/api/issues/{issue_id}/attachments/{first['id']}"
+    full = client.get(url, headers=headers)
+    assert full.status_code == 200
+    assert full.content == PNG
+    assert full.headers["etag"] == f'"{first["sha256"]}"'
+    part = client.get(url, headers={**headers, "Range": "bytes=16-23"})
+    assert part.status_code == 206
+    assert part.content == PNG[16:24]
+
+    usage = client.get(f"/api/projects/{project_id}/storage", headers=headers).json()
+    assert usage["bytes_used"] == 2 * len(PNG) + 13
+    assert usage["file_count"] == 3
+
+    assert client.delete(url, headers=headers).status_code == 200
+    usage = client.get(f"/api/projects/{project_id}/storage", headers=headers).json()
+    assert (usage["bytes_used"], usage["file_count"]) == (len(PNG) + 13, 2)
+    # the other attachment still uses the file
+    assert os.path.exists(blob_store.path(first["sha256"]))
+
+
+def test_size_limit_and_project_quota(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "root", str(tmp_path))
+    monkeypatch.setattr(settings, "ATTACHMENT_MAX_BYTES", 1000)
+    monkeypatch.setattr(settings, "ATTACHMENT_PROJECT_QUOTA_BYTES", 1500)
+    headers = auth_headers(create_user_and_get_token("quota@example.com", "secret"))
+    _, issue_id = _issue(headers)
+
+    binary = "application/octet-stream"
+    resp = _upload(issue_id, headers, "big.bin", b"x" * 1001, binary)
+    assert resp.status_code == 413
+
+    resp = _upload(issue_id, headers, "a.bin", b"a" * 800, binary)
+    assert resp.status_code == 200
+    resp = _upload(issue_id, headers, "b.bin", b"b" * 800, binary)
+    assert resp.status_code == 413
+    assert resp.json()["detail"] == "Project attachment quota exceeded"
+    # nothing half-written is left behind
+    assert not os.listdir(tmp_path / "tmp")
@@ -0,0 +1,45 @@
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_batch_runs_get_routes_in_one_round_trip():
+    headers = auth_headers(create_user_and_get_token("batcher@example.com", "x"))
+    project_id = create_project(headers, "Batch")
+    issue_id = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "batched", "priority": "high"},
+        headers=headers,
+    ).json()["id"]
+
+    requests = [
+        {"id": "me", "path": "/auth/me"},
+        {"id": "projects", "path": "/api/projects/"},
+        {"id": "issues", "path": f"/api/projects/{project_id}/issues?priority=high"},
+        {"id": "missing", "path": "/api/issues/999999"},
+        {"id": "comments", "path": f"/api/issues/{issue_id}/comments"},
+    ]
+    for concurrent in (False, True):
+        resp = client.post(
+            "/api/batch",
+            json={"requests": requests, "concurrent": concurrent},
+            headers=headers,
+        )
+        assert resp.status_code == 200
+        out = {r["id"]: r for r in resp.json()["responses"]}
+        assert out["me"]["body"]["email"] == "batcher@example.com"
+        assert project_id in [p["id"] for p in out["projects"]["body"]]
+        assert [i["id"] for i in out["issues"]["body"]] == [issue_id]
+        assert out["missing"]["status"] == 404
+        assert out["comments"]["body"] == []
+
+    resp = client.post(
+        "/api/batch", json={"requests": [{"path": "/api/batch"}]}, headers=headers
+    )
+    assert resp.status_code == 400
+
+    resp = client.post("/api/batch", json={"requests": [{"path": "/auth/me"}]})
+    assert resp.status_code == 401
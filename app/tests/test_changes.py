@@ -0,0 +1,61 @@
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_changes_feed_returns_only_rows_changed_since_cursor():
+    headers = auth_headers(create_user_and_get_token("sync@example.com", "secret"))
+
+    project_id = create_project(headers, "Sync")
+
+    resp = client.get(f"/api/projects/{project_id}/changes", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["cursor"] == 0
+
+    first = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "One", "priority": "low"},
+        headers=headers,
+    ).json()
+    second = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "Two", "priority": "low"},
+        headers=headers,
+    ).json()
+    comment = client.post(
+        f"/api/issues/{first['id']}/comments",
+        json={"body": "hi"},
+        headers=headers,
+    ).json()
+
+    resp = client.get(f"/api/projects/{project_id}/changes?since=0", headers=headers)
+    feed = resp.json()
+    assert {i["id"] for i in feed["issues"]} == {first["id"], second["id"]}
+    assert [c["id"] for c in feed["comments"]] == [comment["id"]]
+    cursor = feed["cursor"]
+    assert cursor == 3
+
+    client.patch(
+        f"/api/issues/{second['id']}", json={"title": "Two!"}, headers=headers
+    )
+    client.delete(f"/api/issues/{first['id']}", headers=headers)
+
+    feed = client.get(
+        f"/api/projects/{project_id}/changes?since={cursor}", headers=headers
+    ).json()
+    assert [i["title"] for i in feed["issues"]] == ["Two!"]
+    assert feed["comments"] == []
+    # the issue's comment goes with it
+    assert feed["deleted"] == [
+        {"entity": "issue", "id": first["id"], "seq": 5, "archived": False},
+        {"entity": "comment", "id": comment["id"], "seq": 6, "archived": False},
+    ]
+    assert feed["cursor"] == 6
+
+    # non-members cannot read the feed
+    other = auth_headers(create_user_and_get_token("outsider@example.com", "secret"))
+    resp = client.get(f"/api/projects/{project_id}/changes", headers=other)
+    assert resp.status_code == 403
@@ -0,0 +1,51 @@
+import gzip
+from app.core.compression import PrecompressedBody, choose_encoding
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_choose_encoding_respects_q_values():
+    assert choose_encoding(None) is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("gzip;q=1.0, deflate") == "gzip"
+    assert choose_encoding("*") is not None
+
+
+def test_large_json_responses_are_compressed():
+    headers = auth_headers(create_user_and_get_token("squeeze@example.com", "x"))
+    project_id = create_project(headers, "Squeeze")
+    for n in range(20):
+        client.post(
+            f"/api/projects/{project_id}/issues",
+            json={"title": f"issue {n}", "description": "x" * 50, "priority": "low"},
+            headers=headers,
+        )
+
+    resp = client.get(
+        f"/api/projects/{project_id}/issues",
+        headers={**headers, "Accept-Encoding": "gzip"},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert len(resp.json()) == 20  # transparently decoded
+
+    # below the threshold nothing is compressed
+    resp = client.get("/auth/me", headers={**headers, "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
+
+
+def test_precompressed_body_compresses_once_per_encoding():
+    body = PrecompressedBody(b'{"a": "' + b"x" * 4096 + b'"}')
+    first = body.response("gzip")
+    second = body.response("gzip")
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.body is second.body
+    assert gzip.decompress(first.body) == body.body
+    assert "content-encoding" not in body.response(None).headers
@@ -0,0 +1,117 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.idempotency import idempotency_store
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_retried_posts_with_same_key_are_replayed():
+    headers = auth_headers(create_user_and_get_token("retry@example.com", "secret"))
+    project_id = create_project(headers, "Retry")
+
+    key_headers = {**headers, "Idempotency-Key": uuid.uuid4().hex}
+    payload = {"title": "Flaky network", "priority": "high"}
+    first = client.post(
+        f"/api/projects/{project_id}/issues", json=payload, headers=key_headers
+    )
+    assert first.status_code == 200
+
+    retry = client.post(
+        f"/api/projects/{project_id}/issues", json=payload, headers=key_headers
+    )
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+    # served from the table once the in-memory cache is gone
+    idempotency_store.clear_cache()
+    retry = client.post(
+        f"/api/projects/{project_id}/issues", json=payload, headers=key_headers
+    )
+    assert retry.json()["id"] == first.json()["id"]
+
+    issues = client.get(f"/api/projects/{project_id}/issues", headers=headers).json()
+    assert len(issues) == 1
+
+    # same key, different body
+    resp = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={**payload, "title": "Something else"},
+        headers=key_headers,
+    )
+    assert resp.status_code == 422
+
+    issue_id = first.json()["id"]
+    comment_headers = {**headers, "Idempotency-Key": uuid.uuid4().hex}
+    for _ in range(3):
+        resp = client.post(
+            f"/api/issues/{issue_id}/comments",
+            json={"body": "posted once"},
+            headers=comment_headers,
+        )
+        assert resp.status_code == 200
+    comments = client.get(f"/api/issues/{issue_id}/comments", headers=headers).json()
+    assert len(comments) == 1
+
+    # no header keeps the old behaviour
+    client.post(f"/api/projects/{project_id}/issues", json=payload, headers=headers)
+    client.post(f"/api/projects/{project_id}/issues", json=payload, headers=headers)
+    issues = client.get(f"/api/projects/{project_id}/issues", headers=headers).json()
+    assert len(issues) == 3
+
+
+def test_concurrent_retries_with_same_key_create_one_issue(monkeypatch):
+    headers = auth_headers(create_user_and_get_token("race@example.com", "secret"))
+    project_id = create_project(headers, "Race")
+    key_headers = {**headers, "Idempotency-Key": uuid.uuid4().hex}
+    payload = {"title": "Double click", "priority": "high"}
+
+    # both requests find the key unused before either has written it
+    barrier = threading.Barrier(2, timeout=10)
+    lookup = idempotency_store._lookup
+    raced = set()
+
+    def racing_lookup(db, user_id, key):
+        entry = lookup(db, user_id, key)
+        if threading.get_ident() not in raced:
+            raced.add(threading.get_ident())
+            barrier.wait()
+        return entry
+
+    monkeypatch.setattr(idempotency_store, "_lookup", racing_lookup)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        responses = list(
+            pool.map(
+                lambda _: client.post(
+                    f"/api/projects/{project_id}/issues",
+                    json=payload,
+                    headers=key_headers,
+                ),
+                range(2),
+            )
+        )
+    monkeypatch.undo()
+
+    # the winner created the issue; a 409 has no replay header either, so
+    # pick it by status as well
+    winners = [
+        resp
+        for resp in responses
+        if resp.status_code == 200 and "Idempotent-Replayed" not in resp.headers
+    ]
+    assert len(winners) == 1
+    first = winners[0]
+    second = next(resp for resp in responses if resp is not first)
+    # the loser gets the winner's response, or a 409 if it isn't stored yet
+    if second.status_code == 200:
+        assert second.json()["id"] == first.json()["id"]
+    else:
+        assert second.status_code == 409
+    issues = client.get(f"/api/projects/{project_id}/issues", headers=headers).json()
+    assert [issue["id"] for issue in issues] == [first.json()["id"]]
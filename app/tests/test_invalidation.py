@@ -0,0 +1,127 @@
+import multiprocessing
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.invalidation import InvalidationBus, LocalCache
+from app.db import models
+
+POLL_INTERVAL = 0.05
+MAX_DELAY = 2.0
+
+
+def _read_role(engine, cache: LocalCache, project_id: int, user_id: int):
+    def load():
+        with Session(engine) as db:
+            return (
+                db.query(models.ProjectMember.role)
+                .filter_by(project_id=project_id, user_id=user_id)
+                .scalar()
+            )
+
+    return cache.get_or_load(project_id, (project_id, user_id), load)
+
+
+def _worker(url: str, project_id: int, user_id: int, ready, results) -> None:
+    """One "uvicorn worker": caches the role forever unless told otherwise."""
+    engine = create_engine(url)
+    cache = LocalCache("roles", ttl=3600)
+    bus = InvalidationBus(bind=engine, poll_interval=POLL_INTERVAL)
+    bus.subscribe("project_members", lambda pid, version: cache.invalidate(pid))
+    bus.start()
+
+    first = _read_role(engine, cache, project_id, user_id)
+    ready.put(first.value)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        role = _read_role(engine, cache, project_id, user_id)
+        if role != first:
+            results.put((role.value, time.time()))
+            break
+        time.sleep(0.01)
+    else:
+        results.put((first.value, time.time()))
+    bus.stop()
+
+
+def test_writes_invalidate_caches_in_other_processes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'bus.db'}"
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        user = models.User(name="W", email="w@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        project = models.Project(name="Bus", key="BUS", owner_id=user.id)
+        db.add(project)
+        db.flush()
+        member = models.ProjectMember(
+            project_id=project.id, user_id=user.id, role=models.RoleEnum.viewer
+        )
+        db.add(member)
+        db.commit()
+        project_id, user_id = project.id, user.id
+
+    ctx = multiprocessing.get_context("fork")
+    ready, results = ctx.Queue(), ctx.Queue()
+    workers = [
+        ctx.Process(target=_worker, args=(url, project_id, user_id, ready, results))
+        for _ in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        assert [ready.get(timeout=10) for _ in workers] == ["viewer", "viewer"]
+
+        # the writing process publishes in the same transaction as the change
+        bus = InvalidationBus(bind=engine)
+        with Session(engine) as db:
+            db.query(models.ProjectMember).filter_by(project_id=project_id).update(
+                {"role": models.RoleEnum.manager}
+            )
+            bus.publish(db, "project_members", project_id)
+            db.commit()
+        committed_at = time.time()
+
+        for _ in workers:
+            role, seen_at = results.get(timeout=15)
+            assert role == "manager"
+            assert seen_at - committed_at < MAX_DELAY
+    finally:
+        for worker in workers:
+            worker.join(timeout=10)
+
+
+def test_poll_picks_up_ids_that_commit_out_of_order(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'gaps.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    bus = InvalidationBus(bind=engine, gap_timeout=0.2)
+    seen = []
+    bus.subscribe("issue", lambda entity_id, version: seen.append(entity_id))
+
+    def commit(message_id):
+        with Session(engine) as db:
+            db.add(
+                models.Invalidation(id=message_id, entity="issue", entity_id=message_id)
+            )
+            db.commit()
+
+    commit(1)
+    bus.poll()  # starts after id 1
+    # 3 commits while the transaction that took 2 is still open
+    commit(3)
+    assert bus.poll() == 1
+    commit(2)
+    assert bus.poll() == 1
+    assert seen == [3, 2]
+
+    # a skipped id is given up on after gap_timeout
+    commit(5)
+    commit(6)
+    bus.poll()
+    time.sleep(0.3)
+    bus.poll()
+    commit(4)
+    assert bus.poll() == 0
+    assert seen == [3, 2, 5, 6]
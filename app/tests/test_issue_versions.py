@@ -0,0 +1,87 @@
+from app.crud import crud
+from app.db import models
+from app.db.session import SessionLocal
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_patch_with_stale_version_is_rejected():
+    headers = auth_headers(create_user_and_get_token("versions@example.com", "secret"))
+    project_id = create_project(headers, "Versions")
+    issue = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "Race", "priority": "medium"},
+        headers=headers,
+    ).json()
+    assert issue["version"] == 1
+
+    resp = client.get(f"/api/issues/{issue['id']}", headers=headers)
+    assert resp.headers["ETag"] == '"1"'
+
+    resp = client.patch(
+        f"/api/issues/{issue['id']}",
+        json={"title": "First writer"},
+        headers={**headers, "If-Match": '"1"'},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["version"] == 2
+    assert resp.json()["title"] == "First writer"
+    assert resp.headers["ETag"] == '"2"'
+
+    # second writer still holds version 1
+    resp = client.patch(
+        f"/api/issues/{issue['id']}",
+        json={"title": "Second writer"},
+        headers={**headers, "If-Match": '"1"'},
+    )
+    assert resp.status_code == 409
+
+    # version can also travel in the body
+    resp = client.patch(
+        f"/api/issues/{issue['id']}",
+        json={"title": "Second writer", "version": 2},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    assert resp.json()["version"] == 3
+
+    # without a version the write is unconditional
+    resp = client.patch(
+        f"/api/issues/{issue['id']}", json={"status": "closed"}, headers=headers
+    )
+    assert resp.status_code == 200
+    assert resp.json()["version"] == 4
+
+    resp = client.get(f"/api/issues/{issue['id']}", headers=headers)
+    assert resp.json()["title"] == "Second writer"
+    assert resp.json()["status"] == "closed"
+
+
+def test_unversioned_write_applies_to_the_row_as_it_is_now():
+    headers = auth_headers(create_user_and_get_token("stale@example.com", "secret"))
+    project_id = create_project(headers, "Stale")
+    issue_id = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "Loaded", "priority": "medium"},
+        headers=headers,
+    ).json()["id"]
+
+    db = SessionLocal()
+    try:
+        stale = db.query(models.Issue).get(issue_id)
+        # another writer gets in between loading and writing
+        resp = client.patch(
+            f"/api/issues/{issue_id}", json={"priority": "high"}, headers=headers
+        )
+        assert resp.json()["version"] == 2
+
+        crud.update_issue(db, stale, {"title": "Renamed"})
+        assert (stale.version, stale.title, stale.priority) == (3, "Renamed", "high")
+    finally:
+        db.close()
+    resp = client.get(f"/api/issues/{issue_id}", headers=headers)
+    assert resp.json()["version"] == 3
@@ -1,32 +1,14 @@
+import uuid
+
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 from app.main import app
-from app.db.base import Base
-from app.db.session import get_db
-
-
-# --- Test DB setup (in-memory SQLite, fresh per test run) ---
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base.metadata.create_all(bind=engine)
-
+from app.db.shards import shard_router
 
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
-
-app.dependency_overrides[get_db] = override_get_db
+# the client below doesn't run the app's lifespan, which creates the tables;
+# conftest.py points DATABASE_URL at a fresh temporary directory
+shard_router.create_all()
 
 client = TestClient(app)
 
@@ -56,6 +38,17 @@ def auth_headers(token: str):
     return {"Authorization": f"Bearer {token}"}
 
 
+def create_project(headers, name: str = "Project") -> int:
+    """Create a project with a unique key and return its id."""
+    resp = client.post(
+        "/api/projects/",
+        json={"name": name, "key": f"P_{uuid.uuid4().hex[:8]}"},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    return resp.json()["id"]
+
+
 def test_root_works():
     resp = client.get("/")
     assert resp.status_code == 200
@@ -217,3 +210,32 @@ def test_project_membership_and_roles():
     )
     assert resp.status_code == 200
     assert resp.json()["status"] == "in_progress"
+
+
+def test_issue_scoped_routes_check_existence_and_membership():
+    token_a = create_user_and_get_token("owner404@example.com", "secret")
+    headers_a = auth_headers(token_a)
+    headers_c = auth_headers(create_user_and_get_token("carol@example.com", "secret"))
+
+    project_id = create_project(headers_a, "Access")
+    resp = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "Private", "priority": "high"},
+        headers=headers_a,
+    )
+    issue_id = resp.json()["id"]
+
+    for method, path in [
+        ("get", f"/api/issues/{issue_id}"),
+        ("patch", f"/api/issues/{issue_id}"),
+        ("delete", f"/api/issues/{issue_id}"),
+        ("get", f"/api/issues/{issue_id}/comments"),
+        ("post", f"/api/issues/{issue_id}/comments"),
+    ]:
+        kwargs = {"json": {"body": "x"}} if method in ("patch", "post") else {}
+        resp = getattr(client, method)(path, headers=headers_c, **kwargs)
+        assert resp.status_code == 403, path
+
+        missing = path.replace(str(issue_id), "999999")
+        resp = getattr(client, method)(missing, headers=headers_a, **kwargs)
+        assert resp.status_code == 404, missing
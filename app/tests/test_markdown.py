@@ -0,0 +1,110 @@
+import time
+
+from app.core import markdown
+from app.db import models
+from app.db.session import SessionLocal
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_render_escapes_html_and_unsafe_links():
+    html = markdown.render(
+        "<script>alert(1)</script> [x](javascript:alert(1)) "
+        '![y](data:image/png;base64,AAA) [ok](https://example.com/?a=1&b="2") '
+        "[z](/\\evil.com) [w](/a\\b)"
+    )
+    assert "<script" not in html and "&lt;script&gt;" in html
+    assert "javascript:" not in html
+    assert "evil.com" not in html and 'href="/a' not in html
+    assert "<img" not in html
+    assert '<a href="https://example.com/?a=1&amp;b=&quot;2&quot;"' in html
+
+    assert markdown.render("# Crash\n\n- **boom** on `a<b`\n- _twice_") == (
+        "<h1>Crash</h1>\n<ul>\n<li><strong>boom</strong> on <code>a&lt;b</code></li>"
+        "\n<li><em>twice</em></li>\n</ul>"
+    )
+    assert markdown.render("```\n<b>\n```") == "<pre><code>&lt;b&gt;</code></pre>"
+    # code spans and escapes are plain text inside attributes
+    assert markdown.render('![`x"` a\\*b](/i.png)') == (
+        '<p><img src="/i.png" alt="x&quot; a*b" loading="lazy"></p>'
+    )
+    assert markdown.render(None) is None
+
+
+def test_unclosed_delimiters_render_in_linear_time():
+    for unit in ("*a ", "**a ", "_a ", "__a ", "~~a ", "[a ", "![a "):
+        text = unit * (markdown.MAX_SOURCE_LENGTH // len(unit))
+        started = time.perf_counter()
+        markdown.render(text)
+        assert time.perf_counter() - started < 1, unit
+
+    long = "x" * (markdown.MAX_SOURCE_LENGTH + 1)
+    assert markdown.render(long) == f"<pre>{long}</pre>"
+
+
+def test_html_rendered_on_write_and_refreshed_after_renderer_change(monkeypatch):
+    headers = auth_headers(create_user_and_get_token("markdown@example.com", "secret"))
+    project_id = create_project(headers, "Docs")
+    issue = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "Render me", "description": "*first*", "priority": "low"},
+        headers=headers,
+    ).json()
+    issue_id = issue["id"]
+    client.post(
+        f"/api/issues/{issue_id}/comments", json={"body": "**hi**"}, headers=headers
+    )
+
+    too_long = "x" * (markdown.MAX_SOURCE_LENGTH + 1)
+    resp = client.post(
+        f"/api/issues/{issue_id}/comments", json={"body": too_long}, headers=headers
+    )
+    assert resp.status_code == 422
+    resp = client.patch(
+        f"/api/issues/{issue_id}", json={"description": too_long}, headers=headers
+    )
+    assert resp.status_code == 422
+
+    plain = client.get(f"/api/issues/{issue_id}", headers=headers).json()
+    assert plain["description_html"] is None
+    detail = client.get(
+        f"/api/issues/{issue_id}", params={"html": True}, headers=headers
+    ).json()
+    assert detail["description_html"] == "<p><em>first</em></p>"
+    url = f"/api/issues/{issue_id}/comments"
+    assert client.get(url, headers=headers).json()[0]["body_html"] is None
+    comments = client.get(url, params={"html": True}, headers=headers).json()
+    assert comments[0]["body_html"] == "<p><strong>hi</strong></p>"
+
+    client.patch(
+        f"/api/issues/{issue_id}", json={"description": "`second`"}, headers=headers
+    )
+    detail = client.get(
+        f"/api/issues/{issue_id}", params={"html": True}, headers=headers
+    ).json()
+    assert detail["description_html"] == "<p><code>second</code></p>"
+
+    # a new renderer version re-renders stored HTML once, on the next read
+    calls = []
+    render = markdown.render
+    monkeypatch.setattr(markdown, "RENDERER_VERSION", markdown.RENDERER_VERSION + 1)
+    monkeypatch.setattr(
+        markdown, "render", lambda text: calls.append(text) or render(text)
+    )
+    for _ in range(2):
+        comments = client.get(url, params={"html": True}, headers=headers).json()
+        assert comments[0]["body_html"] == "<p><strong>hi</strong></p>"
+    assert calls == ["**hi**"]
+
+    db = SessionLocal()
+    try:
+        comment = db.query(models.Comment).get(comments[0]["id"])
+        assert comment.body_html_version == markdown.RENDERER_VERSION
+        # re-rendering isn't an edit
+        assert comment.updated_at.isoformat() == comments[0]["updated_at"]
+    finally:
+        db.close()
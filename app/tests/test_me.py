@@ -0,0 +1,57 @@
+import uuid
+
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_my_issues_across_projects():
+    suffix = uuid.uuid4().hex[:8]
+    manager = auth_headers(create_user_and_get_token(f"mgr_{suffix}@example.com", "x"))
+    dev_email = f"dev_{suffix}@example.com"
+    dev = auth_headers(create_user_and_get_token(dev_email, "x"))
+    dev_id = client.get("/auth/me", headers=dev).json()["id"]
+
+    expected = []
+    for n in range(2):
+        project_id = create_project(manager, f"P{n}")
+        client.post(
+            f"/api/projects/{project_id}/members",
+            json={"email": dev_email, "role": "developer"},
+            headers=manager,
+        )
+        assigned = client.post(
+            f"/api/projects/{project_id}/issues",
+            json={"title": f"assigned {n}", "priority": "high", "assignee_id": dev_id},
+            headers=manager,
+        ).json()
+        client.post(
+            f"/api/projects/{project_id}/issues",
+            json={"title": f"someone else's {n}", "priority": "low"},
+            headers=manager,
+        )
+        reported = client.post(
+            f"/api/projects/{project_id}/issues",
+            json={"title": f"reported {n}", "priority": "low"},
+            headers=dev,
+        ).json()
+        expected += [assigned["id"], reported["id"]]
+
+    resp = client.get("/api/me/issues", headers=dev)
+    assert resp.status_code == 200
+    assert [i["id"] for i in resp.json()] == sorted(expected, reverse=True)
+
+    page = client.get("/api/me/issues?limit=3", headers=dev).json()
+    rest = client.get(
+        f"/api/me/issues?before_id={page[-1]['id']}", headers=dev
+    ).json()
+    assert [i["id"] for i in page + rest] == sorted(expected, reverse=True)
+
+    resp = client.get("/api/me/issues?involvement=assignee", headers=dev)
+    assert {i["title"] for i in resp.json()} == {"assigned 0", "assigned 1"}
+
+    resp = client.get("/api/me/issues?priority=low", headers=dev)
+    assert {i["title"] for i in resp.json()} == {"reported 0", "reported 1"}
@@ -0,0 +1,85 @@
+import uuid
+
+from app.core.notifications import mention_handles, notification_writer
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_mention_handles():
+    body = "cc @Alice, @bob@example.com and @alice again; mail carol@example.com."
+    assert mention_handles(body) == ["alice", "bob@example.com"]
+    assert mention_handles("@a @b @c", limit=2) == ["a", "b"]
+
+
+def test_mentions_and_assignments_reach_the_inbox():
+    tag = uuid.uuid4().hex[:6]
+    owner_email = f"owner_{tag}@example.com"
+    owner = auth_headers(create_user_and_get_token(owner_email, "secret"))
+    dev_email = f"dev_{tag}@example.com"
+    dev = auth_headers(create_user_and_get_token(dev_email, "secret"))
+    # not a member: mentioning them must not leak the issue
+    create_user_and_get_token(f"outsider_{tag}@example.com", "secret")
+
+    project_id = create_project(owner, "Inbox")
+    client.post(
+        f"/api/projects/{project_id}/members",
+        json={"email": dev_email, "role": "developer"},
+        headers=owner,
+    )
+    issue_id = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "Inbox bug", "priority": "low"},
+        headers=owner,
+    ).json()["id"]
+
+    comment = client.post(
+        f"/api/issues/{issue_id}/comments",
+        json={"body": f"@dev_{tag} and @{dev_email} please look; @outsider_{tag} too"},
+        headers=owner,
+    ).json()
+    client.patch(
+        f"/api/issues/{issue_id}",
+        json={"assignee_id": client.get("/auth/me", headers=dev).json()["id"]},
+        headers=owner,
+    )
+    # the author mentioning themselves is not notified
+    client.post(
+        f"/api/issues/{issue_id}/comments",
+        json={"body": f"@{owner_email} note to self"},
+        headers=owner,
+    )
+    notification_writer.flush()
+
+    resp = client.get("/api/me/notifications/unread-count", headers=dev)
+    assert resp.json() == {"unread": 2}
+    inbox = client.get("/api/me/notifications", headers=dev).json()
+    assert [(n["kind"], n["comment_id"]) for n in inbox] == [
+        ("assigned", None),
+        ("mention", comment["id"]),
+    ]
+    assert client.get("/api/me/notifications/unread-count", headers=owner).json() == {
+        "unread": 0
+    }
+
+    page = client.get(
+        "/api/me/notifications",
+        params={"before_id": inbox[0]["id"], "limit": 1},
+        headers=dev,
+    ).json()
+    assert [n["id"] for n in page] == [inbox[1]["id"]]
+
+    resp = client.post(
+        "/api/me/notifications/read", json={"ids": [inbox[1]["id"]]}, headers=dev
+    )
+    assert resp.json() == {"unread": 1}
+    unread = client.get(
+        "/api/me/notifications", params={"unread_only": True}, headers=dev
+    ).json()
+    assert [n["id"] for n in unread] == [inbox[0]["id"]]
+
+    resp = client.post("/api/me/notifications/read", json={}, headers=dev)
+    assert resp.json() == {"unread": 0}
@@ -0,0 +1,68 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import crud
+from app.db import models
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_priority_sort_and_most_urgent_issues():
+    headers = auth_headers(create_user_and_get_token("triage@example.com", "secret"))
+    project_id = create_project(headers, "Triage")
+
+    ids = {}
+    for title, priority in [
+        ("l1", "low"), ("h1", "high"), ("m1", "medium"), ("h2", "high"), ("l2", "low")
+    ]:
+        ids[title] = client.post(
+            f"/api/projects/{project_id}/issues",
+            json={"title": title, "priority": priority},
+            headers=headers,
+        ).json()["id"]
+
+    resp = client.get(
+        f"/api/projects/{project_id}/issues?sort=priority", headers=headers
+    )
+    assert [i["title"] for i in resp.json()] == ["h1", "h2", "m1", "l1", "l2"]
+
+    # closing h1 drops it from the open list
+    client.patch(f"/api/issues/{ids['h1']}", json={"status": "closed"}, headers=headers)
+    client.patch(f"/api/issues/{ids['l2']}", json={"priority": "high"}, headers=headers)
+
+    resp = client.get(f"/api/projects/{project_id}/issues/top?limit=3", headers=headers)
+    assert resp.status_code == 200
+    assert [i["title"] for i in resp.json()] == ["h2", "l2", "m1"]
+    assert resp.json()[1]["priority"] == "high"
+
+    resp = client.get(
+        f"/api/projects/{project_id}/issues/top?status_filter=closed", headers=headers
+    )
+    assert [i["title"] for i in resp.json()] == ["h1"]
+
+    resp = client.get(
+        f"/api/projects/{project_id}/issues?priority=high", headers=headers
+    )
+    assert {i["title"] for i in resp.json()} == {"h1", "h2", "l2"}
+
+
+def test_most_urgent_query_is_an_index_scan():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    # the statement get_most_urgent_issues runs, not a copy of it
+    query = crud.most_urgent_issues_query(db, 1)
+    sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        plan = " ".join(
+            row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+        )
+    assert "ix_issues_project_status_priority" in plan
+    assert "TEMP B-TREE" not in plan
+
+    assert crud.get_most_urgent_issues(db, 1) == []
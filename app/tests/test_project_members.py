@@ -0,0 +1,56 @@
+import uuid
+
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_member_list_embeds_profiles_and_batch_add():
+    suffix = uuid.uuid4().hex[:8]
+    owner_email = f"boss_{suffix}@example.com"
+    owner = auth_headers(create_user_and_get_token(owner_email, "x"))
+    emails = [f"team{n}_{suffix}@example.com" for n in range(3)]
+    for email in emails:
+        create_user_and_get_token(email, "x")
+
+    project_id = create_project(owner, "Team")
+    client.post(
+        f"/api/projects/{project_id}/members",
+        json={"email": emails[0], "role": "viewer"},
+        headers=owner,
+    )
+
+    resp = client.post(
+        f"/api/projects/{project_id}/members/batch",
+        json={
+            "members": [
+                {"email": emails[0], "role": "developer"},
+                {"email": emails[1], "role": "developer"},
+                {"email": emails[2], "role": "manager"},
+                {"email": f"nobody_{suffix}@example.com", "role": "viewer"},
+            ]
+        },
+        headers=owner,
+    )
+    assert resp.status_code == 200
+    result = resp.json()
+    assert [m["user"]["email"] for m in result["added"]] == emails[1:]
+    assert result["skipped_existing"] == [emails[0]]
+    assert result["not_found"] == [f"nobody_{suffix}@example.com"]
+
+    members = client.get(f"/api/projects/{project_id}/members", headers=owner).json()
+    assert [m["user"]["email"] for m in members] == [owner_email] + emails
+    assert members[1]["role"] == "viewer"
+    assert members[1]["user"]["name"] == f"team0_{suffix}"
+
+    # developers can't bulk-add
+    dev = auth_headers(create_user_and_get_token(emails[1], "x"))
+    resp = client.post(
+        f"/api/projects/{project_id}/members/batch",
+        json={"members": []},
+        headers=dev,
+    )
+    assert resp.status_code == 403
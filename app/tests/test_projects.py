@@ -0,0 +1,49 @@
+import uuid
+
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_project_list_includes_role_and_counts():
+    suffix = uuid.uuid4().hex[:8]
+    owner = auth_headers(create_user_and_get_token(f"own_{suffix}@example.com", "x"))
+    viewer_email = f"view_{suffix}@example.com"
+    viewer = auth_headers(create_user_and_get_token(viewer_email, "x"))
+
+    project_id = create_project(owner, "Counts")
+    client.post(
+        f"/api/projects/{project_id}/members",
+        json={"email": viewer_email, "role": "viewer"},
+        headers=owner,
+    )
+    issue_ids = [
+        client.post(
+            f"/api/projects/{project_id}/issues",
+            json={"title": f"i{n}", "priority": "low"},
+            headers=owner,
+        ).json()["id"]
+        for n in range(3)
+    ]
+    client.patch(
+        f"/api/issues/{issue_ids[0]}", json={"status": "closed"}, headers=owner
+    )
+    client.patch(
+        f"/api/issues/{issue_ids[1]}", json={"status": "in_progress"}, headers=owner
+    )
+    empty_id = create_project(owner, "Empty")
+
+    projects = {p["id"]: p for p in client.get("/api/projects/", headers=owner).json()}
+    assert projects[project_id]["role"] == "manager"
+    assert projects[project_id]["member_count"] == 2
+    assert projects[project_id]["open_issue_count"] == 1
+    assert projects[project_id]["in_progress_issue_count"] == 1
+    assert projects[project_id]["closed_issue_count"] == 1
+    assert projects[empty_id]["open_issue_count"] == 0
+    assert projects[empty_id]["member_count"] == 1
+
+    projects = client.get("/api/projects/", headers=viewer).json()
+    assert [(p["id"], p["role"]) for p in projects] == [(project_id, "viewer")]
@@ -0,0 +1,76 @@
+from app.crud import crud
+from app.db import models
+from app.db.session import SessionLocal
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def _project_with_issues(headers, issues=3, comments=2):
+    project_id = create_project(headers, "Doomed")
+    issue_ids = []
+    for n in range(issues):
+        issue_id = client.post(
+            f"/api/projects/{project_id}/issues",
+            json={"title": f"i{n}", "priority": "low"},
+            headers=headers,
+        ).json()["id"]
+        for m in range(comments):
+            client.post(
+                f"/api/issues/{issue_id}/comments",
+                json={"body": f"c{m}"},
+                headers=headers,
+            )
+        issue_ids.append(issue_id)
+    return project_id, issue_ids
+
+
+def test_deleting_an_issue_cascades_to_its_comments():
+    headers = auth_headers(create_user_and_get_token("cascade@example.com", "x"))
+    _, (issue_id, *_) = _project_with_issues(headers, issues=1)
+
+    assert client.delete(f"/api/issues/{issue_id}", headers=headers).status_code == 200
+
+    db = SessionLocal()
+    try:
+        assert (
+            db.query(models.Comment).filter(models.Comment.issue_id == issue_id).count()
+            == 0
+        )
+    finally:
+        db.close()
+
+
+def test_project_delete_hides_then_purges_in_chunks():
+    headers = auth_headers(create_user_and_get_token("purger@example.com", "x"))
+    project_id, issue_ids = _project_with_issues(headers)
+
+    resp = client.delete(f"/api/projects/{project_id}", headers=headers)
+    assert resp.status_code == 202
+    projects = client.get("/api/projects/", headers=headers).json()
+    assert project_id not in [p["id"] for p in projects]
+    resp = client.get(f"/api/issues/{issue_ids[0]}", headers=headers)
+    assert resp.status_code == 403
+
+    db = SessionLocal()
+    try:
+        counts = crud.purge_project(db, project_id, chunk_size=2)
+        assert counts["issues"] == 3
+        assert counts["comments"] == 6
+        assert db.query(models.Project).get(project_id) is None
+        assert (
+            db.query(models.Issue).filter(models.Issue.id.in_(issue_ids)).count() == 0
+        )
+        assert (
+            db.query(models.ChangeLog)
+            .filter(models.ChangeLog.project_id == project_id)
+            .count()
+            == 0
+        )
+        # nothing is left to purge
+        assert set(crud.purge_project(db, project_id).values()) == {0}
+    finally:
+        db.close()
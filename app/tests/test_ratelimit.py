@@ -0,0 +1,114 @@
+import uuid
+
+from app.core.config import settings
+from app.core.ratelimit import Limit, MemoryBackend, RateLimiter, SQLiteBackend
+from app.core.ratelimit import rate_limiter
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def test_token_bucket_refills_over_time():
+    backend = MemoryBackend()
+    limit = Limit.parse("2/second")
+    assert backend.acquire("k", limit, now=100.0) is None
+    assert backend.acquire("k", limit, now=100.0) is None
+    assert backend.acquire("k", limit, now=100.0) == 0.5
+    assert backend.acquire("k", limit, now=100.5) is None
+
+
+def test_memory_backend_forgets_idle_buckets():
+    backend = MemoryBackend(sweep_interval=10)
+    limit = Limit.parse("2/second")
+    backend.acquire("idle", limit, now=100.0)
+    backend.acquire("busy", limit, now=100.0)
+    backend.acquire("busy", limit, now=100.0)
+    assert len(backend) == 2
+
+    # both have refilled by the next sweep; only the one just used is kept
+    backend.acquire("busy", limit, now=110.0)
+    assert len(backend) == 1
+    assert backend.acquire("idle", limit, now=110.0) is None
+
+
+def test_rejected_requests_spend_no_tokens():
+    limiter = RateLimiter(
+        MemoryBackend(),
+        {"create_comment": {"user": "2/minute", "project": "1/minute"}},
+    )
+    assert limiter.check("create_comment", user_id=1, project_id=1) is None
+    # the project bucket is empty; the user's second token is kept
+    assert limiter.check("create_comment", user_id=1, project_id=1) > 0
+    assert limiter.check("create_comment", user_id=1, project_id=2) is None
+
+
+def test_sqlite_backend_is_shared_between_limiters(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    limits = {"list_issues": {"user": "2/minute"}}
+    first = RateLimiter(SQLiteBackend(path), limits)
+    second = RateLimiter(SQLiteBackend(path), limits)
+
+    assert first.check("list_issues", user_id=1) is None
+    assert second.check("list_issues", user_id=1) is None
+    assert first.check("list_issues", user_id=1) > 0
+    # other users and unlimited routes are unaffected
+    assert second.check("list_issues", user_id=2) is None
+    assert second.check("get_issue", user_id=1) is None
+
+
+def test_limited_routes_return_429_with_retry_after():
+    headers = auth_headers(
+        create_user_and_get_token(f"rl_{uuid.uuid4().hex[:8]}@example.com", "secret")
+    )
+    project_id = create_project(headers, "Busy")
+    issue_id = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "Hot", "priority": "low"},
+        headers=headers,
+    ).json()["id"]
+
+    rate_limiter.set_limits(
+        {
+            "list_issues": {"user": "2/minute"},
+            "create_comment": {"user": "5/minute", "project": "1/minute"},
+        }
+    )
+    try:
+        url = f"/api/projects/{project_id}/issues"
+        assert client.get(url, headers=headers).status_code == 200
+        assert client.get(url, headers=headers).status_code == 200
+        resp = client.get(url, headers=headers)
+        assert resp.status_code == 429
+        assert 1 <= int(resp.headers["Retry-After"]) <= 30
+
+        # per-project bucket for an issue-scoped route
+        url = f"/api/issues/{issue_id}/comments"
+        assert client.post(url, json={"body": "a"}, headers=headers).status_code == 200
+        resp = client.post(url, json={"body": "b"}, headers=headers)
+        assert resp.status_code == 429
+        assert "Retry-After" in resp.headers
+    finally:
+        rate_limiter.set_limits(settings.RATE_LIMITS)
+
+
+def test_non_members_cannot_drain_a_project_bucket():
+    suffix = uuid.uuid4().hex[:8]
+    member = auth_headers(create_user_and_get_token(f"in_{suffix}@example.com", "x"))
+    outsider = auth_headers(
+        create_user_and_get_token(f"out_{suffix}@example.com", "x")
+    )
+    project_id = create_project(member, "Shared")
+
+    rate_limiter.set_limits({"list_issues": {"project": "2/minute"}})
+    try:
+        url = f"/api/projects/{project_id}/issues"
+        for _ in range(5):
+            assert client.get(url, headers=outsider).status_code == 403
+        assert client.get(url, headers=member).status_code == 200
+        assert client.get(url, headers=member).status_code == 200
+        assert client.get(url, headers=member).status_code == 429
+    finally:
+        rate_limiter.set_limits(settings.RATE_LIMITS)
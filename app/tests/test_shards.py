@@ -0,0 +1,101 @@
+import uuid
+
+from sqlalchemy.orm import Session
+
+from app.core.activity import activity_writer
+from app.core.config import settings
+from app.db import models
+from app.db.rebalance import move_project
+from app.db.session import engine
+from app.db.shards import shard_router
+from app.tests.test_main import client, create_user_and_get_token, auth_headers
+
+
+def _key_on(shard: int) -> str:
+    while True:
+        key = f"SH_{uuid.uuid4().hex[:8]}"
+        if shard_router.choose_shard(key) == shard:
+            return key
+
+
+def _rows(shard: int, model, **filters) -> int:
+    with Session(shard_router.engines[shard]) as db:
+        return db.query(model).filter_by(**filters).count()
+
+
+def test_projects_are_routed_fanned_out_and_moved(tmp_path):
+    shard_router.configure(
+        engine,
+        [
+            settings.DATABASE_URL,
+            f"sqlite:///{tmp_path / 'shard1.db'}",
+            f"sqlite:///{tmp_path / 'shard2.db'}",
+        ],
+    )
+    shard_router.create_all()
+    try:
+        owner = auth_headers(create_user_and_get_token("sharder@example.com", "secret"))
+        create_user_and_get_token("sharded-dev@example.com", "secret")
+
+        ids = {}
+        for shard in (1, 2):
+            resp = client.post(
+                "/api/projects/",
+                json={"name": f"On {shard}", "key": _key_on(shard)},
+                headers=owner,
+            )
+            assert resp.status_code == 200
+            ids[shard] = resp.json()["id"]
+            assert _rows(shard, models.Project, id=ids[shard]) == 1
+            assert _rows(0, models.Project, id=ids[shard]) == 0
+
+        # members are resolved in the global users table, mirrored on the shard
+        resp = client.post(
+            f"/api/projects/{ids[1]}/members",
+            json={"email": "sharded-dev@example.com", "role": "developer"},
+            headers=owner,
+        )
+        assert resp.status_code == 200
+
+        issue_ids = []
+        for shard in (1, 2):
+            resp = client.post(
+                f"/api/projects/{ids[shard]}/issues",
+                json={"title": f"Bug on {shard}", "priority": "high"},
+                headers=owner,
+            )
+            assert resp.status_code == 200
+            issue_ids.append(resp.json()["id"])
+        assert len(set(issue_ids)) == 2  # ids are unique across shards
+
+        # issue-scoped routes find the right shard from the id alone
+        resp = client.post(
+            f"/api/issues/{issue_ids[0]}/comments",
+            json={"body": "sharded comment"},
+            headers=owner,
+        )
+        assert resp.status_code == 200
+        assert client.get(f"/api/issues/{issue_ids[0]}", headers=owner).json()[
+            "project_id"
+        ] == ids[1]
+
+        # fan-out reads
+        listed = {p["id"] for p in client.get("/api/projects/", headers=owner).json()}
+        assert {ids[1], ids[2]} <= listed
+        mine = client.get("/api/me/issues", headers=owner).json()
+        assert [i["id"] for i in mine][:2] == sorted(issue_ids, reverse=True)
+
+        # rebalance shard 1 -> 2; the API keeps working
+        counts = move_project(ids[1], 2, settle_seconds=0)
+        assert counts["issues"] == 1 and counts["comments"] == 1
+        assert counts["project_members"] == 2
+        assert _rows(1, models.Project, id=ids[1]) == 0
+        assert _rows(2, models.Issue, project_id=ids[1]) == 1
+
+        comments = client.get(f"/api/issues/{issue_ids[0]}/comments", headers=owner)
+        assert [c["body"] for c in comments.json()] == ["sharded comment"]
+        members = client.get(f"/api/projects/{ids[1]}/members", headers=owner)
+        assert len(members.json()) == 2
+    finally:
+        activity_writer.flush()
+        shard_router.configure(engine, settings.SHARD_DATABASE_URLS)
@@ -0,0 +1,99 @@
+from sqlalchemy.orm import Session
+
+from app.core.similarity import SimilarityIndex
+from app.crud import crud
+from app.db import models
+from app.db.session import make_engine
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def _create(project_id, headers, title, **params):
+    resp = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": title, "priority": "medium"},
+        params=params,
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def test_similar_issues_and_create_warning():
+    headers = auth_headers(create_user_and_get_token("dupes@example.com", "secret"))
+    project_id = create_project(headers, "Dupes")
+    login = _create(project_id, headers, "Login button broken on Safari")
+    csv = _create(project_id, headers, "Crash when exporting CSV report")
+    _create(project_id, headers, "Dark mode colours wrong in settings")
+
+    resp = client.get(
+        f"/api/projects/{project_id}/issues/similar",
+        params={"title": "Login button is broken in Safari"},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    assert [m["id"] for m in resp.json()] == [login["id"]]
+
+    created = _create(project_id, headers, "Safari login button broken")
+    assert [m["id"] for m in created["possible_duplicates"]] == [login["id"]]
+    assert _create(project_id, headers, "Typo", check_duplicates=False)[
+        "possible_duplicates"
+    ] == []
+
+    # updates re-index the title
+    client.patch(
+        f"/api/issues/{csv['id']}",
+        json={"title": "CSV export crashes"},
+        headers=headers,
+    )
+    resp = client.get(
+        f"/api/projects/{project_id}/issues/similar",
+        params={"title": "CSV export crash"},
+        headers=headers,
+    )
+    assert [m["id"] for m in resp.json()] == [csv["id"]]
+
+
+def test_other_workers_catch_up_from_the_change_log(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'similar.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    db = Session(engine)
+    user = models.User(name="dupes", email="dupes2@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    project = models.Project(name="Dupes", key="DU", owner_id=user.id)
+    db.add(project)
+    db.commit()
+
+    def write(title=None, delete=None):
+        # what another worker's create/delete leaves behind: the row and a
+        # change log entry, but none of this index's hooks
+        if delete is not None:
+            db.delete(delete)
+            crud.record_change(db, project.id, "issue", delete.id, op="delete")
+            db.commit()
+            return None
+        issue = models.Issue(project_id=project.id, title=title, reporter_id=user.id)
+        db.add(issue)
+        db.flush()
+        crud.record_change(db, project.id, "issue", issue.id)
+        db.commit()
+        return issue
+
+    index = SimilarityIndex()
+    try:
+        write("Search ignores accents")
+        assert index.similar(db, project.id, "Notifications arrive twice") == []
+
+        issue = write("Notifications arrive twice")
+        matches = index.similar(db, project.id, "Notifications arrive twice")
+        assert [m["id"] for m in matches] == [issue.id]
+
+        write(delete=issue)
+        assert index.similar(db, project.id, "Notifications arrive twice") == []
+    finally:
+        db.close()
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCRIPT = """
+import sqlalchemy
+import sys
+
+import app.main  # the database below doesn't exist: importing must not connect
+
+from fastapi.testclient import TestClient
+from app.core.config import Settings
+from app.main import create_app
+
+url = "sqlite:///" + sys.argv[1]
+application = create_app(Settings(DATABASE_URL=url, WEBHOOK_ENABLED=False))
+with TestClient(application) as client:
+    assert client.get("/").status_code == 200
+    tables = sqlalchemy.inspect(sqlalchemy.create_engine(url)).get_table_names()
+    assert "issues" in tables, tables
+print("ok")
+"""
+
+
+def test_import_touches_no_database_and_lifespan_creates_schema(tmp_path):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path}/missing/dir/issuehub.db",
+        ATTACHMENT_DIR=str(tmp_path / "attachments"),
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT, str(tmp_path / "app.db")],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "ok"
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+from app.crud import crud
+from app.core.rollups import rollup_job
+from app.db import models
+from app.db.session import SessionLocal
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def _timeseries(headers, project_id, **params):
+    resp = client.get(
+        f"/api/projects/{project_id}/timeseries", params=params, headers=headers
+    )
+    assert resp.status_code == 200
+    return resp.json()["points"]
+
+
+def test_transitions_roll_up_into_daily_counts():
+    headers = auth_headers(create_user_and_get_token("charts@example.com", "secret"))
+    project_id = create_project(headers, "Charts")
+    ids = [
+        client.post(
+            f"/api/projects/{project_id}/issues",
+            json={"title": f"Issue {n}", "priority": priority},
+            headers=headers,
+        ).json()["id"]
+        for n, priority in enumerate(["high", "high", "low"])
+    ]
+    client.patch(f"/api/issues/{ids[0]}", json={"status": "closed"}, headers=headers)
+    client.patch(f"/api/issues/{ids[1]}", json={"priority": "low"}, headers=headers)
+    client.patch(f"/api/issues/{ids[1]}", json={"title": "Renamed"}, headers=headers)
+    client.delete(f"/api/issues/{ids[2]}", headers=headers)
+
+    # nothing is visible until the roll-up job has run
+    assert _timeseries(headers, project_id)[-1]["created"] == 0
+    assert rollup_job.run_once() >= 6
+    points = _timeseries(headers, project_id)
+    assert len(points) == 30
+    assert points[-2]["remaining"] == 0
+    today = points[-1]
+    assert today["by_status"] == {"open": 1, "in_progress": 0, "closed": 1}
+    assert today["open_by_priority"] == {"high": 0, "medium": 0, "low": 1}
+    assert (today["remaining"], today["created"], today["closed"]) == (1, 3, 1)
+
+    # folding again adds nothing
+    rollup_job.run_once()
+    assert _timeseries(headers, project_id)[-1] == today
+
+
+def test_backfill_replays_activity_history():
+    headers = auth_headers(create_user_and_get_token("backfill@example.com", "secret"))
+    project_id = create_project(headers, "Charts")
+    issue_id = client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": "Old issue", "priority": "medium"},
+        headers=headers,
+    ).json()["id"]
+    rollup_job.run_once()
+
+    # pretend the issue predates transitions: created 10 days ago, closed
+    # 5 days ago according to the activity log
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.query(models.IssueTransition).filter(
+            models.IssueTransition.issue_id == issue_id
+        ).delete()
+        db.query(models.ProjectDailyStats).filter(
+            models.ProjectDailyStats.project_id == project_id
+        ).delete()
+        db.query(models.Issue).filter(models.Issue.id == issue_id).update(
+            {
+                models.Issue.created_at: now - timedelta(days=10),
+                models.Issue.status: models.IssueStatusEnum.closed,
+                models.Issue.status_rank: models.status_rank("closed"),
+            }
+        )
+        db.add(
+            models.ActivityLog(
+                project_id=project_id,
+                issue_id=issue_id,
+                entity="issue",
+                entity_id=issue_id,
+                field="status",
+                old_value="open",
+                new_value="closed",
+                created_at=now - timedelta(days=5),
+            )
+        )
+        db.commit()
+        assert crud.backfill_transitions(db, project_id) == 2
+        assert crud.backfill_transitions(db, project_id) == 0
+    finally:
+        db.close()
+    rollup_job.run_once()
+
+    start = (now - timedelta(days=11)).date()
+    points = _timeseries(headers, project_id, start=str(start))
+    remaining = [point["remaining"] for point in points]
+    assert remaining == [0] + [1] * 5 + [0] * 6
+    assert points[1]["created"] == 1
+    assert points[6]["closed"] == 1
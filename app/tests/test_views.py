@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+from app.db import models
+from app.db.session import SessionLocal
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+def _issue(headers, project_id, title, priority="high", **extra):
+    return client.post(
+        f"/api/projects/{project_id}/issues",
+        json={"title": title, "priority": priority, **extra},
+        headers=headers,
+    ).json()
+
+
+def _view_ids(headers, project_id, view_id):
+    resp = client.get(
+        f"/api/projects/{project_id}/views/{view_id}/issues", headers=headers
+    )
+    assert resp.status_code == 200
+    return [issue["id"] for issue in resp.json()]
+
+
+def test_view_follows_issue_writes_without_recomputing():
+    headers = auth_headers(create_user_and_get_token("views@example.com", "secret"))
+    project_id = create_project(headers, "Views")
+    view = client.post(
+        f"/api/projects/{project_id}/views",
+        json={
+            "name": "Open urgent crashes",
+            "filters": {"q": "crash", "status": "open", "priority": "high"},
+            "sort": "created_at",
+        },
+        headers=headers,
+    ).json()
+    assert view["filters"]["priority"] == "high"
+    refreshed_at = view["refreshed_at"]
+
+    older = _issue(headers, project_id, "Crash on login")["id"]
+    newer = _issue(headers, project_id, "CRASH when saving")["id"]
+    low = _issue(headers, project_id, "Crash in settings", priority="low")["id"]
+    _issue(headers, project_id, "Typo on homepage")
+    assert _view_ids(headers, project_id, view["id"]) == [newer, older]
+
+    client.patch(f"/api/issues/{low}", json={"priority": "high"}, headers=headers)
+    client.patch(f"/api/issues/{older}", json={"status": "closed"}, headers=headers)
+    client.delete(f"/api/issues/{newer}", headers=headers)
+    assert _view_ids(headers, project_id, view["id"]) == [low]
+
+    # all of the above was applied incrementally
+    views = client.get(f"/api/projects/{project_id}/views", headers=headers).json()
+    assert views[0]["refreshed_at"] == refreshed_at
+
+
+def test_stale_view_is_recomputed_before_reading():
+    headers = auth_headers(create_user_and_get_token("stale@example.com", "secret"))
+    project_id = create_project(headers, "Views")
+    mine = _issue(headers, project_id, "Assigned elsewhere")
+    view_id = client.post(
+        f"/api/projects/{project_id}/views",
+        json={"name": "Mine", "filters": {"assignee": mine["reporter_id"]}},
+        headers=headers,
+    ).json()["id"]
+    assert _view_ids(headers, project_id, view_id) == []
+
+    # a write that bypasses the incremental upkeep
+    db = SessionLocal()
+    try:
+        db.query(models.Issue).filter(models.Issue.id == mine["id"]).update(
+            {models.Issue.assignee_id: mine["reporter_id"]}
+        )
+        db.commit()
+        assert _view_ids(headers, project_id, view_id) == []
+
+        db.query(models.SavedView).filter(models.SavedView.id == view_id).update(
+            {models.SavedView.refreshed_at: datetime.utcnow() - timedelta(days=1)}
+        )
+        db.commit()
+    finally:
+        db.close()
+    assert _view_ids(headers, project_id, view_id) == [mine["id"]]
+
+    resp = client.post(
+        f"/api/projects/{project_id}/views/{view_id}/refresh", headers=headers
+    )
+    assert resp.status_code == 200
+    resp = client.delete(f"/api/projects/{project_id}/views/{view_id}", headers=headers)
+    assert resp.status_code == 200
+    assert client.get(f"/api/projects/{project_id}/views", headers=headers).json() == []
@@ -0,0 +1,256 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.webhooks import WebhookDispatcher, check_public_url, sign
+from app.db import models
+from app.db.session import SessionLocal, engine, make_engine
+from app.tests.test_main import (
+    auth_headers,
+    client,
+    create_project,
+    create_user_and_get_token,
+)
+
+
+class _Receiver(BaseHTTPRequestHandler):
+    """Stand-in endpoint: records deliveries, fails the paths it is told to."""
+
+    deliveries = []
+    failures = {}  # path -> statuses to answer before succeeding
+    in_flight = {}
+    max_in_flight = {}
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with self.lock:
+            self.in_flight[self.path] = self.in_flight.get(self.path, 0) + 1
+            self.max_in_flight[self.path] = max(
+                self.max_in_flight.get(self.path, 0), self.in_flight[self.path]
+            )
+            pending = self.failures.get(self.path, [])
+            status = pending.pop(0) if pending else 200
+        time.sleep(0.02)  # give concurrent batches a chance to overlap
+        with self.lock:
+            self.in_flight[self.path] -= 1
+            if status == 200:
+                self.deliveries.append((self.path, dict(self.headers), body))
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_events_are_batched_retried_and_signed(monkeypatch):
+    # the stand-in receiver listens on loopback
+    monkeypatch.setattr(settings, "WEBHOOK_ALLOW_PRIVATE_URLS", True)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Receiver)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    _Receiver.failures.update({"/flaky": [500], "/gone": [410, 410]})
+    dispatcher = WebhookDispatcher(
+        engines=[engine], batch_size=2, max_in_flight=1, max_attempts=2,
+        backoff_base=0, allow_private=True,
+    )
+    try:
+        headers = auth_headers(create_user_and_get_token("hooks@example.com", "secret"))
+        project_id = create_project(headers, "Hooks")
+        hooks = {}
+        for path, events in (
+            ("/all", None),
+            ("/flaky", ["issue.created"]),
+            ("/gone", ["comment.created"]),
+        ):
+            payload = {"url": base + path, "secret": "s3cret"}
+            if events:
+                payload["events"] = events
+            resp = client.post(
+                f"/api/projects/{project_id}/webhooks", json=payload, headers=headers
+            )
+            assert resp.status_code == 200
+            hooks[path] = resp.json()["id"]
+
+        issue_ids = [
+            client.post(
+                f"/api/projects/{project_id}/issues",
+                json={"title": f"Hook {i}", "priority": "low"},
+                headers=headers,
+            ).json()["id"]
+            for i in range(3)
+        ]
+        client.patch(
+            f"/api/issues/{issue_ids[0]}", json={"status": "closed"}, headers=headers
+        )
+        client.post(
+            f"/api/issues/{issue_ids[1]}/comments", json={"body": "hi"}, headers=headers
+        )
+
+        # the first pass fails /flaky and /gone once; later passes retry them
+        while dispatcher.run_once(wait=True):
+            pass
+
+        received = {}
+        for path, request_headers, body in _Receiver.deliveries:
+            assert request_headers["X-IssueHub-Signature"] == sign("s3cret", body)
+            received.setdefault(path, []).append(json.loads(body)["events"])
+        assert [[e["event"] for e in batch] for batch in received["/all"]] == [
+            ["issue.created", "issue.created"],
+            ["issue.created", "issue.updated"],
+            ["comment.created"],
+        ]
+        assert received["/all"][1][1]["data"]["changed"] == ["status"]
+        assert [e["data"]["id"] for batch in received["/flaky"] for e in batch] == (
+            issue_ids
+        )
+        assert "/gone" not in received
+        assert all(count == 1 for count in _Receiver.max_in_flight.values())
+
+        db = SessionLocal()
+        try:
+            dead = (
+                db.query(models.WebhookOutbox)
+                .filter(models.WebhookOutbox.subscription_id == hooks["/gone"])
+                .one()
+            )
+            assert dead.delivered_at is None and dead.next_attempt_at is None
+            assert (dead.attempts, dead.last_error) == (2, "HTTP 410")
+        finally:
+            db.close()
+
+        resp = client.delete(
+            f"/api/projects/{project_id}/webhooks/{hooks['/gone']}", headers=headers
+        )
+        assert resp.status_code == 200
+        listed = client.get(f"/api/projects/{project_id}/webhooks", headers=headers)
+        assert [h["url"] for h in listed.json()] == [base + "/all", base + "/flaky"]
+    finally:
+        dispatcher.stop()
+        server.shutdown()
+
+
+def test_a_large_backlog_does_not_starve_other_subscriptions(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Receiver)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    isolated = make_engine(f"sqlite:///{tmp_path / 'hooks.db'}")
+    models.Base.metadata.create_all(bind=isolated)
+    db = Session(isolated)
+    user = models.User(name="hooks", email="backlog@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    project = models.Project(name="Backlog", key="BL", owner_id=user.id)
+    db.add(project)
+    db.flush()
+    hooks = {}
+    for path in ("/backlog", "/quiet"):
+        hook = models.WebhookSubscription(
+            project_id=project.id, url=base + path, events="issue.created"
+        )
+        db.add(hook)
+        db.flush()
+        hooks[path] = hook.id
+    # the busy endpoint's rows are all older than the quiet one's
+    for path in ["/backlog"] * 5 + ["/quiet"]:
+        db.add(
+            models.WebhookOutbox(
+                project_id=project.id,
+                subscription_id=hooks[path],
+                event="issue.created",
+                payload="{}",
+            )
+        )
+    db.commit()
+    db.close()
+
+    dispatcher = WebhookDispatcher(
+        engines=[isolated], workers=1, batch_size=1, max_in_flight=1,
+        backoff_base=0, allow_private=True,
+    )
+    try:
+        # a window of one row overall would only ever reach /backlog
+        assert dispatcher.run_once(wait=True) == 2
+        paths = [path for path, _, _ in _Receiver.deliveries]
+        assert paths.count("/backlog") == 1 and paths.count("/quiet") == 1
+    finally:
+        dispatcher.stop()
+        server.shutdown()
+
+
+def test_private_and_link_local_urls_are_refused(tmp_path, monkeypatch):
+    headers = auth_headers(create_user_and_get_token("ssrf@example.com", "secret"))
+    project_id = create_project(headers, "SSRF")
+    for url in (
+        "http://127.0.0.1:8000/hook",
+        "http://localhost/hook",
+        "http://10.0.0.5/hook",
+        "http://169.254.169.254/latest/meta-data",
+        "http://[::ffff:192.168.1.1]/hook",
+    ):
+        resp = client.post(
+            f"/api/projects/{project_id}/webhooks", json={"url": url}, headers=headers
+        )
+        assert resp.status_code == 400, url
+    assert client.get(
+        f"/api/projects/{project_id}/webhooks", headers=headers
+    ).json() == []
+
+    # a name that passed the check but now resolves to loopback (DNS
+    # rebinding) is refused once connected, before anything is sent
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Receiver)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://rebind.test:{server.server_address[1]}/rebind"
+    getaddrinfo = socket.getaddrinfo
+
+    def rebinding(host, port, *args, **kwargs):
+        # address-only lookups (the checks) see a public address, the one
+        # made to connect gets loopback
+        if host == "rebind.test":
+            host = "93.184.216.34" if port is None else "127.0.0.1"
+        return getaddrinfo(host, port, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", rebinding)
+    check_public_url(url)
+
+    isolated = make_engine(f"sqlite:///{tmp_path / 'hooks.db'}")
+    models.Base.metadata.create_all(bind=isolated)
+    db = Session(isolated)
+    user = models.User(name="ssrf", email="ssrf2@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    project = models.Project(name="SSRF", key="SS", owner_id=user.id)
+    db.add(project)
+    db.flush()
+    hook = models.WebhookSubscription(
+        project_id=project.id, url=url, events="issue.created"
+    )
+    db.add(hook)
+    db.flush()
+    db.add(
+        models.WebhookOutbox(
+            project_id=project.id,
+            subscription_id=hook.id,
+            event="issue.created",
+            payload="{}",
+        )
+    )
+    db.commit()
+
+    dispatcher = WebhookDispatcher(engines=[isolated], max_attempts=1)
+    try:
+        assert dispatcher.run_once(wait=True) == 1
+        row = db.query(models.WebhookOutbox).one()
+        assert row.delivered_at is None and row.next_attempt_at is None
+        assert row.last_error == "rebind.test resolves to a non-public address"
+        assert "/rebind" not in [path for path, _, _ in _Receiver.deliveries]
+    finally:
+        dispatcher.stop()
+        server.shutdown()
+        db.close()
@@ -0,0 +1,74 @@
+"""
+Bytes saved vs. CPU spent compressing typical issue-list responses.
+
+    python -m benchmarks.compression
+
+Builds IssueOut lists of several sizes, serialises them the way the API
+does and reports, per codec and level, the compressed size, the ratio and
+the median time to compress one response.
+"""
+import statistics
+import time
+from datetime import datetime
+
+from app.core.compression import CODECS, compress
+from app.schemas.pydantic_schemas import IssueOut
+
+SIZES = (10, 100, 1000)
+LEVELS = (1, 6, 9)
+
+
+def issue_list_json(count: int) -> bytes:
+    now = datetime.utcnow()
+    issues = [
+        IssueOut(
+            id=i,
+            project_id=1,
+            title=f"Checkout fails on step {i % 7} for some users",
+            description=(
+                "Steps to reproduce: open the cart, apply a coupon, press pay. "
+                f"Seen on build {1000 + i}."
+            ),
+            status=("open", "in_progress", "closed")[i % 3],
+            priority=("low", "medium", "high")[i % 3],
+            reporter_id=1 + i % 5,
+            assignee_id=None if i % 4 else 2,
+            created_at=now,
+            updated_at=now,
+            version=1 + i % 3,
+        )
+        for i in range(count)
+    ]
+    return ("[" + ",".join(i.model_dump_json() for i in issues) + "]").encode()
+
+
+def time_compress(data: bytes, encoding: str, level: int, rounds: int = 20) -> float:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        compress(data, encoding, level)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    print(
+        f"{'issues':>6} {'raw B':>9} {'codec':>5} {'lvl':>3} "
+        f"{'out B':>8} {'ratio':>6} {'saved B':>9} {'us':>9} {'MB/s':>8}"
+    )
+    for count in SIZES:
+        data = issue_list_json(count)
+        for encoding in CODECS:
+            for level in LEVELS:
+                out = compress(data, encoding, level)
+                seconds = time_compress(data, encoding, level)
+                print(
+                    f"{count:>6} {len(data):>9} {encoding:>5} {level:>3} "
+                    f"{len(out):>8} {len(data) / len(out):>6.1f} "
+                    f"{len(data) - len(out):>9} {seconds * 1e6:>9.0f} "
+                    f"{len(data) / seconds / 1e6:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
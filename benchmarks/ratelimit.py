@@ -0,0 +1,58 @@
+"""
+Per-request cost of the rate limiter, in microseconds.
+
+    python -m benchmarks.ratelimit
+
+Times RateLimiter.check for the in-memory backend and the shared SQLite
+backend, with a user-only limit and a user + project limit, spreading the
+calls over many users so buckets are mostly warm but not all the same.
+"""
+import os
+import statistics
+import tempfile
+import time
+
+from app.core.ratelimit import MemoryBackend, RateLimiter, SQLiteBackend
+
+ROUNDS = 20000
+USERS = 100
+LIMITS = {
+    "user_only": {"user": "1000000/second"},
+    "user_and_project": {"user": "1000000/second", "project": "1000000/second"},
+}
+
+
+def time_checks(limiter: RateLimiter, route: str, rounds: int) -> list:
+    samples = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        limiter.check(route, user_id=i % USERS, project_id=1)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(name: str, route: str, samples: list) -> None:
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99)]
+    print(
+        f"{name:>8} {route:>17} {statistics.median(samples) * 1e6:>9.2f} "
+        f"{p99 * 1e6:>9.2f}"
+    )
+
+
+def main() -> None:
+    print(f"{'backend':>8} {'limits':>17} {'p50 us':>9} {'p99 us':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": (MemoryBackend(), ROUNDS),
+            "sqlite": (SQLiteBackend(os.path.join(tmp, "buckets.db")), ROUNDS // 10),
+        }
+        for name, (backend, rounds) in backends.items():
+            limiter = RateLimiter(backend, LIMITS)
+            for route in LIMITS:
+                time_checks(limiter, route, rounds // 10)  # warm up
+                report(name, route, time_checks(limiter, route, rounds))
+
+
+if __name__ == "__main__":
+    main()
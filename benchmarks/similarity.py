@@ -0,0 +1,71 @@
+"""
+Duplicate lookup latency against one project's in-memory index.
+
+    python -m benchmarks.similarity
+
+Indexes synthetic issue titles for projects of several sizes and reports
+the time to build the index and the median / p99 time of a lookup, the
+part of GET /issues/similar and of the create-time check that runs in
+memory (the per-call change_seq read is not included).
+"""
+import random
+import statistics
+import time
+
+from app.core.similarity import ProjectIndex
+
+SIZES = (1_000, 10_000, 50_000)
+QUERIES = 500
+# a few words every tracker is full of, plus a long tail of specific ones
+COMMON = (
+    "login button crash export csv report safari chrome firefox dark mode "
+    "settings page slow search filter sort date timezone email invite "
+    "password reset upload attachment preview mobile layout broken missing "
+    "wrong error timeout notification duplicate sidebar api token webhook"
+).split()
+
+
+def vocabulary(rng: random.Random, size: int = 5000) -> list:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [
+        "".join(rng.choice(letters) for _ in range(rng.randint(4, 9)))
+        for _ in range(size)
+    ]
+
+
+def title(rng: random.Random, specific: list) -> str:
+    words = [rng.choice(COMMON) for _ in range(rng.randint(1, 3))]
+    words += [rng.choice(specific) for _ in range(rng.randint(2, 4))]
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def main() -> None:
+    rng = random.Random(42)
+    specific = vocabulary(rng)
+    print(f"{'issues':>7} {'build ms':>9} {'p50 us':>8} {'p99 us':>8} {'hits':>5}")
+    for size in SIZES:
+        titles = [title(rng, specific) for _ in range(size)]
+        index = ProjectIndex(seq=0)
+        start = time.perf_counter()
+        for issue_id, text in enumerate(titles):
+            index.put(issue_id, text, None)
+        build = time.perf_counter() - start
+
+        samples, hits = [], 0
+        for _ in range(QUERIES):
+            query = rng.choice(titles)
+            start = time.perf_counter()
+            matches = index.query(query, None, limit=5, threshold=0.4)
+            samples.append(time.perf_counter() - start)
+            hits += bool(matches)
+        samples.sort()
+        print(
+            f"{size:>7} {build * 1e3:>9.0f} "
+            f"{statistics.median(samples) * 1e6:>8.0f} "
+            f"{samples[int(len(samples) * 0.99)] * 1e6:>8.0f} {hits:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Cold-start cost of the app, in milliseconds.
+
+    python -m benchmarks.startup [--runs N] [--max-import-ms MS]
+
+Each run is a fresh interpreter against a fresh SQLite database and
+reports four times. ``process`` is the whole run, interpreter start
+included. ``import`` is ``import app.main``. ``create_app`` builds
+another app. ``lifespan`` starts it, which creates the tables, fills the
+pools and starts the background jobs. With ``--max-import-ms`` the
+command exits with status 1 when the median import time is over the
+limit, so CI can catch regressions.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json
+import time
+
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+from app.main import create_app
+
+built = time.perf_counter()
+application = create_app()
+created = time.perf_counter()
+with TestClient(application):
+    started = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "create_app": created - built,
+    "lifespan": started - created,
+}))
+"""
+
+
+def run_once(tmp: str, index: int) -> dict:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp}/startup-{index}.db",
+        ATTACHMENT_DIR=os.path.join(tmp, "attachments"),
+        WEBHOOK_ENABLED="false",
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process"] = time.perf_counter() - start
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure app cold start")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [run_once(tmp, i) for i in range(args.runs)]
+
+    print(f"{'phase':>10} {'p50 ms':>9} {'max ms':>9}")
+    medians = {}
+    for phase in ("process", "import", "create_app", "lifespan"):
+        samples = [run[phase] * 1000 for run in runs]
+        medians[phase] = statistics.median(samples)
+        print(f"{phase:>10} {medians[phase]:>9.1f} {max(samples):>9.1f}")
+
+    if args.max_import_ms is not None and medians["import"] > args.max_import_ms:
+        print(
+            f"import takes {medians['import']:.1f} ms, "
+            f"over the {args.max_import_ms:.1f} ms limit"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ export type ProjectMember = {
   user_id: number;
   role: Role;
   joined_at: string;
+  user?: { id: number; name: string; email: string } | null;
 };
 
 export async function getMembers(projectId: number): Promise<ProjectMember[]> {
@@ -1,4 +1,5 @@
 import api from "./http";
+import type { Role } from "./members";
 
 export type Project = {
   id: number;
@@ -7,7 +8,16 @@ export type Project = {
   description: string | null;
 };
 
-export async function getProjects(): Promise<Project[]> {
+// GET /api/projects/ also returns the caller's role and counts
+export type ProjectSummary = Project & {
+  role: Role;
+  member_count: number;
+  open_issue_count: number;
+  in_progress_issue_count: number;
+  closed_issue_count: number;
+};
+
+export async function getProjects(): Promise<ProjectSummary[]> {
   const { data } = await api.get("/api/projects/");
   return data;
 }